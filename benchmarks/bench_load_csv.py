@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark CSV ingestion: legacy row-by-row loader vs. vectorized loader.
+
+Usage:
+    python benchmarks/bench_load_csv.py
+    python benchmarks/bench_load_csv.py --sizes 1000 10000 --tissues 50
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from marimo_components.data_processor import ExpressionDataProcessor
+
+
+def legacy_load_csv(file_content: bytes, sep: str = ',') -> dict:
+    """The original iterrows-based loader, with empty (NaN) cells skipped."""
+    df = pd.read_csv(BytesIO(file_content), sep=sep)
+    gene_col = df.columns[0]
+    genes_dict = {}
+    for _, row in df.iterrows():
+        gene_name = str(row[gene_col])
+        tissue_values = {}
+        for col in df.columns[1:]:
+            try:
+                value = float(row[col])
+            except (ValueError, TypeError):
+                continue
+            if np.isnan(value):
+                continue
+            tissue_values[col] = value
+        if tissue_values:
+            genes_dict[gene_name] = tissue_values
+    return {"genes": genes_dict}
+
+
+def make_csv(n_genes: int, n_tissues: int, missing: float = 0.1, seed: int = 0) -> bytes:
+    """Build a synthetic gene x UBERON CSV with some empty and non-numeric cells."""
+    rng = np.random.default_rng(seed)
+    values = rng.random((n_genes, n_tissues)).round(4).astype(object)
+    values[rng.random((n_genes, n_tissues)) < missing] = ''
+    values[rng.random((n_genes, n_tissues)) < 0.001] = 'n/a'
+    df = pd.DataFrame(values, columns=[f"UBERON_{i:07d}" for i in range(n_tissues)])
+    df.insert(0, "Gene", [f"GENE{i}" for i in range(n_genes)])
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def time_call(fn, *args, repeat: int = 1) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 60_000])
+    parser.add_argument('--tissues', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max', type=int, default=60_000,
+                        help="Skip the legacy loader above this many genes")
+    args = parser.parse_args()
+
+    processor = ExpressionDataProcessor()
+
+    print(f"{'genes':>8} {'tissues':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n_genes in args.sizes:
+        content = make_csv(n_genes, args.tissues)
+
+        new_time = time_call(processor.load_csv, content, repeat=args.repeat)
+        if n_genes <= args.legacy_max:
+            old_time = time_call(legacy_load_csv, content)
+            assert legacy_load_csv(content) == processor.load_csv(content), "outputs differ"
+            old_str, speedup = f"{old_time:12.3f}", f"{old_time / new_time:8.1f}x"
+        else:
+            old_str, speedup = f"{'skipped':>12}", f"{'-':>9}"
+
+        print(f"{n_genes:>8} {args.tissues:>8} {old_str} {new_time:15.3f} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""Benchmark AnatomogramWidget recolor latency and sync payload sizes.
+
+Drives a widget through scripted ``selected_gene``, ``threshold`` and
+``color_palette`` sequences against the bundled ``assets/svg``
+anatomograms. Every comm message the widget sends is captured and
+replayed into ``FrontEndModel``, a hand-written Python model of the
+``_esm`` front end: the SVG is parsed once, the tissue index resolves
+UBERON ids to shapes, and synced trait changes schedule a recolor that
+runs once per animation frame (all messages of one operation are taken
+to arrive within one frame), setting fills on the shape elements.
+
+What this measures directly is the Python side: the messages and bytes
+each operation syncs and the time spent producing them. The recolor
+counts and the recolor part of the latency come from the model, not from
+the JavaScript, so they cannot catch regressions in the real ``_esm``
+code and the model has to be kept in step with it by hand; the output
+labels them "model recolors". The one-message-per-batch behavior the
+model relies on is tested in test_anatomogram_widget.py.
+
+Usage:
+    python benchmarks/bench_widget_recolor.py
+    python benchmarks/bench_widget_recolor.py --genes 5000 --steps 100 --sex male
+    python benchmarks/bench_widget_recolor.py --json bench_recolor.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ipywidgets.widgets.widget import _remove_buffers
+
+from marimo_components.anatomogram_widget import AnatomogramWidget
+from marimo_components.colormaps import (
+    DEFAULT_PALETTE, LOG_SCALE_FLOOR, LUT_SIZE, NO_DATA_COLOR, PALETTES, palette_hex,
+)
+from marimo_components.expression_matrix import ExpressionMatrix
+from marimo_components.svg_assets import SVG_SEXES, load_bundled_index, load_bundled_svg
+
+# Synced traits whose front-end change listener calls scheduleColors()
+RECOLOR_TRAITS = {
+    'selected_gene', 'color_palette', 'scale_type', 'threshold', 'expression_data',
+    'gene_values', 'gene_buffer', 'transport', 'tissue_index', 'color_mode', 'tissue_colors',
+    'panel_buffer',
+}
+
+# (data source, transport) pairs; 'dict' syncs the whole dataset as expression_data
+CONFIGS = [('dict', 'json'), ('matrix', 'json'), ('matrix', 'binary')]
+COLOR_MODES = ['client', 'server']
+OPERATIONS = ['gene', 'threshold', 'palette']
+
+
+def payload_size(data, buffers) -> int:
+    """Bytes a comm message takes on the wire: JSON body plus binary buffers."""
+    body = json.dumps(data, separators=(',', ':'), default=str)
+    return len(body.encode('utf-8')) + sum(memoryview(b).nbytes for b in buffers or [])
+
+
+def make_matrix(tissue_ids, n_genes: int, extra_tissues: int = 20, missing: float = 0.2,
+                seed: int = 0) -> ExpressionMatrix:
+    """Synthetic expression over the anatomogram's tissues plus some it does not draw."""
+    rng = np.random.default_rng(seed)
+    tissues = list(tissue_ids) + [f"UBERON_99{i:05d}" for i in range(extra_tissues)]
+    values = rng.lognormal(mean=0.0, sigma=1.0, size=(n_genes, len(tissues)))
+    values[rng.random(values.shape) < missing] = np.nan
+    return ExpressionMatrix(values, [f"GENE{i}" for i in range(n_genes)], tissues)
+
+
+class FrontEndModel:
+    """Hand-written Python model of one rendered view of the widget's ``_esm``.
+
+    Holds the synced state as the browser sees it and the parsed SVG with
+    its tissue entries, and applies incoming ``update`` messages the way
+    the JS change listeners do: changes only schedule a recolor, which
+    :meth:`frame` runs once.
+    """
+
+    def __init__(self, state, sex: str, minimized: bool = True):
+        self.state = dict(state)
+        root = ET.fromstring(load_bundled_svg(sex, minimized=minimized))
+        elements = list(root.iter())[1:]
+        index = load_bundled_index(sex, minimized=minimized)
+        self.entries = [(tissue_id, elements[position], [elements[i] for i in shapes])
+                        for tissue_id, position, shapes in index['tissues']]
+        self.tissue_positions = {}
+        self.index_tissues()
+        self.color_scheduled = False
+        self.recolors = 0
+
+    def receive(self, data, buffers):
+        """Apply one comm message, scheduling a recolor if it changes a color trait."""
+        if data.get('method') != 'update':
+            return
+        state = dict(data['state'])
+        for path, buffer in zip(data.get('buffer_paths', []), buffers or []):
+            state[path[0]] = memoryview(buffer)
+        self.state.update(state)
+
+        for name in state:
+            if name == 'tissue_index':
+                self.index_tissues()
+            if name in RECOLOR_TRAITS:
+                self.color_scheduled = True
+
+    def frame(self):
+        """Mirror of the requestAnimationFrame callback; returns the recolors run (0 or 1)."""
+        if not self.color_scheduled:
+            return 0
+        self.color_scheduled = False
+        self.update_colors()
+        self.recolors += 1
+        return 1
+
+    def index_tissues(self):
+        self.tissue_positions = {tissue: i for i, tissue in enumerate(self.state.get('tissue_index') or [])}
+
+    def gene_data(self, gene):
+        """Mirror of getGeneData(): (values, get) for the gene, or None."""
+        expression_data = self.state.get('expression_data') or {}
+        if expression_data.get('genes'):
+            gene_values = expression_data['genes'].get(gene)
+        elif self.state.get('transport') == 'binary':
+            buffer = self.state.get('gene_buffer')
+            if buffer is None or len(buffer) == 0:
+                return None
+            vector = np.frombuffer(buffer, dtype='<f4')
+
+            def get(tissue_id):
+                position = self.tissue_positions.get(tissue_id)
+                if position is None:
+                    return None
+                value = float(vector[position])
+                return None if value != value else value
+            return vector, get
+        else:
+            gene_values = self.state.get('gene_values')
+
+        if not gene_values:
+            return None
+        return list(gene_values.values()), gene_values.get
+
+    def update_colors(self):
+        """Mirror of updateColors()."""
+        if self.state.get('color_mode') == 'server':
+            self.apply_server_colors()
+            return
+
+        gene = self.state.get('selected_gene')
+        data = self.gene_data(gene) if gene else None
+        if data is None:
+            self.reset_colors()
+            return
+
+        values, get = data
+        positive = [v for v in values if isinstance(v, (int, float, np.floating)) and v > 0]
+        if not positive:
+            self.reset_colors()
+            return
+
+        scale = color_scale(self.state.get('color_palette'), self.state.get('scale_type'),
+                            min(positive), max(positive))
+        threshold = self.state.get('threshold') or 0
+        for tissue_id, node, shapes in self.entries:
+            value = get(tissue_id)
+            if value is not None and value >= threshold:
+                self.color_entry(shapes, scale(value))
+                node.set('data-expression', str(value))
+            else:
+                self.color_entry(shapes, NO_DATA_COLOR)
+                node.attrib.pop('data-expression', None)
+
+    def apply_server_colors(self):
+        """Mirror of applyServerColors()."""
+        colors = self.state.get('tissue_colors') or {}
+        gene = self.state.get('selected_gene')
+        data = self.gene_data(gene) if gene else None
+        get = data[1] if data else (lambda tissue_id: None)
+
+        for tissue_id, node, shapes in self.entries:
+            color = colors.get(tissue_id)
+            value = get(tissue_id)
+            self.color_entry(shapes, color or NO_DATA_COLOR)
+            if color and value is not None:
+                node.set('data-expression', str(value))
+            else:
+                node.attrib.pop('data-expression', None)
+
+    def reset_colors(self):
+        for _, node, shapes in self.entries:
+            self.color_entry(shapes, NO_DATA_COLOR)
+            node.attrib.pop('data-expression', None)
+
+    @staticmethod
+    def color_entry(shapes, color):
+        for shape in shapes:
+            shape.set('style', f'fill:{color}')
+
+
+def color_scale(palette, scale_type, low, high):
+    """Scalar color scale equivalent to createColorScale() in the front end."""
+    table = palette_hex(palette if palette in PALETTES else DEFAULT_PALETTE).tolist()
+    if scale_type == 'log':
+        low = low if low > 0 else LOG_SCALE_FLOOR
+        span = np.log(high) - np.log(low)
+
+        def position(value):
+            if value <= 0:
+                return 0.0
+            return 0.5 if span == 0 else (np.log(value) - np.log(low)) / span
+    else:
+        span = high - low
+
+        def position(value):
+            return 0.5 if span == 0 else (value - low) / span
+
+    def scale(value):
+        t = min(max(position(value), 0.0), 1.0)
+        return table[min(int(t * LUT_SIZE), LUT_SIZE - 1)]
+    return scale
+
+
+class Harness:
+    """A widget wired to a FrontEndModel through a recording comm."""
+
+    def __init__(self, matrix: ExpressionMatrix, source: str, transport: str, color_mode: str,
+                 sex: str, minimized: bool = True):
+        kwargs = dict(sex=sex, color_mode=color_mode, minimized_svg=minimized)
+        if source == 'dict':
+            kwargs['expression_data'] = matrix.to_dict()
+        else:
+            kwargs.update(matrix=matrix, transport=transport)
+        self.widget = AnatomogramWidget(**kwargs)
+
+        state, _, buffers = _remove_buffers(self.widget.get_state())
+        self.initial_bytes = payload_size(state, buffers)
+        self.frontend = FrontEndModel(self.widget.get_state(), sex, minimized=minimized)
+        self.frontend.update_colors()
+
+        self.sent = []
+        self.widget.comm.publish_msg = self._record
+
+    def _record(self, msg_type, data=None, metadata=None, buffers=None, **keys):
+        if msg_type == 'comm_msg':
+            self.sent.append((data, buffers))
+
+    def run(self, name: str, value):
+        """Assign one trait and deliver the resulting messages.
+
+        Returns:
+            (seconds, payload bytes, messages, recolors)
+        """
+        self.sent.clear()
+        start = time.perf_counter()
+        setattr(self.widget, name, value)
+        for data, buffers in self.sent:
+            self.frontend.receive(data, buffers)
+        recolors = self.frontend.frame()
+        elapsed = time.perf_counter() - start
+        nbytes = sum(payload_size(data, buffers) for data, buffers in self.sent)
+        return elapsed, nbytes, len(self.sent), recolors
+
+
+def scripts(genes, steps: int, seed: int = 1):
+    """The scripted trait sequences, as {operation: [(trait, value), ...]}."""
+    rng = np.random.default_rng(seed)
+    palettes = sorted(PALETTES)
+    return {
+        'gene': [('selected_gene', str(g)) for g in rng.choice(genes, size=steps)],
+        'threshold': [('threshold', float(t)) for t in np.linspace(0, 3, steps)],
+        'palette': [('color_palette', palettes[i % len(palettes)]) for i in range(1, steps + 1)],
+    }
+
+
+def summarize(samples):
+    times = np.array([s[0] for s in samples]) * 1000
+    return {
+        'n': len(samples),
+        'p50_ms': float(np.percentile(times, 50)),
+        'p95_ms': float(np.percentile(times, 95)),
+        'max_ms': float(times.max()),
+        'bytes_per_op': float(np.mean([s[1] for s in samples])),
+        'msgs_per_op': float(np.mean([s[2] for s in samples])),
+        # From FrontEndModel, not the browser
+        'model_recolors_per_op': float(np.mean([s[3] for s in samples])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--genes', type=int, default=2_000)
+    parser.add_argument('--steps', type=int, default=50, help="Operations per sequence")
+    parser.add_argument('--sex', nargs='+', default=list(SVG_SEXES), choices=SVG_SEXES)
+    parser.add_argument('--original-svg', action='store_true',
+                        help="Use the unminimized bundled SVGs")
+    parser.add_argument('--json', type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    minimized = not args.original_svg
+    results = []
+
+    print(f"{'sex':>6} {'source':>6} {'transport':>9} {'colors':>6} {'op':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'bytes/op':>9} {'msgs':>5} {'model recolors':>14} "
+          f"{'initial B':>10}")
+    for sex in args.sex:
+        tissue_ids = [tissue_id for tissue_id, _, _ in load_bundled_index(sex, minimized)['tissues']]
+        matrix = make_matrix(dict.fromkeys(tissue_ids), args.genes)
+        sequences = scripts(matrix.genes, args.steps)
+
+        for source, transport in CONFIGS:
+            for color_mode in COLOR_MODES:
+                harness = Harness(matrix, source, transport, color_mode, sex, minimized=minimized)
+                harness.run('selected_gene', str(matrix.genes[0]))
+
+                for operation in OPERATIONS:
+                    samples = [harness.run(name, value) for name, value in sequences[operation]]
+                    row = dict(sex=sex, source=source, transport=transport, color_mode=color_mode,
+                               operation=operation, initial_bytes=harness.initial_bytes,
+                               **summarize(samples))
+                    results.append(row)
+                    print(f"{sex:>6} {source:>6} {transport:>9} {color_mode:>6} {operation:>9} "
+                          f"{row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['max_ms']:8.2f} "
+                          f"{row['bytes_per_op']:9.0f} {row['msgs_per_op']:5.1f} "
+                          f"{row['model_recolors_per_op']:14.1f} {row['initial_bytes']:10d}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'genes': args.genes, 'steps': args.steps, 'minimized_svg': minimized,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
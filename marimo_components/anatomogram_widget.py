@@ -1,13 +1,65 @@
 """AnyWidget implementation for anatomogram visualization."""
 
 import anywidget
+import numpy as np
 import traitlets
+from contextlib import contextmanager
 from pathlib import Path
 
+from .colormaps import DEFAULT_PALETTE, PALETTES, tissue_colors
+from .expression_matrix import ExpressionMatrix
+from .sparse_matrix import SparseExpressionMatrix
+from .svg_assets import load_bundled_index, load_bundled_svg
+
 
 class AnatomogramWidget(anywidget.AnyWidget):
-    """Interactive anatomogram visualization widget using D3.js."""
-    _version = "0.1.1"  # Increment to force reload
+    """Interactive anatomogram visualization widget using D3.js.
+
+    Expression data can be provided in two ways:
+
+    - ``expression_data``: the full ``{"genes": {...}}`` dict, synced to the
+      browser as a whole.
+    - ``matrix``: an ExpressionMatrix (or SparseExpressionMatrix) kept on
+      the Python side. Only the selected gene's ``{uberon_id: value}`` map
+      is synced (``gene_values``), and it is re-sent whenever
+      ``selected_gene`` changes.
+
+    With ``transport="binary"`` the matrix mode sends the selected gene as a
+    little-endian Float32Array buffer (``gene_buffer``, NaN for missing
+    tissues) laid out against ``tissue_index``, which is sent once.
+
+    When ``svg_url`` is empty the anatomograms bundled in ``assets/svg`` are
+    used: the front end requests each sex's SVG over the widget comm, so no
+    network access is needed. The minimized ``.min.svg`` variants are served
+    unless ``minimized_svg`` is False. Each SVG comes with a precomputed
+    UBERON id -> shape index, so recoloring walks a fixed list instead of
+    querying the DOM.
+
+    Parsed SVGs (bundled or fetched from ``svg_url``) are kept in a small
+    page-wide template cache shared by every widget and cloned for display,
+    so sex toggles after the first load and new widgets render without a
+    request or a re-parse.
+
+    With ``color_mode="server"`` the final per-tissue colors are computed in
+    Python from the palette lookup tables in ``colormaps`` and synced as
+    ``tissue_colors``; the browser only assigns fills.
+
+    Clicking a tissue sets ``clicked_tissue`` to its UBERON id (clicking it
+    again clears it) and outlines it, so Python can react to the selection,
+    e.g. by ranking the tissue's genes.
+
+    Setting ``selected_genes`` switches to a comparison panel: one small
+    anatomogram per gene, all cloned from the same parsed SVG and colored on
+    one scale shared across the panel. In matrix mode the genes arrive in a
+    single float32 payload (``panel_buffer``, one row per gene against
+    ``tissue_index``). The panel is always colored in the browser.
+
+    The front end coalesces change events into at most one recolor per
+    animation frame, so a slider drag does not recolor on every step. To
+    change several traits at once, use ``batch_update()``: the changes are
+    synced in one message and derived payloads are computed once.
+    """
+    _version = "0.1.6"  # Increment to force reload
     
     # CSS styling for the widget
     _css = """
@@ -58,6 +110,32 @@ class AnatomogramWidget(anywidget.AnyWidget):
         stroke-width: 1;
     }
     
+    .anatomogram-container.anatomogram-panel {
+        display: grid;
+        grid-template-columns: repeat(auto-fill, minmax(180px, 1fr));
+        gap: 8px;
+        align-items: start;
+    }
+    
+    .anatomogram-cell {
+        display: flex;
+        flex-direction: column;
+        align-items: center;
+        min-width: 0;
+    }
+    
+    .anatomogram-cell-title {
+        font-size: 13px;
+        font-weight: 600;
+        color: #333;
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
+    }
+    
+    .anatomogram-container svg .tissue-clicked {
+        stroke: #000;
+        stroke-width: 1.5;
+    }
+    
     .anatomogram-tooltip {
         position: absolute;
         display: none;
@@ -114,12 +192,68 @@ class AnatomogramWidget(anywidget.AnyWidget):
     _esm = """
     import * as d3 from "https://cdn.skypack.dev/d3@7";
     
+    // Parsed SVG templates keyed by URL or bundled asset id. Each widget model
+    // may evaluate this module separately, so the cache lives on globalThis to
+    // be shared across them. Templates are never attached or modified: views
+    // render clones, so a sex toggle or a new widget costs a cloneNode, not a
+    // fetch and parse. Least recently used templates are dropped beyond the cap.
+    const TEMPLATE_CACHE_SIZE = 4;
+    const sharedTemplates = globalThis.__anatomogramTemplates ??= {
+        cache: new Map(),
+        // Loads in progress ({promise, load}), so widgets asking for the same SVG share one fetch
+        loads: new Map(),
+    };
+    const templateCache = sharedTemplates.cache;
+    const templateLoads = sharedTemplates.loads;
+    
+    // Rejection of a load whose widget was removed before it finished
+    class WidgetClosedError extends Error {}
+    
+    function cachedTemplate(key, load) {
+        if (templateCache.has(key)) {
+            const template = templateCache.get(key);
+            templateCache.delete(key);
+            templateCache.set(key, template);
+            return Promise.resolve(template);
+        }
+        if (!templateLoads.has(key)) {
+            const promise = load()
+                .then(template => {
+                    templateCache.set(key, template);
+                    while (templateCache.size > TEMPLATE_CACHE_SIZE) {
+                        templateCache.delete(templateCache.keys().next().value);
+                    }
+                    return template;
+                })
+                .finally(() => templateLoads.delete(key));
+            templateLoads.set(key, { promise, load });
+        }
+        const shared = templateLoads.get(key);
+        // If another widget's load died with its widget, start our own
+        return shared.promise.catch(error => {
+            if (shared.load !== load && error instanceof WidgetClosedError) {
+                return cachedTemplate(key, load);
+            }
+            throw error;
+        });
+    }
+    
+    // Size a parsed SVG document for display and wrap it as a template
+    function makeTemplate(svgDoc, index) {
+        if (!svgDoc || !svgDoc.documentElement || svgDoc.querySelector("parsererror")) {
+            throw new Error("Invalid SVG document");
+        }
+        const svgElement = svgDoc.documentElement;
+        d3.select(svgElement)
+            .attr("width", "100%")
+            .attr("height", "100%")
+            .attr("viewBox", svgElement.getAttribute("viewBox") || "0 0 800 1000")
+            .attr("preserveAspectRatio", "xMidYMid meet");
+        return { element: svgElement, index: index };
+    }
+    
     export default {
         render({ model, el }) {
-            console.log('AnatomogramWidget render called');
-            console.log('Model:', model);
-            console.log('Element:', el);
-            
             // Create main container
             const mainContainer = document.createElement('div');
             mainContainer.className = 'anatomogram-widget-container';
@@ -130,6 +264,13 @@ class AnatomogramWidget(anywidget.AnyWidget):
                 .attr("class", "anatomogram-container");
             
             let currentSvg = null;
+            // Parsed SVG kept detached; every anatomogram on screen is a clone of it
+            let template = null;
+            // One view per rendered anatomogram: {gene, svg, entries}; gene is null
+            // for the single view that follows selected_gene
+            let views = [];
+            // UBERON elements of every view with the leaf shapes they color
+            let tissueEntries = [];
             let tooltip = null;
             
             // Initialize tooltip
@@ -150,55 +291,125 @@ class AnatomogramWidget(anywidget.AnyWidget):
                 container.html(`<div class="error-message">Error: ${message}</div>`);
             }
             
+            // Bundled SVG requests waiting for Python's answer, keyed by sex and variant
+            const pendingSvgs = new Map();
+            let closed = false;
+            
+            model.on("msg:custom", (msg, buffers) => {
+                if (!msg || msg.type !== "svg") return;
+                const variant = `${msg.sex}:${msg.minimized ? "min" : "full"}`;
+                const pending = pendingSvgs.get(variant);
+                if (!pending) return;
+                pendingSvgs.delete(variant);
+                
+                if (msg.error || !buffers || buffers.length === 0) {
+                    pending.reject(new Error(msg.error || "No SVG data received"));
+                    return;
+                }
+                pending.resolve({
+                    text: new TextDecoder().decode(buffers[0]),
+                    index: msg.index || null
+                });
+            });
+            
+            // Ask the Python side for a bundled SVG (only on a template cache miss)
+            function requestBundledSvg(sex, minimized) {
+                if (closed) return Promise.reject(new WidgetClosedError("Widget was removed"));
+                const variant = `${sex}:${minimized ? "min" : "full"}`;
+                if (!pendingSvgs.has(variant)) {
+                    let resolve, reject;
+                    const promise = new Promise((res, rej) => {
+                        resolve = res;
+                        reject = rej;
+                    });
+                    pendingSvgs.set(variant, { promise, resolve, reject });
+                    model.send({ type: "request_svg", sex: sex, minimized: minimized });
+                }
+                return pendingSvgs.get(variant).promise;
+            }
+            
+            // Recolor at most once per animation frame, however many changes arrive
+            let colorFrame = null;
+            
+            function scheduleColors() {
+                if (colorFrame !== null) return;
+                colorFrame = requestAnimationFrame(() => {
+                    colorFrame = null;
+                    updateColors();
+                });
+            }
+            
+            let loadCounter = 0;
+            
             // Load SVG based on sex
             async function loadAnatomogram() {
                 const sex = model.get("sex");
                 const svgUrl = model.get("svg_url");
-                
-                if (!svgUrl) {
-                    showError("SVG URL not provided");
-                    return;
-                }
-                
-                // Construct the full SVG path based on sex
-                const svgPath = sex === 'female' 
-                    ? `${svgUrl}/homo_sapiens.female.svg`
-                    : `${svgUrl}/homo_sapiens.male.svg`;
-                
-                showLoading(`Loading SVG from: ${svgPath}`);
-                console.log('Loading SVG from:', svgPath);
+                const loadId = ++loadCounter;
                 
                 try {
-                    const svgDoc = await d3.xml(svgPath);
-                    console.log('SVG loaded successfully:', svgDoc);
-                    
-                    if (!svgDoc || !svgDoc.documentElement) {
-                        showError("Invalid SVG document");
-                        return;
+                    let key, load, message;
+                    if (svgUrl) {
+                        // Construct the full SVG path based on sex
+                        const svgPath = sex === 'female' 
+                            ? `${svgUrl}/homo_sapiens.female.svg`
+                            : `${svgUrl}/homo_sapiens.male.svg`;
+                        
+                        key = `url:${svgPath}`;
+                        message = `Loading SVG from: ${svgPath}`;
+                        load = async () => makeTemplate(await d3.xml(svgPath), null);
+                    } else {
+                        const asset = sex === 'female' ? 'female' : 'male';
+                        const minimized = model.get("minimized_svg");
+                        key = `bundled:${asset}:${minimized ? "min" : "full"}`;
+                        load = async () => {
+                            const svg = await requestBundledSvg(asset, minimized);
+                            return makeTemplate(new DOMParser().parseFromString(svg.text, "image/svg+xml"), svg.index);
+                        };
                     }
+                    if (!templateCache.has(key)) showLoading(message);
+                    const loaded = await cachedTemplate(key, load);
                     
-                    container.html('');
-                    const svgElement = svgDoc.documentElement;
-                    container.node().appendChild(svgElement);
-                    currentSvg = d3.select(svgElement);
+                    // A newer load started while this one was waiting
+                    if (loadId !== loadCounter) return;
                     
-                    // Set SVG size
-                    currentSvg
-                        .attr("width", "100%")
-                        .attr("height", "100%")
-                        .attr("viewBox", currentSvg.attr("viewBox") || "0 0 800 1000")
-                        .attr("preserveAspectRatio", "xMidYMid meet");
-                    
-                    // Attach event handlers and update colors
-                    attachEventHandlers();
-                    updateColors();
+                    template = loaded;
+                    renderViews();
                     
                 } catch (error) {
+                    if (loadId !== loadCounter) return;
                     console.error("Error loading SVG:", error);
                     showError(`Failed to load anatomogram: ${error.message}`);
                 }
             }
             
+            // Lay out one clone of the template per panel gene (or a single view)
+            function renderViews() {
+                if (!template) return;
+                const genes = model.get("selected_genes") || [];
+                
+                container.html('');
+                container.classed("anatomogram-panel", genes.length > 0);
+                views = (genes.length ? genes : [null]).map(gene => {
+                    let parent = container;
+                    if (gene !== null) {
+                        parent = container.append("div").attr("class", "anatomogram-cell");
+                        parent.append("div").attr("class", "anatomogram-cell-title").text(gene);
+                    }
+                    const svgElement = template.element.cloneNode(true);
+                    if (gene !== null) svgElement.setAttribute("data-gene", gene);
+                    parent.node().appendChild(svgElement);
+                    return { gene: gene, svg: svgElement, entries: buildTissueEntries(svgElement, template.index) };
+                });
+                currentSvg = d3.select(views[0].svg);
+                tissueEntries = views.flatMap(view => view.entries);
+                
+                // Attach event handlers and update colors
+                attachEventHandlers();
+                highlightClicked();
+                updateColors();
+            }
+            
             // Color scale creation
             function createColorScale(palette, scaleType, minVal, maxVal) {
                 const colorSchemes = {
@@ -237,76 +448,240 @@ class AnatomogramWidget(anywidget.AnyWidget):
                 }
             }
             
+            // Tissue id -> position in gene_buffer (binary transport)
+            let tissuePositions = new Map();
+            
+            function indexTissues() {
+                const tissueIndex = model.get("tissue_index") || [];
+                tissuePositions = new Map(tissueIndex.map((id, i) => [id, i]));
+            }
+            
+            // Wrap a {uberon_id: value} object as a gene accessor
+            function objectAccessor(geneValues) {
+                if (!geneValues || Object.keys(geneValues).length === 0) return null;
+                return {
+                    values: Object.values(geneValues),
+                    get: (tissueId) => geneValues[tissueId]
+                };
+            }
+            
+            // View a little-endian float32 buffer (DataView) as a Float32Array
+            function floatArray(view) {
+                if (!view || view.byteLength === 0) return null;
+                return view.byteOffset % 4 === 0
+                    ? new Float32Array(view.buffer, view.byteOffset, view.byteLength / 4)
+                    : new Float32Array(view.buffer.slice(view.byteOffset, view.byteOffset + view.byteLength));
+            }
+            
+            // Wrap a Float32 buffer (DataView) as a gene accessor without building objects
+            function bufferAccessor(view) {
+                const vector = floatArray(view);
+                return vector ? vectorAccessor(vector) : null;
+            }
+            
+            // Wrap a vector laid out against tissue_index, NaN for missing tissues
+            function vectorAccessor(vector) {
+                return {
+                    values: vector,
+                    get: (tissueId) => {
+                        const position = tissuePositions.get(tissueId);
+                        if (position === undefined) return undefined;
+                        const value = vector[position];
+                        return Number.isNaN(value) ? undefined : value;
+                    }
+                };
+            }
+            
+            // Get an accessor for a gene's values from whichever trait holds them
+            function getGeneData(gene) {
+                const expressionData = model.get("expression_data");
+                if (expressionData && expressionData.genes) {
+                    return objectAccessor(expressionData.genes[gene]);
+                }
+                
+                // Selected-gene sync: Python pushes only the active gene's values
+                if (model.get("transport") === "binary") {
+                    return bufferAccessor(model.get("gene_buffer"));
+                }
+                return objectAccessor(model.get("gene_values"));
+            }
+            
+            // Accessors for every panel gene, from the dict data or the batched panel_buffer
+            function getPanelData() {
+                const genes = views.map(view => view.gene);
+                const expressionData = model.get("expression_data");
+                if (expressionData && expressionData.genes) {
+                    return genes.map(gene => objectAccessor(expressionData.genes[gene]));
+                }
+                
+                const panel = floatArray(model.get("panel_buffer"));
+                const width = tissuePositions.size;
+                if (!panel || width === 0 || panel.length !== genes.length * width) {
+                    // The payload for this gene list has not arrived yet
+                    return genes.map(() => null);
+                }
+                return genes.map((gene, i) => vectorAccessor(panel.subarray(i * width, (i + 1) * width)));
+            }
+            
+            // Positive range of the given accessors' values ([Infinity, -Infinity] if none)
+            function positiveRange(accessors) {
+                let minVal = Infinity;
+                let maxVal = -Infinity;
+                for (const geneData of accessors) {
+                    if (!geneData) continue;
+                    for (const v of geneData.values) {
+                        if (typeof v === 'number' && v > 0) {
+                            if (v < minVal) minVal = v;
+                            if (v > maxVal) maxVal = v;
+                        }
+                    }
+                }
+                return [minVal, maxVal];
+            }
+            
+            // Color one view's tissues from a gene accessor and a color scale
+            function colorView(entries, geneData, colorScale, threshold) {
+                for (const entry of entries) {
+                    const value = geneData ? geneData.get(entry.id) : undefined;
+                    
+                    if (value !== undefined && value >= threshold) {
+                        colorEntry(entry, colorScale(value));
+                        entry.node.setAttribute('data-expression', value);
+                    } else {
+                        colorEntry(entry, '#E0E0E0');
+                        entry.node.removeAttribute('data-expression');
+                    }
+                }
+            }
+            
+            // Color every panel view on one scale spanning all panel genes
+            function updatePanelColors() {
+                const accessors = getPanelData();
+                const [minVal, maxVal] = positiveRange(accessors);
+                if (minVal > maxVal) {
+                    resetColors();
+                    return;
+                }
+                
+                const colorScale = createColorScale(model.get("color_palette"), model.get("scale_type"), minVal, maxVal);
+                const threshold = model.get("threshold") || 0;
+                views.forEach((view, i) => colorView(view.entries, accessors[i], colorScale, threshold));
+            }
+            
             // Update tissue colors based on expression data
             function updateColors() {
                 if (!currentSvg) return;
                 
+                if (views[0].gene !== null) {
+                    updatePanelColors();
+                    return;
+                }
+                
+                if (model.get("color_mode") === "server") {
+                    applyServerColors();
+                    return;
+                }
+                
                 const gene = model.get("selected_gene");
-                const expressionData = model.get("expression_data");
                 const palette = model.get("color_palette");
                 const scaleType = model.get("scale_type");
                 const threshold = model.get("threshold") || 0;
+                const geneData = gene ? getGeneData(gene) : null;
                 
-                if (!gene || !expressionData || !expressionData.genes || !expressionData.genes[gene]) {
+                if (!geneData) {
                     // Reset all to default gray if no valid data
-                    currentSvg.selectAll('*[id^="UBERON"]').each(function() {
-                        const element = d3.select(this);
-                        colorElement(element, '#E0E0E0');
-                    });
+                    resetColors();
                     return;
                 }
                 
-                const geneData = expressionData.genes[gene];
-                const values = Object.values(geneData).filter(v => typeof v === 'number' && v > 0);
+                const [minVal, maxVal] = positiveRange([geneData]);
                 
-                if (values.length === 0) {
+                if (minVal > maxVal) {
                     // No valid values, color everything gray
-                    currentSvg.selectAll('*[id^="UBERON"]').each(function() {
-                        const element = d3.select(this);
-                        colorElement(element, '#E0E0E0');
-                    });
+                    resetColors();
                     return;
                 }
                 
-                const minVal = d3.min(values) || 0;
-                const maxVal = d3.max(values) || 1;
-                
                 const colorScale = createColorScale(palette, scaleType, minVal, maxVal);
                 
                 // Update all tissue elements
-                currentSvg.selectAll('*[id^="UBERON"]').each(function() {
-                    const element = d3.select(this);
-                    const tissueId = element.attr('id');
-                    const value = geneData[tissueId];
+                colorView(tissueEntries, geneData, colorScale, threshold);
+            }
+            
+            // Server color mode: Python already computed every fill
+            function applyServerColors() {
+                const colors = model.get("tissue_colors") || {};
+                const gene = model.get("selected_gene");
+                const geneData = gene ? getGeneData(gene) : null;
+                
+                for (const entry of tissueEntries) {
+                    const color = colors[entry.id];
+                    const value = geneData ? geneData.get(entry.id) : undefined;
                     
-                    if (value !== undefined && value >= threshold) {
-                        const color = colorScale(value);
-                        colorElement(element, color);
-                        element.attr('data-expression', value);
+                    colorEntry(entry, color || '#E0E0E0');
+                    if (color && value !== undefined) {
+                        entry.node.setAttribute('data-expression', value);
                     } else {
-                        colorElement(element, '#E0E0E0');
-                        element.attr('data-expression', null);
+                        entry.node.removeAttribute('data-expression');
                     }
-                });
+                }
             }
             
-            // Helper function to color an element (handles groups and paths)
-            function colorElement(element, color) {
-                const node = element.node();
-                if (node.tagName.toLowerCase() === 'g') {
-                    // For groups, color all child shapes
-                    element.selectAll('path, rect, circle, polygon, ellipse').style('fill', color);
-                } else {
-                    // Direct shape element
-                    element.style('fill', color);
+            function resetColors() {
+                for (const entry of tissueEntries) {
+                    colorEntry(entry, '#E0E0E0');
+                    entry.node.removeAttribute('data-expression');
                 }
             }
             
-            // Attach event handlers for tooltips
+            // Color the leaf shapes of a tissue (a group's child shapes, or the element itself)
+            function colorEntry(entry, color) {
+                for (const shape of entry.shapes) {
+                    shape.style.fill = color;
+                }
+            }
+            
+            // Resolve the precomputed index against the SVG, scanning the DOM only if it has none
+            function buildTissueEntries(svgElement, index) {
+                if (index) {
+                    const elements = Array.from(svgElement.getElementsByTagName('*'));
+                    if (elements.length === index.element_count) {
+                        const entries = index.tissues.map(([id, position, shapes]) => ({
+                            id: id,
+                            node: elements[position],
+                            shapes: shapes.map(i => elements[i])
+                        }));
+                        if (entries.every(entry => entry.node && entry.node.id === entry.id)) {
+                            return entries;
+                        }
+                    }
+                    console.warn('Anatomogram index does not match the SVG, scanning the DOM instead');
+                }
+                
+                return Array.from(svgElement.querySelectorAll('[id^="UBERON"]'), node => ({
+                    id: node.id,
+                    node: node,
+                    shapes: node.tagName.toLowerCase() === 'g'
+                        ? Array.from(node.querySelectorAll('path, rect, circle, polygon, ellipse'))
+                        : [node]
+                }));
+            }
+            
+            // Outline the shapes of the clicked tissue
+            function highlightClicked() {
+                const clicked = model.get("clicked_tissue");
+                for (const entry of tissueEntries) {
+                    for (const shape of entry.shapes) {
+                        shape.classList.toggle('tissue-clicked', entry.id === clicked);
+                    }
+                }
+            }
+            
+            // Attach event handlers for tooltips and tissue clicks
             function attachEventHandlers() {
                 if (!currentSvg || !tooltip) return;
                 
-                currentSvg.selectAll('*[id^="UBERON"]')
+                d3.selectAll(tissueEntries.map(entry => entry.node))
                     .on('mouseover', function(event) {
                         const element = d3.select(this);
                         const tissueId = element.attr('id');
@@ -314,7 +689,9 @@ class AnatomogramWidget(anywidget.AnyWidget):
                         
                         if (!tissueId) return;
                         
-                        const gene = model.get("selected_gene");
+                        // Panel views carry their gene on the cloned SVG root
+                        const panelSvg = this.closest('svg[data-gene]');
+                        const gene = panelSvg ? panelSvg.getAttribute('data-gene') : model.get("selected_gene");
                         const uberonMap = model.get("uberon_map");
                         
                         const tissueName = uberonMap && uberonMap[tissueId] ? uberonMap[tissueId] : tissueId;
@@ -343,31 +720,60 @@ class AnatomogramWidget(anywidget.AnyWidget):
                     })
                     .on('mouseout', function() {
                         tooltip.style("display", "none");
+                    })
+                    .on('click', function() {
+                        const tissueId = this.id;
+                        if (!tissueId) return;
+                        model.set("clicked_tissue", model.get("clicked_tissue") === tissueId ? "" : tissueId);
+                        model.save_changes();
                     });
             }
             
             // Initialize
             initTooltip();
+            indexTissues();
             
             // Initial load
-            if (model.get("svg_url")) {
-                loadAnatomogram();
-            }
+            loadAnatomogram();
             
             // Listen for property changes
-            model.on("change:selected_gene", updateColors);
+            model.on("change:selected_gene", scheduleColors);
             model.on("change:sex", loadAnatomogram);
-            model.on("change:color_palette", updateColors);
-            model.on("change:scale_type", updateColors);
-            model.on("change:threshold", updateColors);
+            model.on("change:color_palette", scheduleColors);
+            model.on("change:scale_type", scheduleColors);
+            model.on("change:threshold", scheduleColors);
             model.on("change:expression_data", () => {
                 if (currentSvg) {
-                    updateColors();
+                    scheduleColors();
                 } else {
                     loadAnatomogram();
                 }
             });
+            model.on("change:gene_values", scheduleColors);
+            model.on("change:gene_buffer", scheduleColors);
+            model.on("change:transport", scheduleColors);
+            model.on("change:tissue_index", () => {
+                indexTissues();
+                scheduleColors();
+            });
+            model.on("change:color_mode", scheduleColors);
+            model.on("change:tissue_colors", scheduleColors);
             model.on("change:svg_url", loadAnatomogram);
+            model.on("change:minimized_svg", loadAnatomogram);
+            model.on("change:clicked_tissue", highlightClicked);
+            model.on("change:selected_genes", renderViews);
+            model.on("change:panel_buffer", scheduleColors);
+            
+            // Fail this widget's outstanding requests so loads shared with
+            // other widgets do not wait for an answer that never comes
+            return () => {
+                closed = true;
+                for (const pending of pendingSvgs.values()) {
+                    pending.reject(new WidgetClosedError("Widget was removed"));
+                }
+                pendingSvgs.clear();
+                if (colorFrame !== null) cancelAnimationFrame(colorFrame);
+            };
         }
     };
     """
@@ -380,15 +786,185 @@ class AnatomogramWidget(anywidget.AnyWidget):
     scale_type = traitlets.Unicode("linear").tag(sync=True)
     uberon_map = traitlets.Dict({}).tag(sync=True)
     threshold = traitlets.Float(0.0).tag(sync=True)
-    svg_url = traitlets.Unicode("").tag(sync=True)  # Base URL for SVG files
+    svg_url = traitlets.Unicode("").tag(sync=True)  # Base URL for SVG files ('' = bundled)
+    gene_values = traitlets.Dict({}).tag(sync=True)  # Selected gene only (matrix mode)
+    transport = traitlets.Unicode("json").tag(sync=True)  # 'json' or 'binary' (matrix mode)
+    tissue_index = traitlets.List(traitlets.Unicode()).tag(sync=True)  # gene_buffer layout
+    gene_buffer = traitlets.Bytes(b"").tag(sync=True)  # Selected gene as float32 (binary)
+    color_mode = traitlets.Unicode("client").tag(sync=True)  # 'client' (d3) or 'server' (Python)
+    tissue_colors = traitlets.Dict({}).tag(sync=True)  # UBERON id -> hex color (server mode)
+    clicked_tissue = traitlets.Unicode("").tag(sync=True)  # UBERON id of the last clicked tissue
+    selected_genes = traitlets.List(traitlets.Unicode()).tag(sync=True)  # Comparison panel genes
+    panel_buffer = traitlets.Bytes(b"").tag(sync=True)  # Panel genes as float32 rows (matrix mode)
+    
+    # Python-side only: full dataset for selected-gene sync
+    matrix = traitlets.Union([traitlets.Instance(ExpressionMatrix),
+                              traitlets.Instance(SparseExpressionMatrix)], allow_none=True)
+    # Serve the minimized bundled SVGs (synced so the front end caches each variant separately)
+    minimized_svg = traitlets.Bool(True).tag(sync=True)
     
     def __init__(self, **kwargs):
         """Initialize the widget with optional parameters."""
+        # Derived-payload pushes postponed by batch_update(), run once when it exits
+        self._batch_depth = 0
+        self._deferred = set()
         super().__init__(**kwargs)
+        self.on_msg(self._handle_custom_msg)
+    
+    @contextmanager
+    def batch_update(self):
+        """Change several traits as one update.
+        
+        Inside the block the trait changes are held back and sent to the front
+        end in a single message when it exits (``hold_sync``), and the payloads
+        derived from them (gene values, panel buffer, server colors) are
+        computed once, after the last change, instead of after each one::
+        
+            with widget.batch_update():
+                widget.selected_gene = "TP53"
+                widget.color_palette = "magma"
+                widget.threshold = 0.2
+        """
+        with self.hold_sync():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._flush_deferred()
+    
+    def _defer(self, push) -> bool:
+        """Postpone ``push`` if a batch is open; returns True if it was postponed."""
+        if not self._batch_depth:
+            return False
+        self._deferred.add(push.__name__)
+        return True
+    
+    def _flush_deferred(self):
+        deferred, self._deferred = self._deferred, set()
+        # Gene payloads first: server colors read the selected gene
+        for push in (self._push_gene_values, self._push_panel, self._push_tissue_colors):
+            if push.__name__ in deferred:
+                push(None)
+    
+    def _handle_custom_msg(self, widget, content, buffers):
+        """Answer front-end requests for the bundled SVGs."""
+        if not isinstance(content, dict) or content.get('type') != 'request_svg':
+            return
+        
+        sex = content.get('sex')
+        minimized = bool(content.get('minimized', self.minimized_svg))
+        try:
+            svg = load_bundled_svg(sex, minimized=minimized)
+            index = load_bundled_index(sex, minimized=minimized)
+        except (ValueError, OSError) as e:
+            self.send({'type': 'svg', 'sex': sex, 'minimized': minimized, 'error': str(e)})
+            return
+        # The index lets the front end map UBERON ids to shapes without scanning the DOM
+        self.send({'type': 'svg', 'sex': sex, 'minimized': minimized, 'index': index}, buffers=[svg])
+    
+    @traitlets.validate('transport')
+    def _validate_transport(self, proposal):
+        if proposal['value'] not in ('json', 'binary'):
+            raise traitlets.TraitError(f"transport must be 'json' or 'binary', got {proposal['value']!r}")
+        return proposal['value']
+    
+    @traitlets.observe('selected_gene', 'matrix', 'transport')
+    def _push_gene_values(self, change):
+        """Send the selected gene's tissue values when using a Python-side matrix."""
+        if self.matrix is None or self._defer(self._push_gene_values):
+            return
+        
+        if self.transport == 'binary':
+            self.gene_values = {}
+            self.tissue_index = self.matrix.tissues.tolist()
+            self.gene_buffer = self._gene_vector_bytes(self.selected_gene)
+        elif self.selected_gene in self.matrix:
+            self.gene_buffer = b""
+            self.gene_values = self.matrix.gene_values(self.selected_gene)
+        else:
+            self.gene_buffer = b""
+            self.gene_values = {}
+    
+    @traitlets.observe('selected_genes', 'matrix')
+    def _push_panel(self, change):
+        """Send every panel gene in one float32 payload when using a Python-side matrix."""
+        if self._defer(self._push_panel):
+            return
+        if self.matrix is None or not self.selected_genes:
+            self.panel_buffer = b""
+            return
+        self.tissue_index = self.matrix.tissues.tolist()
+        self.panel_buffer = self._panel_bytes(self.selected_genes)
+    
+    @traitlets.validate('color_mode')
+    def _validate_color_mode(self, proposal):
+        if proposal['value'] not in ('client', 'server'):
+            raise traitlets.TraitError(f"color_mode must be 'client' or 'server', got {proposal['value']!r}")
+        return proposal['value']
+    
+    @traitlets.observe('selected_gene', 'matrix', 'expression_data', 'color_mode',
+                       'color_palette', 'scale_type', 'threshold')
+    def _push_tissue_colors(self, change):
+        """Recompute the synced per-tissue colors in server color mode."""
+        if self._defer(self._push_tissue_colors):
+            return
+        if self.color_mode != 'server':
+            if self.tissue_colors:
+                self.tissue_colors = {}
+            return
+        self.tissue_colors = self.compute_tissue_colors()
+    
+    def compute_tissue_colors(self):
+        """Compute ``{uberon_id: "#rrggbb"}`` for the selected gene with the current settings.
+        
+        Uses the same scale and threshold rules as the front end. Tissues that
+        are missing or below the threshold are left out (drawn gray).
+        """
+        tissues, values = self._selected_gene_vector()
+        if tissues is None:
+            return {}
+        
+        palette = self.color_palette if self.color_palette in PALETTES else DEFAULT_PALETTE
+        return tissue_colors(tissues, values, palette=palette,
+                             scale_type=self.scale_type, threshold=self.threshold)
+    
+    def _selected_gene_vector(self):
+        """The selected gene as (tissue ids, values), or (None, None) if unavailable."""
+        gene = self.selected_gene
+        if self.matrix is not None:
+            if gene not in self.matrix:
+                return None, None
+            return self.matrix.tissues, self.matrix.gene_vector(gene)
+        
+        genes = self.expression_data.get('genes', {}) if self.expression_data else {}
+        if gene not in genes:
+            return None, None
+        gene_data = genes[gene]
+        return list(gene_data.keys()), np.fromiter(gene_data.values(), dtype=np.float64, count=len(gene_data))
+    
+    def _gene_vector_bytes(self, gene: str) -> bytes:
+        """Encode a gene's row as little-endian float32 (empty if the gene is unknown)."""
+        if gene not in self.matrix:
+            return b""
+        return np.asarray(self.matrix.gene_vector(gene), dtype='<f4').tobytes()
+    
+    def _panel_bytes(self, genes) -> bytes:
+        """Encode genes as consecutive little-endian float32 rows (NaN rows for unknown genes)."""
+        rows = np.full((len(genes), self.matrix.n_tissues), np.nan, dtype='<f4')
+        for row, gene in zip(rows, genes):
+            if gene in self.matrix:
+                row[:] = self.matrix.gene_vector(gene)
+        return rows.tobytes()
     
     def update_gene(self, gene: str):
         """Update the selected gene programmatically."""
-        if self.expression_data and 'genes' in self.expression_data:
+        if self.matrix is not None:
+            if gene not in self.matrix:
+                raise ValueError(f"Gene '{gene}' not found in expression data")
+            self.selected_gene = gene
+        elif self.expression_data and 'genes' in self.expression_data:
             if gene in self.expression_data['genes']:
                 self.selected_gene = gene
             else:
@@ -396,6 +972,8 @@ class AnatomogramWidget(anywidget.AnyWidget):
     
     def get_available_genes(self):
         """Get list of available genes from the expression data."""
+        if self.matrix is not None:
+            return sorted(self.matrix.genes.tolist())
         if self.expression_data and 'genes' in self.expression_data:
             return sorted(self.expression_data['genes'].keys())
         return []
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""Parquet and Arrow IPC (Feather) input/output for expression matrices.
+
+Tables use the same wide layout as the CSV format: the first column holds
+gene names and every other column is one UBERON id. pyarrow is an
+optional dependency and is only imported when one of these formats is
+used.
+"""
+
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union, BinaryIO
+
+import numpy as np
+import pandas as pd
+
+from .expression_matrix import ExpressionMatrix, ExpressionMatrixBuilder
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+IPC_SUFFIXES = ('.arrow', '.feather', '.ipc')
+TABLE_FORMATS = ('parquet', 'ipc')
+
+# Name of the gene column in written tables
+GENE_COLUMN = "Gene"
+
+DEFAULT_BATCH_ROWS = 10_000
+
+TableSource = Union[str, Path, bytes, BinaryIO]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow files need the optional pyarrow package: pip install pyarrow")
+    return pyarrow
+
+
+def table_format(filename: str) -> Optional[str]:
+    """'parquet' or 'ipc' for a table file name, None for anything else."""
+    name = filename.lower()
+    if name.endswith(PARQUET_SUFFIXES):
+        return 'parquet'
+    if name.endswith(IPC_SUFFIXES):
+        return 'ipc'
+    return None
+
+
+def _source_size(source: TableSource) -> Optional[int]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    if isinstance(source, (str, Path)):
+        return Path(source).stat().st_size
+    return None
+
+
+def _open_batches(pa, source: TableSource, fmt: str, tissues: Optional[Iterable[str]],
+                  batch_rows: int) -> Tuple[str, list, Optional[int], Iterator[Any]]:
+    """Open a table and return (gene column, tissue columns, row count, record batches).
+
+    Only the gene column and the projected tissue columns are read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = pa.BufferReader(pa.py_buffer(source))
+    elif isinstance(source, (str, Path)):
+        source = str(source) if fmt == 'parquet' else pa.memory_map(str(source))
+
+    if fmt == 'parquet':
+        parquet_file = pa.parquet.ParquetFile(source)
+        schema = parquet_file.schema_arrow
+        total_rows = parquet_file.metadata.num_rows
+    else:
+        try:
+            reader = pa.ipc.open_file(source)
+            total_rows = reader.count_rows()
+        except pa.ArrowInvalid:
+            # Not the random-access file format: read it as an IPC stream
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            total_rows = None
+        schema = reader.schema
+
+    if len(schema.names) < 2:
+        raise ValueError("Table needs a gene column and at least one tissue column")
+    gene_column = schema.names[0]
+    tissue_columns = schema.names[1:]
+    if tissues is not None:
+        wanted = set(str(tissue) for tissue in tissues)
+        tissue_columns = [name for name in tissue_columns if name in wanted]
+    columns = [gene_column] + tissue_columns
+
+    if fmt == 'parquet':
+        batches = parquet_file.iter_batches(batch_size=batch_rows, columns=columns)
+    elif total_rows is not None:
+        batches = (reader.get_batch(i).select(columns) for i in range(reader.num_record_batches))
+    else:
+        batches = (batch.select(columns) for batch in reader)
+    return gene_column, tissue_columns, total_rows, batches
+
+
+def _batch_values(pa, batch, tissue_columns: list) -> np.ndarray:
+    """The tissue columns of a record batch as a float64 block, NaN for nulls and non-numbers."""
+    values = np.empty((batch.num_rows, len(tissue_columns)), dtype=np.float64)
+    for col, name in enumerate(tissue_columns):
+        column = batch.column(name)
+        kind = column.type
+        if pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_decimal(kind):
+            values[:, col] = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+        else:
+            values[:, col] = pd.to_numeric(column.to_pandas(), errors='coerce').to_numpy(
+                dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def read_matrix(source: TableSource, fmt: str, tissues: Optional[Iterable[str]] = None,
+                batch_rows: int = DEFAULT_BATCH_ROWS,
+                progress: Optional[Callable[[int, int, Optional[int]], None]] = None) -> ExpressionMatrix:
+    """Read a wide gene x UBERON Parquet or Arrow IPC table into an ExpressionMatrix.
+
+    Record batches are appended to the matrix one at a time. Null and
+    non-numeric cells are treated as missing and genes without any value
+    are dropped, as in the CSV loader.
+
+    Args:
+        source: File path, raw file content or an open binary file
+        fmt: 'parquet' or 'ipc' (Arrow IPC file or stream, including Feather v2)
+        tissues: Only read these UBERON columns (None reads every column)
+        batch_rows: Rows per Parquet record batch
+        progress: Optional callback, called as ``progress(genes_loaded, bytes_read,
+            total_bytes)`` after every batch; bytes are estimated from the rows read
+
+    Returns:
+        ExpressionMatrix with one column per (projected) tissue column
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unsupported table format: {fmt}")
+    pa = _import_pyarrow()
+
+    total_bytes = _source_size(source)
+    gene_column, tissue_columns, total_rows, batches = _open_batches(
+        pa, source, fmt, tissues, batch_rows)
+
+    builder = ExpressionMatrixBuilder(tissue_columns, capacity=total_rows or DEFAULT_BATCH_ROWS)
+    rows_read = 0
+    for batch in batches:
+        values = _batch_values(pa, batch, tissue_columns)
+        has_values = ~np.isnan(values).all(axis=1)
+        genes = np.asarray(batch.column(gene_column).to_pylist(), dtype=object)
+        builder.append(genes[has_values], values[has_values])
+        rows_read += batch.num_rows
+
+        if progress is not None:
+            fraction = rows_read / total_rows if total_rows else None
+            bytes_read = int(total_bytes * fraction) if total_bytes and fraction is not None else 0
+            progress(builder.n_genes, bytes_read, total_bytes)
+
+    return builder.build()
+
+
+def matrix_to_arrow(matrix: ExpressionMatrix):
+    """Convert a matrix to a wide ``pyarrow.Table`` (gene column, then one column per tissue).
+
+    Missing cells become nulls; values keep the matrix dtype.
+    """
+    pa = _import_pyarrow()
+    columns = [pa.array(matrix.genes.tolist(), type=pa.string())]
+    columns += [pa.array(matrix.values[:, col], from_pandas=True) for col in range(matrix.n_tissues)]
+    return pa.table(columns, names=[GENE_COLUMN] + matrix.tissues.tolist())
+
+
+def write_matrix(matrix: ExpressionMatrix, sink: Union[str, Path, BinaryIO], fmt: str,
+                 compression: str = 'zstd'):
+    """Write a matrix as a Parquet or Arrow IPC (Feather v2) file.
+
+    Args:
+        matrix: Expression matrix to write
+        sink: Output path or binary file
+        fmt: 'parquet' or 'ipc'
+        compression: Codec name understood by pyarrow ('zstd', 'lz4', 'snappy', 'uncompressed')
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unsupported table format: {fmt}")
+    pa = _import_pyarrow()
+
+    table = matrix_to_arrow(matrix)
+    if isinstance(sink, Path):
+        sink = str(sink)
+    if fmt == 'parquet':
+        pa.parquet.write_table(table, sink, compression=compression)
+    else:
+        pa.feather.write_feather(table, sink, compression=compression)
+
+
+def matrix_to_bytes(matrix: ExpressionMatrix, fmt: str, compression: str = 'zstd') -> bytes:
+    """Serialize a matrix to Parquet or Arrow IPC bytes (for downloads)."""
+    buffer = BytesIO()
+    write_matrix(matrix, buffer, fmt, compression=compression)
+    return buffer.getvalue()
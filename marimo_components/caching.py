@@ -0,0 +1,321 @@
+"""Dataset fingerprints and a bounded cache for artifacts derived from them.
+
+Derived artifacts (sorted gene lists, tissue sets, summary statistics,
+per-gene summaries, normalized matrices) are keyed by a content fingerprint of the matrix they
+were computed from, so a reloaded or re-run dataset hits the cache while
+any change to its values or labels misses it. With a ``cache_dir`` the
+artifacts, and the matrices loaded from files, also persist across
+sessions; the directory is kept under a size cap by dropping the entries
+used least recently.
+
+A matrix's fingerprint is computed once and remembered for as long as the
+matrix keeps the same arrays. Code that writes into those arrays in place
+must call :func:`forget_fingerprint` afterwards.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .expression_matrix import ExpressionMatrix, STORE_INDEX_FILE
+from .sparse_matrix import SparseExpressionMatrix
+
+DEFAULT_MAX_ENTRIES = 32
+
+DEFAULT_MAX_DISK_BYTES = 2 << 30
+
+_ARTIFACT_DIR = "artifacts"
+_MATRIX_DIR = "matrices"
+
+# Fingerprint of each matrix, with weak references to the arrays it was computed
+# from; replacing one of them (``matrix.values = ...``) makes the entry stale
+_fingerprints: 'weakref.WeakKeyDictionary[Any, Tuple[tuple, str]]' = weakref.WeakKeyDictionary()
+
+
+def _hasher():
+    # sha256 is hardware-accelerated on current CPUs and hashes a 60k-gene
+    # float32 block about twice as fast as blake2b
+    return hashlib.sha256()
+
+
+def _hexdigest(digest) -> str:
+    return digest.hexdigest()[:32]
+
+
+def fingerprint(data: Any) -> Optional[str]:
+    """Content hash of a dense or sparse matrix: values, dtype, shape and labels.
+
+    Returns None for anything else (nested dicts are not fingerprinted;
+    hashing them would cost about as much as the work being cached). The
+    result is remembered per matrix; see :func:`forget_fingerprint`.
+    """
+    if isinstance(data, ExpressionMatrix):
+        arrays = (data.values, data.genes, data.tissues)
+    elif isinstance(data, SparseExpressionMatrix):
+        arrays = (data.data, data.indices, data.indptr, data.genes, data.tissues)
+    else:
+        return None
+
+    known = _fingerprints.get(data)
+    if known is not None and len(known[0]) == len(arrays) and all(
+            ref() is array for ref, array in zip(known[0], arrays)):
+        return known[1]
+
+    digest = _hasher()
+    digest.update(type(data).__name__.encode())
+    for array in arrays:
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(np.ascontiguousarray(array).data)
+    key = _hexdigest(digest)
+    _fingerprints[data] = (tuple(weakref.ref(array) for array in arrays), key)
+    return key
+
+
+def forget_fingerprint(data: Any):
+    """Drop the remembered fingerprint of a matrix whose arrays were modified in place."""
+    _fingerprints.pop(data, None)
+
+
+def source_fingerprint(source: Any) -> Optional[str]:
+    """Fingerprint of a file before it is parsed.
+
+    Paths are identified by resolved path, size and modification time;
+    in-memory content (an upload) by a hash of its bytes. Open file
+    objects return None.
+    """
+    digest = _hasher()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(b'bytes\0')
+        digest.update(source)
+    elif isinstance(source, (str, Path)):
+        path = Path(source).resolve()
+        stat = path.stat()
+        digest.update(f"path\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+    else:
+        return None
+    return _hexdigest(digest)
+
+
+def fingerprint_key(*parts: Any) -> str:
+    """Combine a fingerprint with load parameters into one cache key."""
+    digest = _hasher()
+    digest.update(repr(parts).encode())
+    return _hexdigest(digest)
+
+
+def _touch(path: Path):
+    """Mark a disk entry as just used (its mtime orders the eviction)."""
+    now = time.time_ns()
+    try:
+        os.utime(path, ns=(now, now))
+    except OSError:
+        pass
+
+
+def _disk_size(path: Path) -> int:
+    if not path.is_dir():
+        return path.stat().st_size
+    return sum(child.stat().st_size for child in path.rglob('*') if child.is_file())
+
+
+def _detach(value: Any) -> Any:
+    """A copy of a cached value that callers can modify freely."""
+    return value.copy() if hasattr(value, 'copy') else value
+
+
+class ArtifactCache:
+    """Least-recently-used cache of artifacts keyed by (fingerprint, artifact name).
+
+    Values are copied on the way in and out, so a caller mutating a returned
+    list or normalizing a returned matrix in place does not change the
+    cached entry. With ``cache_dir`` every artifact is also pickled to disk
+    and looked up there on a memory miss. Each entry of the directory (an
+    artifact file, a matrix store, a folder of thumbnails) counts towards
+    ``max_disk_bytes``; after a write the least recently used entries are
+    deleted until the directory fits again.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Artifacts kept in memory; 0 disables caching entirely
+            cache_dir: Optional directory for the persistent cache, created if missing
+            max_disk_bytes: Size cap of ``cache_dir``
+        """
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: 'OrderedDict[tuple, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._entries
+
+    def clear(self):
+        """Drop every in-memory entry (the disk cache is left alone)."""
+        self._entries.clear()
+
+    def _remember(self, key: tuple, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _artifact_path(self, key: tuple) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        name = _hasher()
+        name.update(repr(key[1]).encode())
+        return self.cache_dir / _ARTIFACT_DIR / f"{key[0]}-{_hexdigest(name)}.pkl"
+
+    def _read_disk(self, key: tuple) -> Any:
+        path = self._artifact_path(key)
+        if path is None or not path.exists():
+            raise KeyError(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception:
+            # A truncated or stale file is just a miss
+            raise KeyError(key)
+        _touch(path)
+        return value
+
+    def _write_disk(self, key: tuple, value: Any):
+        path = self._artifact_path(key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            return
+        _touch(path)
+        self.trim_disk(keep=path)
+
+    def _disk_entries(self) -> List[Tuple[int, Path]]:
+        """``(mtime_ns, path)`` of every entry one level below the cache folders."""
+        entries = []
+        for folder in self.cache_dir.iterdir() if self.cache_dir.is_dir() else ():
+            if not folder.is_dir():
+                continue
+            for entry in folder.iterdir():
+                # Skip writes in progress
+                if entry.name.startswith('.tmp') or entry.name.endswith('.tmp'):
+                    continue
+                entries.append((entry.stat().st_mtime_ns, entry))
+        return entries
+
+    def trim_disk(self, keep: Optional[Path] = None):
+        """Delete the least recently used disk entries until ``cache_dir`` fits ``max_disk_bytes``.
+
+        Args:
+            keep: An entry that is never deleted (the one just written)
+        """
+        if self.cache_dir is None:
+            return
+        try:
+            entries = sorted((mtime, _disk_size(path), path) for mtime, path in self._disk_entries())
+        except OSError:
+            # Another process is trimming the same directory
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            total -= size
+
+    def get_or_compute(self, fingerprint: str, artifact: Any, compute: Callable[[], Any]) -> Any:
+        """Return the cached artifact, computing and storing it on a miss.
+
+        Args:
+            fingerprint: Fingerprint of the dataset the artifact derives from
+            artifact: Hashable artifact name, including any parameters
+            compute: Called with no arguments to build the artifact on a miss
+
+        Returns:
+            A copy of the cached (or freshly computed) artifact
+        """
+        if not self.enabled:
+            return compute()
+
+        key = (fingerprint, artifact)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return _detach(self._entries[key])
+
+        try:
+            value = self._read_disk(key)
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            self._write_disk(key, value)
+        self._remember(key, _detach(value))
+        return value
+
+    def open_matrix(self, key: str) -> Optional[ExpressionMatrix]:
+        """Memory-map the matrix stored under ``key`` on disk, or None if there is none.
+
+        The map is copy-on-write, so the matrix is writable like a freshly
+        parsed one; changes stay in memory and never reach the store.
+        """
+        if self.cache_dir is None or not self.enabled:
+            return None
+        path = self.cache_dir / _MATRIX_DIR / key
+        if not (path / STORE_INDEX_FILE).exists():
+            return None
+        try:
+            matrix = ExpressionMatrix.open(path, mmap_mode='c')
+        except (ValueError, OSError):
+            return None
+        _touch(path)
+        return matrix
+
+    def save_matrix(self, key: str, matrix: ExpressionMatrix):
+        """Store a loaded matrix on disk under ``key`` (no-op without a cache_dir)."""
+        if self.cache_dir is None or not self.enabled:
+            return
+        root = self.cache_dir / _MATRIX_DIR
+        root.mkdir(parents=True, exist_ok=True)
+        # Write to a scratch directory and rename, so readers never see half a store
+        tmp = Path(tempfile.mkdtemp(dir=root, prefix='.tmp-'))
+        try:
+            matrix.save(tmp)
+            os.replace(tmp, root / key)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        _touch(root / key)
+        self.trim_disk(keep=root / key)
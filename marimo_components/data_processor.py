@@ -3,15 +3,54 @@
 import json
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Set, Tuple, Any, Union
+from contextlib import contextmanager
+from typing import Dict, List, Set, Tuple, Any, Union, Callable, Optional, BinaryIO, Iterable
 from io import StringIO, BytesIO
+from pathlib import Path
+
+from . import arrow_io, caching, normalization, specificity, validation
+from .expression_matrix import ExpressionMatrix, ExpressionMatrixBuilder
+from .json_stream import DEFAULT_CHUNK_BYTES, JsonGeneReader
+from .sparse_matrix import SparseExpressionMatrix
+from .tissue_ranking import TissueRanking
+
+# Expression data is the nested {"genes": {...}} dict, a dense matrix or a sparse (CSR) matrix
+ExpressionData = Union[Dict[str, Any], ExpressionMatrix, SparseExpressionMatrix]
+
+# Streaming loaders read from a path, an in-memory upload or an open binary file
+DataSource = Union[str, Path, bytes, BinaryIO]
+
+# Called as progress(genes_loaded, bytes_read, total_bytes); total_bytes may be None
+ProgressCallback = Callable[[int, int, Optional[int]], None]
+
+DEFAULT_CHUNK_ROWS = 10_000
 
 
 class ExpressionDataProcessor:
     """Process and validate gene expression data for anatomogram visualization."""
     
-    def __init__(self):
-        self.supported_formats = ['.json', '.csv', '.tsv']
+    def __init__(self, cache_size: int = caching.DEFAULT_MAX_ENTRIES,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 cache_disk_bytes: int = caching.DEFAULT_MAX_DISK_BYTES):
+        """Create a processor.
+
+        Args:
+            cache_size: Derived artifacts (gene lists, statistics, normalized
+                matrices) kept in memory per dataset fingerprint; 0 disables caching
+            cache_dir: Optional directory where loaded matrices and derived
+                artifacts persist between sessions
+            cache_disk_bytes: Size cap of ``cache_dir``; the least recently
+                used entries are deleted beyond it
+        """
+        self.supported_formats = ['.json', '.csv', '.tsv', '.parquet', '.feather', '.arrow']
+        self.cache = caching.ArtifactCache(cache_size, cache_dir, cache_disk_bytes)
+
+    def _cached(self, data: ExpressionData, artifact: Any, compute: Callable[[], Any]) -> Any:
+        """Memoize ``compute()`` under the data's fingerprint (dicts are never cached)."""
+        key = caching.fingerprint(data) if self.cache.enabled else None
+        if key is None:
+            return compute()
+        return self.cache.get_or_compute(key, artifact, compute)
     
     def load_json(self, file_content: bytes) -> Dict[str, Any]:
         """Load expression data from JSON content.
@@ -39,61 +78,377 @@ class ExpressionDataProcessor:
         Expected format:
         - First column: Gene names
         - Subsequent columns: UBERON IDs as headers
-        
+
+        Non-numeric and empty cells are skipped, and genes without any
+        numeric value are dropped.
+
         Args:
             file_content: Raw file content as bytes
             sep: Separator character (',' for CSV, '\t' for TSV)
-            
+
         Returns:
             Dictionary in standard format with 'genes' key
         """
         try:
             # Read CSV/TSV into DataFrame
             df = pd.read_csv(BytesIO(file_content), sep=sep)
-            
+
             # Check if first column contains gene names
             if df.empty:
                 raise ValueError("CSV file is empty")
-            
-            # Get gene column (first column)
-            gene_col = df.columns[0]
-            genes_dict = {}
-            
-            # Convert each row to gene expression dict
-            for _, row in df.iterrows():
-                gene_name = str(row[gene_col])
-                # Get expression values for all tissues (skip gene column)
-                tissue_values = {}
-                for col in df.columns[1:]:
-                    try:
-                        # Ensure numeric value
-                        value = float(row[col])
-                        tissue_values[col] = value
-                    except (ValueError, TypeError):
-                        # Skip non-numeric values
-                        continue
-                
-                if tissue_values:  # Only add if there are valid values
-                    genes_dict[gene_name] = tissue_values
-            
-            return {"genes": genes_dict}
-            
+
+            gene_names = df.iloc[:, 0].astype(str).tolist()
+            tissue_cols = list(df.columns[1:])
+
+            # Coerce the whole tissue block at once; non-numeric cells become NaN
+            values = self._coerce_numeric(df.iloc[:, 1:])
+
+            return {"genes": self._rows_to_gene_dict(gene_names, tissue_cols, values)}
+
         except Exception as e:
             raise ValueError(f"Error loading CSV: {e}")
+
+    @staticmethod
+    def _coerce_numeric(block: pd.DataFrame) -> np.ndarray:
+        """Convert a DataFrame block to a float64 array with NaN for non-numeric cells."""
+        numeric = block.apply(pd.to_numeric, errors='coerce')
+        return numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @staticmethod
+    def _rows_to_gene_dict(gene_names: List[str], tissue_cols: List[Any],
+                           values: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """Build the nested ``{gene: {tissue: value}}`` mapping from a dense block.
+
+        NaN cells are left out and rows without any value are dropped. Later
+        rows overwrite earlier rows with the same gene name.
+        """
+        rows, cols = np.nonzero(~np.isnan(values))
+        if rows.size == 0:
+            return {}
+
+        flat_values = values[rows, cols].tolist()
+        flat_tissues = np.asarray(tissue_cols, dtype=object)[cols].tolist()
+
+        # rows is sorted, so each gene's cells form one contiguous run
+        present, starts = np.unique(rows, return_index=True)
+        ends = np.append(starts[1:], rows.size)
+
+        genes_dict = {}
+        for row, start, end in zip(present.tolist(), starts.tolist(), ends.tolist()):
+            genes_dict[gene_names[row]] = dict(zip(flat_tissues[start:end], flat_values[start:end]))
+        return genes_dict
     
-    def load_file(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    def load_csv_stream(self, source: DataSource, sep: str = ',',
+                        chunksize: int = DEFAULT_CHUNK_ROWS,
+                        progress: Optional[ProgressCallback] = None) -> ExpressionMatrix:
+        """Load a CSV/TSV into an ExpressionMatrix, ``chunksize`` gene rows at a time.
+
+        Same layout and cell rules as ``load_csv``, but each chunk is coerced
+        and appended straight into a growable float32 block, so the full
+        table is never held as a DataFrame or nested dict.
+
+        Args:
+            source: File path, raw file content or an open binary file
+            sep: Separator character (',' for CSV, '\t' for TSV)
+            chunksize: Number of gene rows parsed per chunk
+            progress: Optional callback, called after every chunk
+
+        Returns:
+            ExpressionMatrix with one column per tissue column of the file
+        """
+        try:
+            with self._open_source(source) as (f, total_bytes):
+                start = f.tell()
+                reader = pd.read_csv(f, sep=sep, chunksize=chunksize, dtype={0: str})
+                builder = None
+                rows_read = 0
+
+                for chunk in reader:
+                    if builder is None:
+                        builder = ExpressionMatrixBuilder(chunk.columns[1:])
+
+                    values = self._coerce_numeric(chunk.iloc[:, 1:])
+                    has_values = ~np.isnan(values).all(axis=1)
+                    gene_names = chunk.iloc[:, 0].astype(str).to_numpy()
+                    builder.append(gene_names[has_values], values[has_values])
+                    rows_read += len(chunk)
+
+                    bytes_read = f.tell() - start
+                    if rows_read == len(chunk) and total_bytes and bytes_read < total_bytes:
+                        # Preallocate from the first chunk's bytes per row
+                        builder.reserve(int(rows_read * total_bytes / max(bytes_read, 1) * 1.05))
+                    if progress is not None:
+                        progress(builder.n_genes, min(bytes_read, total_bytes or bytes_read), total_bytes)
+
+                if builder is None or rows_read == 0:
+                    raise ValueError("CSV file is empty")
+                return builder.build()
+
+        except Exception as e:
+            raise ValueError(f"Error loading CSV: {e}")
+
+    def load_json_stream(self, source: DataSource, chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                         progress: Optional[ProgressCallback] = None) -> ExpressionMatrix:
+        """Load a ``{"genes": {...}}`` JSON file into an ExpressionMatrix, one gene at a time.
+
+        The file is read ``chunk_bytes`` at a time and each gene is checked
+        and written into the matrix as soon as its entry is parsed, so the
+        nested dict is never built and the first bad entry stops the load.
+
+        Args:
+            source: File path, raw file content or an open binary file
+            chunk_bytes: Number of bytes read per chunk
+            progress: Optional callback, called after every chunk
+
+        Returns:
+            ExpressionMatrix with columns in order of first appearance
+
+        Raises:
+            ValueError: On malformed JSON or the first gene entry that is not
+                a ``{uberon_id: number}`` mapping
+        """
+        with self._open_source(source) as (f, total_bytes):
+            reader = JsonGeneReader(f, chunk_bytes=chunk_bytes)
+            builder = ExpressionMatrixBuilder()
+            reported = 0
+
+            for gene, tissues in reader.genes():
+                self._check_gene_entry(gene, tissues)
+                builder.append_gene(gene, tissues)
+
+                if progress is not None and reader.bytes_read != reported:
+                    reported = reader.bytes_read
+                    progress(builder.n_genes, reported, total_bytes)
+
+            if progress is not None:
+                progress(builder.n_genes, reader.bytes_read, total_bytes)
+            return builder.build()
+
+    @staticmethod
+    def _check_gene_entry(gene: str, tissues: Any):
+        """Raise ValueError unless ``tissues`` is a ``{uberon_id: number}`` mapping."""
+        if not isinstance(tissues, dict):
+            raise ValueError(f"Expression values for gene '{gene}' must be a dictionary")
+        for tissue, value in tissues.items():
+            if not validation.is_numeric(value):
+                raise ValueError(
+                    f"Expression value for {gene}/{tissue} must be numeric, got {type(value).__name__}"
+                )
+
+    def load_long(self, source: DataSource, filename: Optional[str] = None,
+                  gene_col: Optional[str] = None, tissue_col: Optional[str] = None,
+                  value_col: Optional[str] = None, chunksize: int = DEFAULT_CHUNK_ROWS,
+                  progress: Optional[ProgressCallback] = None) -> SparseExpressionMatrix:
+        """Load a long/tidy CSV/TSV table of (gene, UBERON id, value) records.
+
+        Records are read ``chunksize`` rows at a time; gene and tissue names
+        are encoded to integer codes per chunk, and the coordinates are
+        assembled into a CSR SparseExpressionMatrix at the end, so unmeasured
+        cells never take memory. Non-numeric and empty values are skipped,
+        genes left without any value are dropped, and for repeated
+        (gene, tissue) pairs the last record wins.
+
+        Args:
+            source: File path, raw file content or an open binary file
+            filename: Name used to pick the separator (defaults to the path's name)
+            gene_col: Gene column name (default: first column)
+            tissue_col: UBERON id column name (default: second column)
+            value_col: Value column name (default: third column)
+            chunksize: Number of records parsed per chunk
+            progress: Optional callback, called after every chunk
+
+        Returns:
+            SparseExpressionMatrix with genes and tissues in order of first appearance
+        """
+        filename = self._source_name(source, filename)
+        sep = '\t' if filename.lower().endswith('.tsv') else ','
+
+        names = (gene_col, tissue_col, value_col)
+        if all(name is None for name in names):
+            usecols = [0, 1, 2]
+        elif any(name is None for name in names):
+            raise ValueError("Give all of gene_col, tissue_col and value_col, or none of them")
+        else:
+            usecols = list(names)
+
+        gene_codes: Dict[str, int] = {}
+        tissue_codes: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        n_records = 0
+
+        try:
+            with self._open_source(source) as (f, total_bytes):
+                start = f.tell()
+                reader = pd.read_csv(f, sep=sep, usecols=usecols, chunksize=chunksize,
+                                     dtype={usecols[0]: str, usecols[1]: str})
+                for chunk in reader:
+                    if isinstance(usecols[0], str):
+                        chunk = chunk[usecols]
+                    rows.append(self._encode_labels(chunk.iloc[:, 0], gene_codes))
+                    cols.append(self._encode_labels(chunk.iloc[:, 1], tissue_codes))
+                    values.append(self._coerce_numeric(chunk.iloc[:, [2]])[:, 0].astype(np.float32))
+                    n_records += len(chunk)
+
+                    if progress is not None:
+                        bytes_read = f.tell() - start
+                        progress(len(gene_codes), min(bytes_read, total_bytes or bytes_read), total_bytes)
+        except Exception as e:
+            raise ValueError(f"Error loading long-format table: {e}")
+
+        if n_records == 0:
+            raise ValueError("Long-format table is empty")
+
+        matrix = SparseExpressionMatrix.from_coordinates(
+            np.concatenate(rows), np.concatenate(cols), np.concatenate(values),
+            list(gene_codes), list(tissue_codes)
+        )
+        if np.any(matrix.row_counts() == 0):
+            matrix = matrix.filter_cells(np.ones(matrix.nnz, dtype=bool))
+        return matrix
+
+    @staticmethod
+    def _encode_labels(labels: pd.Series, codes: Dict[str, int]) -> np.ndarray:
+        """Map labels to integer codes, adding unseen labels to ``codes`` in order."""
+        local, uniques = pd.factorize(labels.astype(str), sort=False)
+        mapping = np.fromiter((codes.setdefault(label, len(codes)) for label in uniques),
+                              dtype=np.int32, count=len(uniques))
+        return mapping[local]
+
+    @staticmethod
+    @contextmanager
+    def _open_source(source: DataSource):
+        """Yield ``(binary file, size in bytes or None)`` for any DataSource.
+
+        Paths are opened and closed here; file objects passed in are left open.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            yield BytesIO(source), len(source)
+        elif isinstance(source, (str, Path)):
+            with open(source, 'rb') as f:
+                yield f, Path(source).stat().st_size
+        else:
+            total_bytes = None
+            if source.seekable():
+                position = source.tell()
+                total_bytes = source.seek(0, 2) - position
+                source.seek(position)
+            yield source, total_bytes
+
+    def load_table(self, source: DataSource, filename: Optional[str] = None,
+                   tissues: Optional[Iterable[str]] = None,
+                   chunksize: int = DEFAULT_CHUNK_ROWS,
+                   progress: Optional[ProgressCallback] = None) -> ExpressionMatrix:
+        """Load a wide gene x UBERON Parquet or Arrow IPC/Feather table.
+
+        Requires the optional ``pyarrow`` package. Columnar files are read
+        one record batch at a time, and with ``tissues`` only the gene
+        column and those UBERON columns are read from disk.
+
+        Args:
+            source: File path, raw file content or an open binary file
+            filename: Name used to pick the format (defaults to the path's name)
+            tissues: UBERON ids to read (None reads every tissue column)
+            chunksize: Number of gene rows per Parquet record batch
+            progress: Optional callback, called after every batch
+
+        Returns:
+            ExpressionMatrix with one column per (projected) tissue column
+        """
+        fmt = arrow_io.table_format(self._source_name(source, filename))
+        if fmt is None:
+            raise ValueError("Table files must be Parquet (.parquet) or Arrow IPC (.arrow, .feather)")
+        try:
+            return arrow_io.read_matrix(source, fmt, tissues=tissues, batch_rows=chunksize,
+                                        progress=progress)
+        except ImportError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error loading table: {e}")
+
+    @staticmethod
+    def _source_name(source: DataSource, filename: Optional[str]) -> str:
+        if filename is not None:
+            return filename
+        if not isinstance(source, (str, Path)):
+            raise ValueError("A filename is needed to detect the format of in-memory data")
+        return Path(source).name
+
+    def load_matrix(self, source: DataSource, filename: Optional[str] = None,
+                    chunksize: int = DEFAULT_CHUNK_ROWS,
+                    progress: Optional[ProgressCallback] = None,
+                    tissues: Optional[Iterable[str]] = None) -> ExpressionMatrix:
+        """Load expression data straight into an ExpressionMatrix.
+
+        CSV and TSV files are streamed with ``load_csv_stream``, JSON files
+        with ``load_json_stream`` and Parquet/Arrow files with ``load_table``.
+        With a ``cache_dir`` the parsed matrix is stored there and later
+        loads of the same file are memory-mapped from the store.
+
+        Args:
+            source: File path, raw file content or an open binary file
+            filename: Name used to pick the format (defaults to the path's name)
+            chunksize: Number of gene rows parsed per chunk (CSV/TSV) or batch (Parquet)
+            progress: Optional callback, called after every chunk
+            tissues: UBERON ids to read from Parquet/Arrow files (None reads all)
+
+        Returns:
+            ExpressionMatrix with the loaded values
+        """
+        filename = self._source_name(source, filename)
+
+        # A file loaded before (same path, size and mtime, or same bytes) is memory-mapped from the cache
+        key = None
+        if self.cache.cache_dir is not None:
+            key = caching.source_fingerprint(source)
+        if key is not None:
+            key = caching.fingerprint_key(key, filename.lower(), None if tissues is None else sorted(tissues))
+            matrix = self.cache.open_matrix(key)
+            if matrix is not None:
+                if progress is not None:
+                    total_bytes = (len(source) if isinstance(source, (bytes, bytearray, memoryview))
+                                   else Path(source).stat().st_size)
+                    progress(matrix.n_genes, total_bytes, total_bytes)
+                return matrix
+
+        matrix = self._load_matrix(source, filename, chunksize, progress, tissues)
+        if key is not None:
+            self.cache.save_matrix(key, matrix)
+        return matrix
+
+    def _load_matrix(self, source: DataSource, filename: str, chunksize: int,
+                     progress: Optional[ProgressCallback],
+                     tissues: Optional[Iterable[str]]) -> ExpressionMatrix:
+        filename_lower = filename.lower()
+
+        if arrow_io.table_format(filename) is not None:
+            return self.load_table(source, filename, tissues=tissues, chunksize=chunksize,
+                                   progress=progress)
+        elif filename_lower.endswith('.csv'):
+            return self.load_csv_stream(source, sep=',', chunksize=chunksize, progress=progress)
+        elif filename_lower.endswith('.tsv'):
+            return self.load_csv_stream(source, sep='\t', chunksize=chunksize, progress=progress)
+        elif filename_lower.endswith('.json'):
+            return self.load_json_stream(source, progress=progress)
+        else:
+            raise ValueError(f"Unsupported file format. Supported: {', '.join(self.supported_formats)}")
+
+    def load_file(self, file_content: bytes, filename: str,
+                  tissues: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """Load expression data from file content based on filename extension.
         
         Args:
             file_content: Raw file content
             filename: Original filename to determine format
+            tissues: UBERON ids to read from Parquet/Arrow files (None reads all)
             
         Returns:
             Processed expression data dictionary
         """
         filename_lower = filename.lower()
         
-        if filename_lower.endswith('.json'):
+        if arrow_io.table_format(filename) is not None:
+            return self.load_table(file_content, filename, tissues=tissues).to_dict()
+        elif filename_lower.endswith('.json'):
             return self.load_json(file_content)
         elif filename_lower.endswith('.csv'):
             return self.load_csv(file_content, sep=',')
@@ -102,117 +457,189 @@ class ExpressionDataProcessor:
         else:
             raise ValueError(f"Unsupported file format. Supported: {', '.join(self.supported_formats)}")
     
-    def validate_format(self, data: Dict[str, Any]) -> Tuple[bool, str]:
+    def to_matrix(self, data: ExpressionData) -> ExpressionMatrix:
+        """Convert expression data to a columnar ExpressionMatrix.
+
+        Args:
+            data: Expression data dictionary or matrix
+
+        Returns:
+            ExpressionMatrix (returned unchanged if already a matrix)
+        """
+        if isinstance(data, ExpressionMatrix):
+            return data
+        if isinstance(data, SparseExpressionMatrix):
+            return data.to_dense()
+        return ExpressionMatrix.from_dict(data)
+
+    def to_sparse(self, data: ExpressionData) -> SparseExpressionMatrix:
+        """Convert expression data to a CSR SparseExpressionMatrix.
+
+        Args:
+            data: Expression data dictionary or matrix
+
+        Returns:
+            SparseExpressionMatrix (returned unchanged if already sparse)
+        """
+        if isinstance(data, SparseExpressionMatrix):
+            return data
+        if isinstance(data, ExpressionMatrix):
+            return SparseExpressionMatrix.from_dense(data)
+        return SparseExpressionMatrix.from_dict(data)
+
+    def write_store(self, data: ExpressionData, path: Union[str, Path]) -> Path:
+        """Write expression data as a memory-mappable on-disk store.
+
+        Args:
+            data: Expression data dictionary or matrix
+            path: Store directory, created if missing
+
+        Returns:
+            Path of the store directory
+        """
+        return self.to_matrix(data).save(path)
+
+    def open_store(self, path: Union[str, Path]) -> ExpressionMatrix:
+        """Open an on-disk store without loading the value block into memory.
+
+        Args:
+            path: Store directory written by ``write_store``
+
+        Returns:
+            Memory-mapped ExpressionMatrix
+        """
+        return ExpressionMatrix.open(path, mmap_mode='r')
+
+    def export_table(self, data: ExpressionData, fmt: str = 'parquet',
+                     compression: str = 'zstd') -> bytes:
+        """Serialize expression data as a wide Parquet or Arrow IPC (Feather) file.
+
+        Requires the optional ``pyarrow`` package.
+
+        Args:
+            data: Expression data dictionary or matrix
+            fmt: 'parquet' or 'ipc'
+            compression: Codec name understood by pyarrow
+
+        Returns:
+            File content as bytes
+        """
+        return arrow_io.matrix_to_bytes(self.to_matrix(data), fmt, compression=compression)
+
+    def write_table(self, data: ExpressionData, path: Union[str, Path],
+                    compression: str = 'zstd') -> Path:
+        """Write expression data as a Parquet or Arrow IPC file, picked by the path's suffix.
+
+        Args:
+            data: Expression data dictionary or matrix
+            path: Output file (.parquet, .arrow or .feather)
+            compression: Codec name understood by pyarrow
+
+        Returns:
+            Path of the written file
+        """
+        path = Path(path)
+        fmt = arrow_io.table_format(path.name)
+        if fmt is None:
+            raise ValueError("Table files must be Parquet (.parquet) or Arrow IPC (.arrow, .feather)")
+        arrow_io.write_matrix(self.to_matrix(data), path, fmt, compression=compression)
+        return path
+
+    def validate_format(self, data: ExpressionData) -> Tuple[bool, str]:
         """Validate the expression data format.
         
         Args:
-            data: Expression data dictionary
+            data: Expression data dictionary or matrix
             
         Returns:
-            Tuple of (is_valid, message)
+            Tuple of (is_valid, message); the message is the first error found
         """
-        # Check top-level structure
-        if not isinstance(data, dict):
-            return False, "Data must be a dictionary"
-        
-        if 'genes' not in data:
-            return False, "Data must contain 'genes' key"
-        
-        if not isinstance(data['genes'], dict):
-            return False, "'genes' must be a dictionary"
-        
-        if not data['genes']:
-            return False, "No genes found in data"
-        
-        # Validate gene entries
-        for gene, tissues in data['genes'].items():
-            if not isinstance(tissues, dict):
-                return False, f"Expression values for gene '{gene}' must be a dictionary"
-            
-            # Check tissue values
-            for tissue, value in tissues.items():
-                if not isinstance(value, (int, float)):
-                    return False, f"Expression value for {gene}/{tissue} must be numeric, got {type(value).__name__}"
-                
-                if not isinstance(tissue, str):
-                    return False, f"Tissue ID must be string, got {type(tissue).__name__}"
-        
-        return True, "Data is valid"
+        report = self.validation_report(data, max_examples=1)
+        if report['valid']:
+            return True, "Data is valid"
+        return False, validation.first_error(report)
+
+    def validation_report(self, data: ExpressionData,
+                          max_examples: int = validation.DEFAULT_MAX_EXAMPLES) -> Dict[str, Any]:
+        """Check the data against every validation rule in one pass.
+
+        Unlike validate_format this does not stop at the first problem: each
+        rule (numeric values, NaN/inf, negative values, malformed UBERON ids,
+        duplicate genes) reports its violation count and the first
+        ``max_examples`` offending cells.
+
+        Args:
+            data: Expression data dictionary or matrix
+            max_examples: Offending cells listed per rule
+
+        Returns:
+            Report dictionary with 'valid', 'errors', 'warnings', 'checked' and 'rules'
+        """
+        return validation.validate_expression(data, max_examples=max_examples)
     
-    def normalize_values(self, data: Dict[str, Any], method: str = 'minmax') -> Dict[str, Any]:
-        """Normalize expression values to 0-1 range.
+    def normalize_values(self, data: ExpressionData, method: str = 'minmax', inplace: bool = False,
+                         percentiles: Tuple[float, float] = normalization.DEFAULT_PERCENTILES) -> ExpressionData:
+        """Normalize expression values.
         
         Args:
-            data: Expression data dictionary
-            method: Normalization method ('minmax' or 'zscore')
+            data: Expression data dictionary or matrix
+            method: Normalization method: 'minmax' (global, 0-1), 'gene_minmax',
+                'tissue_minmax', 'zscore' (per gene), 'log1p', 'quantile' or 'robust'
+                (percentile clipping, then 0-1)
+            inplace: Overwrite a matrix's values instead of normalizing a copy
+                (dictionaries always get a new dictionary)
+            percentiles: Lower and upper clipping percentiles for 'robust'
             
         Returns:
-            Dictionary with normalized values
+            Normalized data, in the same form as the input
+
+        Raises:
+            ValueError: If the method is not supported
         """
-        # Collect all values
-        all_values = []
-        for gene_data in data['genes'].values():
-            all_values.extend(gene_data.values())
-        
-        if not all_values:
-            return data
-        
-        # Calculate normalization parameters
-        values_array = np.array(all_values)
-        
-        if method == 'minmax':
-            min_val = values_array.min()
-            max_val = values_array.max()
-            
-            if max_val == min_val:
-                # All values are the same
-                scale = 1.0
-                offset = 0.5  # Map to middle of range
-            else:
-                scale = 1.0 / (max_val - min_val)
-                offset = -min_val * scale
-        else:
-            raise ValueError(f"Unsupported normalization method: {method}")
-        
-        # Apply normalization
-        normalized_data = {"genes": {}}
-        for gene, tissues in data['genes'].items():
-            normalized_tissues = {}
-            for tissue, value in tissues.items():
-                if method == 'minmax':
-                    if max_val == min_val:
-                        normalized_value = 0.5
-                    else:
-                        normalized_value = value * scale + offset
-                    normalized_tissues[tissue] = float(np.clip(normalized_value, 0, 1))
-            
-            normalized_data['genes'][gene] = normalized_tissues
-        
-        return normalized_data
+        if isinstance(data, (ExpressionMatrix, SparseExpressionMatrix)):
+            if inplace:
+                return normalization.normalize(data, method, inplace=True, percentiles=percentiles)
+            if method not in normalization.METHODS:
+                raise ValueError(f"Unsupported normalization method: {method}")
+            return self._cached(data, ('normalize', method, tuple(percentiles)),
+                                lambda: normalization.normalize(data, method, percentiles=percentiles))
+
+        matrix = SparseExpressionMatrix.from_dict(data, dtype=np.float64)
+        return normalization.normalize(matrix, method, inplace=True, percentiles=percentiles).to_dict()
     
-    def get_gene_list(self, data: Dict[str, Any]) -> List[str]:
+    def get_gene_list(self, data: ExpressionData) -> List[str]:
         """Extract sorted list of gene names.
         
         Args:
-            data: Expression data dictionary
+            data: Expression data dictionary or matrix
             
         Returns:
             Sorted list of gene names
         """
+        if isinstance(data, (ExpressionMatrix, SparseExpressionMatrix)):
+            return self._cached(data, 'gene_list', lambda: np.sort(data.genes).tolist())
+
         if 'genes' not in data:
             return []
         
         return sorted(data['genes'].keys())
     
-    def get_tissue_list(self, data: Dict[str, Any]) -> Set[str]:
+    def get_tissue_list(self, data: ExpressionData) -> Set[str]:
         """Extract all unique tissue IDs.
         
         Args:
-            data: Expression data dictionary
+            data: Expression data dictionary or matrix
             
         Returns:
             Set of unique tissue IDs
         """
+        if isinstance(data, ExpressionMatrix):
+            return self._cached(data, 'tissue_list',
+                                lambda: set(data.tissues[data.observed.any(axis=0)].tolist()))
+        if isinstance(data, SparseExpressionMatrix):
+            return self._cached(data, 'tissue_list',
+                                lambda: set(data.tissues[np.unique(data.indices)].tolist()))
+
         tissues = set()
         
         if 'genes' in data:
@@ -221,15 +648,20 @@ class ExpressionDataProcessor:
         
         return tissues
     
-    def get_summary_statistics(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def get_summary_statistics(self, data: ExpressionData) -> Dict[str, Any]:
         """Calculate summary statistics for the expression data.
         
         Args:
-            data: Expression data dictionary
+            data: Expression data dictionary or matrix
             
         Returns:
             Dictionary with summary statistics
         """
+        if isinstance(data, ExpressionMatrix):
+            return self._cached(data, 'summary_statistics', lambda: self._matrix_statistics(data))
+        if isinstance(data, SparseExpressionMatrix):
+            return self._cached(data, 'summary_statistics', lambda: self._sparse_statistics(data))
+
         if 'genes' not in data or not data['genes']:
             return {
                 'num_genes': 0,
@@ -271,17 +703,182 @@ class ExpressionDataProcessor:
             }
         
         return stats
+
+    def _matrix_statistics(self, matrix: ExpressionMatrix) -> Dict[str, Any]:
+        """Summary statistics of an ExpressionMatrix from axis-wise reductions."""
+        observed = matrix.observed
+        total = int(observed.sum())
+
+        if total == 0:
+            return {
+                'num_genes': matrix.n_genes,
+                'num_tissues': 0,
+                'mean_expression': 0,
+                'std_expression': 0,
+                'min_expression': 0,
+                'max_expression': 0,
+                'total_data_points': 0
+            }
+
+        values = matrix.values
+        return {
+            'num_genes': matrix.n_genes,
+            'num_tissues': int(observed.any(axis=0).sum()),
+            'mean_expression': float(np.nanmean(values, dtype=np.float64)),
+            'std_expression': float(np.nanstd(values, dtype=np.float64)),
+            'min_expression': float(np.nanmin(values)),
+            'max_expression': float(np.nanmax(values)),
+            'total_data_points': total
+        }
     
-    def filter_by_threshold(self, data: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    def _sparse_statistics(self, matrix: SparseExpressionMatrix) -> Dict[str, Any]:
+        """Summary statistics of a sparse matrix, computed over its stored values only."""
+        if matrix.nnz == 0:
+            return {
+                'num_genes': matrix.n_genes,
+                'num_tissues': 0,
+                'mean_expression': 0,
+                'std_expression': 0,
+                'min_expression': 0,
+                'max_expression': 0,
+                'total_data_points': 0
+            }
+
+        values = matrix.data
+        return {
+            'num_genes': matrix.n_genes,
+            'num_tissues': int(np.count_nonzero(np.bincount(matrix.indices, minlength=matrix.n_tissues))),
+            'mean_expression': float(values.mean(dtype=np.float64)),
+            'std_expression': float(values.std(dtype=np.float64)),
+            'min_expression': float(values.min()),
+            'max_expression': float(values.max()),
+            'total_data_points': matrix.nnz
+        }
+    
+    def gene_summary(self, data: ExpressionData) -> pd.DataFrame:
+        """Per-gene summary of the measured values, one row per gene.
+
+        Computed with axis-wise reductions over blocks of gene rows (sparse
+        matrices are expanded one block at a time). Unmeasured cells are
+        ignored; genes without any value get NaN statistics.
+
+        Args:
+            data: Expression data dictionary or matrix
+
+        Returns:
+            DataFrame with columns 'gene', 'tissues' (measured tissue count),
+            'min', 'max', 'mean', 'std', 'median' and 'tau' (tissue
+            specificity index, 0 = uniform, 1 = expressed in one tissue;
+            NaN for genes with fewer than two tissues or no positive value),
+            in the data's gene order
+        """
+        if not isinstance(data, (ExpressionMatrix, SparseExpressionMatrix)):
+            data = self.to_sparse(data)
+        return self._cached(data, 'gene_summary', lambda: self._gene_summary(data))
+
+    def _gene_summary(self, matrix: Union[ExpressionMatrix, SparseExpressionMatrix],
+                      block_rows: int = specificity.DEFAULT_BLOCK_ROWS) -> pd.DataFrame:
+        columns = {name: np.empty(matrix.n_genes) for name in ('min', 'max', 'mean', 'std', 'median', 'tau')}
+        counts = np.empty(matrix.n_genes, dtype=np.int64)
+
+        start = 0
+        for block in specificity.gene_blocks(matrix, block_rows):
+            end = start + len(block)
+            observed = ~np.isnan(block)
+            n = observed.sum(axis=1)
+
+            # Sorting each row puts NaN last, so min, max and median index off the count
+            ordered = np.sort(block, axis=1)
+            rows = np.arange(len(block))
+            last = np.maximum(n - 1, 0)
+            low = ordered[:, 0].astype(np.float64)
+            high = ordered[rows, last].astype(np.float64)
+            median = (ordered[rows, last // 2].astype(np.float64) + ordered[rows, n // 2].astype(np.float64)) / 2
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(observed, block, 0).sum(axis=1, dtype=np.float64) / n
+                deviation = np.where(observed, block - mean[:, None], 0)
+                std = np.sqrt((deviation ** 2).sum(axis=1, dtype=np.float64) / n)
+            positive = np.where(observed, np.maximum(block, 0), 0).sum(axis=1, dtype=np.float64)
+            tau = specificity.tau(n, positive, np.maximum(high, 0))
+
+            counts[start:end] = n
+            for name, column in (('min', low), ('max', high), ('mean', mean), ('std', std),
+                                 ('median', median), ('tau', tau)):
+                columns[name][start:end] = column
+            start = end
+
+        summary = pd.DataFrame({'gene': matrix.genes, 'tissues': counts, **columns})
+        summary.loc[summary['tissues'] == 0, ['min', 'max', 'median']] = np.nan
+        return summary
+
+    def specificity_scores(self, data: ExpressionData) -> pd.DataFrame:
+        """Tissue-specificity scores (tau, Gini, max-z) and top tissue for every gene.
+
+        Args:
+            data: Expression data dictionary or matrix
+
+        Returns:
+            DataFrame with columns 'gene', 'top_tissue', 'top_value', 'tissues',
+            'tau', 'gini' and 'max_z' (see ``marimo_components.specificity``)
+        """
+        if not isinstance(data, (ExpressionMatrix, SparseExpressionMatrix)):
+            data = self.to_sparse(data)
+        return self._cached(data, 'specificity_scores', lambda: specificity.specificity_scores(data))
+
+    def top_specific_genes(self, data: ExpressionData, uberon_id: str, k: int = 20,
+                           by: str = 'tau', min_score: Optional[float] = None) -> pd.DataFrame:
+        """The ``k`` genes most specific to a tissue (genes whose highest tissue it is).
+
+        Args:
+            data: Expression data dictionary or matrix
+            uberon_id: Tissue to rank genes for
+            k: Number of genes to return
+            by: Ranking score: 'tau', 'gini' or 'max_z'
+            min_score: Optional lower bound on the score
+
+        Returns:
+            Rows of ``specificity_scores`` for the top genes, best first
+        """
+        return specificity.top_specific_genes(self.specificity_scores(data), uberon_id, k=k, by=by,
+                                              min_score=min_score)
+
+    def tissue_ranking(self, data: ExpressionData) -> TissueRanking:
+        """Per-tissue index of genes sorted by expression, for tissue -> gene lookups.
+
+        Built once per dataset fingerprint; a reloaded dataset with different
+        values gets a fresh index. Query it with ``top_genes(uberon_id, k, threshold)``.
+
+        Args:
+            data: Expression data dictionary or matrix
+
+        Returns:
+            TissueRanking over the data's measured values
+        """
+        if not isinstance(data, (ExpressionMatrix, SparseExpressionMatrix)):
+            data = self.to_sparse(data)
+        return self._cached(data, 'tissue_ranking', lambda: TissueRanking.build(data))
+
+    def filter_by_threshold(self, data: ExpressionData, threshold: float) -> ExpressionData:
         """Filter expression data by minimum threshold.
         
         Args:
-            data: Expression data dictionary
+            data: Expression data dictionary or matrix
             threshold: Minimum expression value to include
             
         Returns:
-            Filtered expression data
+            Filtered expression data, in the same form as the input
         """
+        if isinstance(data, SparseExpressionMatrix):
+            return data.filter_cells(data.data >= threshold)
+
+        if isinstance(data, ExpressionMatrix):
+            keep = data.values >= threshold
+            values = np.where(keep, data.values, np.nan).astype(data.values.dtype)
+            rows = keep.any(axis=1)
+            return ExpressionMatrix(values[rows], data.genes[rows], data.tissues,
+                                    dtype=data.values.dtype)
+
         filtered_data = {"genes": {}}
         
         for gene, tissues in data.get('genes', {}).items():
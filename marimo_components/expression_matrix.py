@@ -0,0 +1,402 @@
+"""Columnar in-memory storage for gene x tissue expression data."""
+
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Union
+
+# On-disk store layout: a directory holding the raw value block and a name index
+STORE_VALUES_FILE = "values.npy"
+STORE_INDEX_FILE = "index.json"
+STORE_FORMAT_VERSION = 1
+
+
+def _shortest_float64(cells: np.ndarray) -> np.ndarray:
+    """Widen float32 values to the float64 of their shortest decimal form.
+
+    ``np.float32(0.72)`` widens to ``0.7200000286102295``; this returns
+    ``0.72`` instead, which is what the value was before it was stored.
+    Each pass rounds the still-unresolved cells to one more significant
+    digit and keeps those that round-trip back to the same float32.
+    """
+    result = cells.astype(np.float64)
+    pending = np.flatnonzero(np.isfinite(result) & (result != 0))
+    if pending.size == 0:
+        return result
+
+    target = cells[pending]
+    wide = result[pending]
+    exponent = np.floor(np.log10(np.abs(wide))).astype(np.int64)
+
+    for digits in range(1, 10):
+        places = digits - 1 - exponent
+        scale = 10.0 ** np.abs(places)
+        candidate = np.where(places >= 0,
+                             np.round(wide * scale) / scale,
+                             np.round(wide / scale) * scale)
+        done = candidate.astype(np.float32) == target
+        result[pending[done]] = candidate[done]
+
+        keep = ~done
+        pending, target, wide, exponent = pending[keep], target[keep], wide[keep], exponent[keep]
+        if pending.size == 0:
+            break
+
+    return result
+
+
+class ExpressionMatrix:
+    """Dense gene x tissue expression matrix.
+
+    Values are stored in a single 2-D float array (float32 by default) with
+    one row per gene and one column per UBERON id. Missing measurements are
+    NaN. The matrix converts to and from the nested
+    ``{"genes": {gene: {uberon_id: value}}}`` format used by the widget.
+    float32 keeps about 7 significant digits; build the matrix with
+    ``dtype=np.float64`` when values must round-trip exactly.
+    """
+
+    def __init__(self, values: np.ndarray, genes: Iterable[str], tissues: Iterable[str],
+                 dtype: Any = np.float32):
+        """Create a matrix from a value block and its row/column labels.
+
+        Args:
+            values: 2-D array of shape (n_genes, n_tissues), NaN for missing cells
+            genes: Gene names, one per row
+            tissues: UBERON ids, one per column
+            dtype: Floating point dtype used to store the values
+        """
+        self.values = np.asarray(values, dtype=dtype)
+        self.genes = np.asarray(list(genes), dtype=str)
+        self.tissues = np.asarray(list(tissues), dtype=str)
+
+        if self.values.ndim != 2:
+            raise ValueError(f"Expression values must be 2-D, got {self.values.ndim}-D")
+        if self.values.shape != (len(self.genes), len(self.tissues)):
+            raise ValueError(
+                f"Value block shape {self.values.shape} does not match "
+                f"{len(self.genes)} genes x {len(self.tissues)} tissues"
+            )
+
+        self._gene_index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], dtype: Any = np.float32) -> 'ExpressionMatrix':
+        """Build a matrix from the nested ``{"genes": {...}}`` format.
+
+        Tissue columns are ordered by first appearance.
+
+        Args:
+            data: Expression data dictionary
+            dtype: Floating point dtype used to store the values
+
+        Returns:
+            ExpressionMatrix holding the same values
+        """
+        if not isinstance(data, dict) or not isinstance(data.get('genes'), dict):
+            raise ValueError("Data must be a dictionary with a 'genes' dictionary")
+
+        gene_dicts = list(data['genes'].values())
+        genes = [str(gene) for gene in data['genes'].keys()]
+
+        counts = np.fromiter((len(tissues) for tissues in gene_dicts), dtype=np.int64,
+                             count=len(gene_dicts))
+        flat_tissues = [tissue for tissues in gene_dicts for tissue in tissues]
+        flat_values = np.fromiter(
+            (value for tissues in gene_dicts for value in tissues.values()),
+            dtype=np.float64, count=len(flat_tissues)
+        )
+
+        cols, tissues = pd.factorize(pd.Index(flat_tissues, dtype=object), sort=False)
+        rows = np.repeat(np.arange(len(genes)), counts)
+
+        values = np.full((len(genes), len(tissues)), np.nan, dtype=dtype)
+        values[rows, cols] = flat_values
+        return cls(values, genes, [str(tissue) for tissue in tissues], dtype=dtype)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert back to the nested ``{"genes": {...}}`` format.
+
+        float32 values are converted through their shortest decimal
+        representation, so ``0.72`` round-trips as ``0.72``; values with
+        more than about 7 significant digits come back rounded to float32
+        precision. float64 matrices return their values unchanged.
+
+        Returns:
+            Dictionary in standard format with 'genes' key
+        """
+        rows, cols = np.nonzero(~np.isnan(self.values))
+        cells = self.values[rows, cols]
+        if cells.dtype == np.float32:
+            cells = _shortest_float64(cells)
+        flat_values = cells.tolist()
+        flat_tissues = self.tissues[cols].tolist()
+
+        present, starts = np.unique(rows, return_index=True)
+        ends = np.append(starts[1:], rows.size)
+        genes = self.genes.tolist()
+
+        genes_dict = {gene: {} for gene in genes}
+        for row, start, end in zip(present.tolist(), starts.tolist(), ends.tolist()):
+            genes_dict[genes[row]] = dict(zip(flat_tissues[start:end], flat_values[start:end]))
+        return {"genes": genes_dict}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def n_genes(self) -> int:
+        return len(self.genes)
+
+    @property
+    def n_tissues(self) -> int:
+        return len(self.tissues)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the values and label arrays."""
+        return self.values.nbytes + self.genes.nbytes + self.tissues.nbytes
+
+    @property
+    def observed(self) -> np.ndarray:
+        """Boolean mask of cells that hold a measurement."""
+        return ~np.isnan(self.values)
+
+    def gene_index(self) -> Dict[str, int]:
+        """Map of gene name to row position (built on first use)."""
+        if self._gene_index is None:
+            self._gene_index = {gene: row for row, gene in enumerate(self.genes.tolist())}
+        return self._gene_index
+
+    def gene_values(self, gene: str) -> Dict[str, float]:
+        """Get the ``{uberon_id: value}`` mapping for a single gene.
+
+        Raises:
+            KeyError: If the gene is not in the matrix
+        """
+        row = self.values[self.gene_index()[gene]]
+        mask = ~np.isnan(row)
+        cells = row[mask]
+        if cells.dtype == np.float32:
+            cells = _shortest_float64(cells)
+        return dict(zip(self.tissues[mask].tolist(), cells.tolist()))
+
+    def gene_vector(self, gene: str) -> np.ndarray:
+        """The gene's row laid out against ``tissues``, NaN where unmeasured.
+
+        Raises:
+            KeyError: If the gene is not in the matrix
+        """
+        return self.values[self.gene_index()[gene]]
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """Write the matrix as an on-disk store that can be memory-mapped.
+
+        The store is a directory with ``values.npy`` (the C-ordered value
+        block, one contiguous row per gene) and ``index.json`` (gene and
+        tissue names).
+
+        Args:
+            path: Store directory, created if missing
+
+        Returns:
+            Path of the store directory
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        np.save(path / STORE_VALUES_FILE, np.ascontiguousarray(self.values), allow_pickle=False)
+        index = {
+            "version": STORE_FORMAT_VERSION,
+            "dtype": self.values.dtype.str,
+            "shape": list(self.values.shape),
+            "genes": self.genes.tolist(),
+            "tissues": self.tissues.tolist(),
+        }
+        with open(path / STORE_INDEX_FILE, 'w') as f:
+            json.dump(index, f)
+        return path
+
+    @classmethod
+    def open(cls, path: Union[str, Path], mmap_mode: Optional[str] = 'r') -> 'ExpressionMatrix':
+        """Open an on-disk store written by :meth:`save`.
+
+        With the default ``mmap_mode='r'`` only the name index is read up
+        front; value pages are loaded by the OS as rows are accessed, so
+        pulling one gene touches only that gene's row.
+
+        Args:
+            path: Store directory
+            mmap_mode: Passed to ``np.load``; ``None`` reads the block into memory
+
+        Returns:
+            ExpressionMatrix backed by the store
+        """
+        path = Path(path)
+        try:
+            with open(path / STORE_INDEX_FILE) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Not an expression store: {path}")
+
+        if index.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported expression store version: {index.get('version')}")
+
+        values = np.load(path / STORE_VALUES_FILE, mmap_mode=mmap_mode, allow_pickle=False)
+        return cls(values, index["genes"], index["tissues"], dtype=values.dtype)
+
+    @property
+    def is_memory_mapped(self) -> bool:
+        """Whether the value block is backed by an on-disk store."""
+        base = self.values
+        while base is not None:
+            if isinstance(base, np.memmap):
+                return True
+            base = getattr(base, 'base', None)
+        return False
+
+    def take_genes(self, rows: np.ndarray) -> 'ExpressionMatrix':
+        """Return a new matrix restricted to the given rows (index or boolean mask)."""
+        return ExpressionMatrix(self.values[rows], self.genes[rows], self.tissues,
+                                dtype=self.values.dtype)
+
+    def copy(self) -> 'ExpressionMatrix':
+        return ExpressionMatrix(self.values.copy(), self.genes, self.tissues,
+                                dtype=self.values.dtype)
+
+    def __contains__(self, gene: str) -> bool:
+        return gene in self.gene_index()
+
+    def __len__(self) -> int:
+        return self.n_genes
+
+    def __repr__(self) -> str:
+        return (f"ExpressionMatrix({self.n_genes} genes x {self.n_tissues} tissues, "
+                f"dtype={self.values.dtype})")
+
+
+class ExpressionMatrixBuilder:
+    """Accumulate gene rows into a growable value block.
+
+    Rows are appended in batches (one CSV chunk at a time, for example) or
+    one gene at a time from ``{uberon_id: value}`` mappings, into a
+    preallocated array that grows geometrically. A load therefore holds
+    the block itself plus one batch rather than a whole parsed table.
+    Tissue columns are added as new UBERON ids are seen. A gene appended
+    twice keeps the values of its last occurrence.
+    """
+
+    def __init__(self, tissues: Iterable[str] = (), dtype: Any = np.float32, capacity: int = 1024):
+        """Start an empty block.
+
+        Args:
+            tissues: Known UBERON ids, one per column (more can be added later)
+            dtype: Floating point dtype used to store the values
+            capacity: Number of rows to allocate up front
+        """
+        self.tissues = [str(tissue) for tissue in tissues]
+        self.dtype = np.dtype(dtype)
+        self._columns = {tissue: col for col, tissue in enumerate(self.tissues)}
+        self._values = np.full((max(capacity, 1), max(len(self.tissues), 1)), np.nan, dtype=self.dtype)
+        self._genes = []
+        self._rows: Dict[str, int] = {}
+
+    @property
+    def n_genes(self) -> int:
+        return len(self._genes)
+
+    @property
+    def n_tissues(self) -> int:
+        return len(self.tissues)
+
+    @property
+    def capacity(self) -> int:
+        return self._values.shape[0]
+
+    def reserve(self, n_genes: int):
+        """Grow the block so it holds at least ``n_genes`` rows without reallocating."""
+        if n_genes <= self.capacity:
+            return
+        old_capacity = self.capacity
+        # Resize in place: the block owns its buffer and no views of it are kept
+        self._values.resize((n_genes, self._values.shape[1]), refcheck=False)
+        self._values[old_capacity:] = np.nan
+
+    def _row(self, gene: str) -> int:
+        row = self._rows.get(gene)
+        if row is None:
+            row = self._rows[gene] = len(self._genes)
+            self._genes.append(gene)
+            if row >= self.capacity:
+                self.reserve(2 * self.capacity)
+        return row
+
+    def _column(self, tissue: str) -> int:
+        col = self._columns.get(tissue)
+        if col is None:
+            col = self._columns[tissue] = len(self.tissues)
+            self.tissues.append(tissue)
+            width = self._values.shape[1]
+            if col >= width:
+                grown = np.full((self.capacity, 2 * width), np.nan, dtype=self.dtype)
+                grown[:, :width] = self._values
+                self._values = grown
+        return col
+
+    def append(self, genes: Iterable[str], values: np.ndarray):
+        """Append a batch of gene rows laid out against the current tissues.
+
+        Args:
+            genes: Gene names, one per row
+            values: 2-D array of shape (len(genes), n_tissues), NaN for missing cells
+        """
+        genes = [str(gene) for gene in genes]
+        values = np.asarray(values)
+        if values.shape != (len(genes), self.n_tissues):
+            raise ValueError(
+                f"Batch shape {values.shape} does not match "
+                f"{len(genes)} genes x {self.n_tissues} tissues"
+            )
+        if not genes:
+            return
+
+        positions = np.fromiter((self._row(gene) for gene in genes), dtype=np.intp, count=len(genes))
+
+        # Repeated genes within the batch: only the last occurrence is written
+        _, last = np.unique(positions[::-1], return_index=True)
+        keep = np.sort(len(positions) - 1 - last)
+        self._values[positions[keep], :self.n_tissues] = values[keep]
+
+    def append_gene(self, gene: str, tissues: Dict[str, float]):
+        """Append one gene from its ``{uberon_id: value}`` mapping."""
+        gene = str(gene)
+        is_new = gene not in self._rows
+        row = self._row(gene)
+
+        lookup = self._columns.get
+        cols = [lookup(tissue) for tissue in tissues]
+        if None in cols:
+            cols = [self._column(str(tissue)) for tissue in tissues]
+
+        if not is_new:
+            self._values[row] = np.nan
+        self._values[row, cols] = np.fromiter(tissues.values(), dtype=np.float64, count=len(cols))
+
+    def build(self) -> ExpressionMatrix:
+        """Trim the block to the rows and columns appended so far and wrap it as a matrix.
+
+        The builder should not be used afterwards; the matrix takes over its
+        value block without copying.
+        """
+        n_genes, n_tissues = self.n_genes, self.n_tissues
+        width = self._values.shape[1]
+        if width != n_tissues:
+            # Pack rows to the final width in place (each move goes to a lower offset)
+            flat = self._values.reshape(-1)
+            for row in range(1, n_genes):
+                flat[row * n_tissues:(row + 1) * n_tissues] = flat[row * width:row * width + n_tissues]
+            del flat
+        self._values.resize((n_genes, n_tissues), refcheck=False)
+        return ExpressionMatrix(self._values, self._genes, self.tissues, dtype=self.dtype)
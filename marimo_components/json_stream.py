@@ -0,0 +1,156 @@
+"""Incremental reader for ``{"genes": {gene: {uberon_id: value}}}`` JSON files."""
+
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# A decode error this close to the end of the buffer may just be a value cut
+# off by the chunk boundary (a number, literal or delimiter), not bad input
+_TAIL_WINDOW = 64
+
+# Characters that can continue a number, so a number followed by one of them
+# at a chunk boundary may have been decoded from only part of its text
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class JsonGeneReader:
+    """Read gene entries from a binary JSON stream one at a time.
+
+    The file is read in ``chunk_bytes`` pieces and decoded incrementally;
+    only the text of the entries not yet consumed is kept in memory. Each
+    gene's tissue mapping is decoded with ``json.JSONDecoder.raw_decode``
+    as soon as it is complete, so a syntax error is reported when the
+    reader reaches it rather than after the whole file has been read.
+    Top-level keys other than ``"genes"`` are decoded and skipped.
+    """
+
+    def __init__(self, stream: BinaryIO, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        self._stream = stream
+        self._chunk_bytes = chunk_bytes
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._offset = 0  # characters dropped from the front of the buffer
+        self._eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False once the stream is exhausted."""
+        if self._eof:
+            return False
+
+        chunk = self._stream.read(self._chunk_bytes)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self._eof = True
+            text = self._text_decoder.decode(b'', final=True)
+        else:
+            text = self._text_decoder.decode(chunk)
+
+        # Drop consumed text so the buffer only holds what is still unparsed
+        if self._pos > len(self._buffer) // 2:
+            self._offset += self._pos
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+        return True
+
+    def _error(self, message: str, pos: Optional[int] = None) -> ValueError:
+        position = self._offset + (self._pos if pos is None else pos)
+        return ValueError(f"Invalid JSON format: {message} at character {position}")
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            expected = ' or '.join(repr(c) for c in chars)
+            raise self._error(f"expecting {expected}, got {char!r}" if char else f"expecting {expected}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                truncated = (e.msg.startswith('Unterminated string')
+                             or e.pos >= len(self._buffer) - _TAIL_WINDOW)
+                if truncated and self._fill():
+                    continue
+                raise self._error(e.msg, e.pos)
+
+            # A number cut by the chunk boundary ("1." or "1e") decodes as its
+            # prefix; read on until the character after it cannot extend it
+            if (not isinstance(value, (str, dict, list)) and not self._eof
+                    and (end == len(self._buffer) or self._buffer[end] in _NUMBER_CHARS)
+                    and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def _key(self) -> str:
+        if self._peek() != '"':
+            raise self._error("expecting property name enclosed in double quotes")
+        key = self._value()
+        self._expect(':')
+        return key
+
+    def genes(self) -> Iterator[Tuple[str, Any]]:
+        """Yield ``(gene, tissues)`` pairs in file order.
+
+        ``tissues`` is whatever JSON value the file holds for the gene;
+        checking that it is a ``{uberon_id: number}`` mapping is left to the
+        caller.
+
+        Raises:
+            ValueError: On malformed JSON or if the document has no 'genes' object
+        """
+        self._expect('{')
+        found_genes = False
+
+        if self._peek() != '}':
+            while True:
+                key = self._key()
+                if key == 'genes':
+                    if self._peek() != '{':
+                        raise ValueError("'genes' must be a dictionary")
+                    found_genes = True
+                    yield from self._gene_entries()
+                else:
+                    self._value()
+                if self._expect(',}') == '}':
+                    break
+        else:
+            self._pos += 1
+
+        if self._peek():
+            raise self._error("extra data after the top-level object")
+        if not found_genes:
+            raise ValueError("Data must contain 'genes' key")
+
+    def _gene_entries(self) -> Iterator[Tuple[str, Any]]:
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            gene = self._key()
+            yield gene, self._value()
+            if self._expect(',}') == '}':
+                return
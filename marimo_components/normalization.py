@@ -0,0 +1,217 @@
+"""Array-based normalization of expression matrices.
+
+Every method works on the matrix's value array in place (a dense
+``values`` block with NaN for unmeasured cells, or the ``data`` array of a
+sparse matrix), so a float32 matrix is normalized without a float64 copy.
+Unmeasured cells are ignored by every statistic and stay unmeasured.
+
+Methods:
+
+- ``minmax``: scale all values to 0-1 with the global min and max
+- ``gene_minmax`` / ``tissue_minmax``: min-max scale each gene (row) or tissue (column)
+- ``zscore``: per gene, subtract the mean and divide by the standard deviation
+- ``log1p``: ``log(1 + x)``, with negative values treated as 0
+- ``quantile``: give every tissue the same value distribution (quantile
+  normalization); tissues with fewer measurements are mapped onto the
+  shared reference by interpolation and tied values share one output value
+- ``robust``: clip to the ``percentiles`` of all values, then min-max scale to 0-1
+
+A min-max range of zero maps to 0.5, a standard deviation of zero to 0.
+"""
+
+import numpy as np
+from typing import Tuple, Union
+
+from . import caching
+from .expression_matrix import ExpressionMatrix
+from .sparse_matrix import SparseExpressionMatrix
+
+METHODS = ('minmax', 'gene_minmax', 'tissue_minmax', 'zscore', 'log1p', 'quantile', 'robust')
+
+DEFAULT_PERCENTILES = (1.0, 99.0)
+
+
+def _scale(values: np.ndarray, low, high) -> None:
+    """Map ``[low, high]`` onto 0-1 in place; ``low``/``high`` broadcast against ``values``."""
+    span = high - low
+    flat = span == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values -= low
+        values /= np.where(flat, 1, span)
+    np.clip(values, 0, 1, out=values)
+    if np.any(flat):
+        values[np.broadcast_to(flat, values.shape) & ~np.isnan(values)] = 0.5
+
+
+def _standardize(values: np.ndarray, mean, std) -> None:
+    values -= mean
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values /= np.where(std > 0, std, np.inf)
+
+
+def _argsort(values: np.ndarray) -> np.ndarray:
+    """Stable argsort along the last axis with NaN last, fast for float32.
+
+    NumPy sorts plain integers far faster than it argsorts floats, so each
+    float32 value is turned into order-preserving integer bits, packed above
+    its position into one int64 key, and the keys are sorted directly.
+    """
+    if values.dtype != np.float32 or values.shape[-1] >= 2 ** 32:
+        return np.argsort(values, axis=-1, kind='stable')
+    bits = values.view(np.int32).astype(np.int64)
+    np.copyto(bits, bits ^ 0x7FFFFFFF, where=bits < 0)  # negative floats sort in reverse bit order
+    bits[np.isnan(values)] = np.iinfo(np.int32).max
+    bits <<= 32
+    bits |= np.arange(values.shape[-1])
+    bits.sort(axis=-1)
+    return bits & 0xFFFFFFFF
+
+
+def _quantile_column(sorted_values: np.ndarray, grid: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Reference quantiles for one tissue's sorted values; ties get the mean of their run."""
+    n = len(sorted_values)
+    targets = np.interp(np.linspace(0, 1, n), grid, reference)
+    run_start = np.empty(n, dtype=bool)
+    run_start[0] = True
+    np.not_equal(sorted_values[1:], sorted_values[:-1], out=run_start[1:])
+    starts = np.flatnonzero(run_start)
+    ends = np.append(starts[1:], n) - 1
+    return ((targets[starts] + targets[ends]) / 2)[np.cumsum(run_start) - 1]
+
+
+def _reference(columns) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean quantile function of the given sorted columns, on a grid as long as the longest."""
+    columns = [column for column in columns if len(column)]
+    size = max(len(column) for column in columns)
+    grid = np.linspace(0, 1, size)
+    reference = np.zeros(size)
+    for column in columns:
+        reference += np.interp(grid, np.linspace(0, 1, len(column)), column)
+    return grid, reference / len(columns)
+
+
+def normalize_dense(values: np.ndarray, method: str,
+                    percentiles: Tuple[float, float] = DEFAULT_PERCENTILES) -> np.ndarray:
+    """Normalize a gene x tissue block in place (NaN cells are unmeasured) and return it."""
+    if method not in METHODS:
+        raise ValueError(f"Unsupported normalization method: {method}")
+    observed = ~np.isnan(values)
+    if not observed.any():
+        return values
+
+    if method == 'minmax':
+        _scale(values, np.nanmin(values), np.nanmax(values))
+    elif method in ('gene_minmax', 'tissue_minmax'):
+        # fmin/fmax skip NaN without the all-NaN warnings of nanmin/nanmax
+        axis = 1 if method == 'gene_minmax' else 0
+        low = np.fmin.reduce(values, axis=axis, keepdims=True)
+        high = np.fmax.reduce(values, axis=axis, keepdims=True)
+        _scale(values, low, high)
+    elif method == 'zscore':
+        counts = observed.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (np.where(observed, values, 0).sum(axis=1, keepdims=True, dtype=np.float64) / counts)
+            values -= mean.astype(values.dtype)
+            variance = (np.where(observed, values, 0) ** 2).sum(axis=1, keepdims=True, dtype=np.float64) / counts
+        _standardize(values, 0, np.sqrt(variance).astype(values.dtype))
+    elif method == 'log1p':
+        np.maximum(values, 0, out=values)
+        np.log1p(values, out=values)
+    elif method == 'quantile':
+        # Sort each tissue's values on a contiguous transposed copy; NaN sorts last
+        columns = np.ascontiguousarray(values.T)
+        order = _argsort(columns)
+        sorted_columns = np.take_along_axis(columns, order, axis=1)
+        counts = observed.sum(axis=0)
+        grid, reference = _reference(sorted_columns[col, :n] for col, n in enumerate(counts))
+        for col, n in enumerate(counts):
+            if n:
+                values[order[col, :n], col] = _quantile_column(sorted_columns[col, :n], grid, reference)
+    elif method == 'robust':
+        low, high = np.percentile(values[observed], percentiles)
+        np.clip(values, low, high, out=values)
+        _scale(values, low, high)
+    return values
+
+
+def normalize_csr(matrix: SparseExpressionMatrix, method: str,
+                  percentiles: Tuple[float, float] = DEFAULT_PERCENTILES) -> np.ndarray:
+    """Normalize a sparse matrix's stored values in place and return its ``data`` array."""
+    if method not in METHODS:
+        raise ValueError(f"Unsupported normalization method: {method}")
+    values = matrix.data
+    if values.size == 0:
+        return values
+
+    if method == 'minmax':
+        _scale(values, values.min(), values.max())
+    elif method == 'gene_minmax':
+        counts = matrix.row_counts()
+        starts = matrix.indptr[:-1][counts > 0]
+        rows = matrix.row_ids()
+        low = np.zeros(matrix.n_genes, dtype=values.dtype)
+        high = np.zeros(matrix.n_genes, dtype=values.dtype)
+        low[counts > 0] = np.minimum.reduceat(values, starts)
+        high[counts > 0] = np.maximum.reduceat(values, starts)
+        _scale(values, low[rows], high[rows])
+    elif method == 'tissue_minmax':
+        low = np.full(matrix.n_tissues, np.inf, dtype=values.dtype)
+        high = np.full(matrix.n_tissues, -np.inf, dtype=values.dtype)
+        np.minimum.at(low, matrix.indices, values)
+        np.maximum.at(high, matrix.indices, values)
+        _scale(values, low[matrix.indices], high[matrix.indices])
+    elif method == 'zscore':
+        rows = matrix.row_ids()
+        counts = np.maximum(matrix.row_counts(), 1)
+        mean = np.bincount(rows, weights=values, minlength=matrix.n_genes) / counts
+        values -= mean[rows].astype(values.dtype)
+        variance = np.bincount(rows, weights=values.astype(np.float64) ** 2, minlength=matrix.n_genes) / counts
+        _standardize(values, 0, np.sqrt(variance).astype(values.dtype)[rows])
+    elif method == 'log1p':
+        np.maximum(values, 0, out=values)
+        np.log1p(values, out=values)
+    elif method == 'quantile':
+        # Cells grouped by tissue, then sorted by value within each tissue
+        by_tissue = np.argsort(matrix.indices, kind='stable')
+        bounds = np.zeros(matrix.n_tissues + 1, dtype=np.int64)
+        np.cumsum(np.bincount(matrix.indices, minlength=matrix.n_tissues), out=bounds[1:])
+        cells = [by_tissue[bounds[col]:bounds[col + 1]] for col in range(matrix.n_tissues)]
+        cells = [column[_argsort(values[column])] for column in cells]
+        grid, reference = _reference(values[column] for column in cells)
+        for column in cells:
+            if len(column):
+                values[column] = _quantile_column(values[column], grid, reference)
+    elif method == 'robust':
+        low, high = np.percentile(values, percentiles)
+        np.clip(values, low, high, out=values)
+        _scale(values, low, high)
+    return values
+
+
+def normalize(matrix: Union[ExpressionMatrix, SparseExpressionMatrix], method: str = 'minmax',
+              inplace: bool = False,
+              percentiles: Tuple[float, float] = DEFAULT_PERCENTILES) -> Union[ExpressionMatrix, SparseExpressionMatrix]:
+    """Normalize a dense or sparse matrix.
+
+    Args:
+        matrix: Matrix to normalize
+        method: One of METHODS
+        inplace: Overwrite the matrix's values instead of returning a normalized copy
+        percentiles: Lower and upper clipping percentiles for the 'robust' method
+
+    Returns:
+        The normalized matrix (``matrix`` itself when ``inplace`` is True)
+
+    Raises:
+        ValueError: If the method is not supported
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unsupported normalization method: {method}")
+    if not inplace:
+        matrix = matrix.copy()
+    if isinstance(matrix, SparseExpressionMatrix):
+        normalize_csr(matrix, method, percentiles)
+    else:
+        normalize_dense(matrix.values, method, percentiles)
+    caching.forget_fingerprint(matrix)
+    return matrix
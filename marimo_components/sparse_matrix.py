@@ -0,0 +1,246 @@
+"""Compressed sparse row storage for gene x tissue expression data."""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterable, Optional
+
+from .expression_matrix import ExpressionMatrix, _shortest_float64
+
+
+class SparseExpressionMatrix:
+    """Gene x tissue expression matrix that stores only measured cells.
+
+    Uses the CSR layout: ``data`` holds the measured values row by row,
+    ``indices`` the tissue column of each value, and ``indptr`` the start
+    of each gene's run, so gene ``i`` owns ``data[indptr[i]:indptr[i + 1]]``.
+    Column indices are sorted within each row. Unmeasured cells are not
+    stored; there are no NaN values in ``data``.
+
+    For a table where 5% of the cells are measured this takes about a tenth
+    of the memory of the dense float32 ExpressionMatrix.
+    """
+
+    def __init__(self, data: np.ndarray, indices: np.ndarray, indptr: np.ndarray,
+                 genes: Iterable[str], tissues: Iterable[str], dtype: Any = np.float32):
+        """Create a matrix from CSR arrays and their row/column labels.
+
+        Args:
+            data: Measured values, row by row
+            indices: Tissue column of each value
+            indptr: Offsets into ``data`` of each gene's run (length n_genes + 1)
+            genes: Gene names, one per row
+            tissues: UBERON ids, one per column
+            dtype: Floating point dtype used to store the values
+        """
+        self.data = np.asarray(data, dtype=dtype)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.genes = np.asarray(list(genes), dtype=str)
+        self.tissues = np.asarray(list(tissues), dtype=str)
+
+        if self.data.ndim != 1 or self.indices.shape != self.data.shape:
+            raise ValueError("CSR data and indices must be 1-D arrays of the same length")
+        if self.indptr.shape != (len(self.genes) + 1,):
+            raise ValueError(
+                f"indptr has {len(self.indptr)} entries, expected {len(self.genes) + 1} "
+                f"for {len(self.genes)} genes"
+            )
+        if self.indptr[0] != 0 or self.indptr[-1] != len(self.data) or np.any(np.diff(self.indptr) < 0):
+            raise ValueError("indptr must start at 0, be non-decreasing and end at len(data)")
+        if self.indices.size and (self.indices.min() < 0 or self.indices.max() >= len(self.tissues)):
+            raise ValueError("Tissue index out of range")
+
+        self._gene_index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_long(cls, genes: Iterable[str], tissues: Iterable[str], values: Iterable[float],
+                  dtype: Any = np.float32) -> 'SparseExpressionMatrix':
+        """Build a matrix from long/tidy (gene, UBERON id, value) columns.
+
+        Genes and tissues are ordered by first appearance. Missing (NaN)
+        values are dropped; if a (gene, tissue) pair occurs more than once
+        the last value wins.
+
+        Args:
+            genes: Gene name of each record
+            tissues: UBERON id of each record
+            values: Expression value of each record
+            dtype: Floating point dtype used to store the values
+
+        Returns:
+            SparseExpressionMatrix holding the records
+        """
+        rows, gene_names = pd.factorize(pd.Index(genes, dtype=object), sort=False)
+        cols, tissue_names = pd.factorize(pd.Index(tissues, dtype=object), sort=False)
+        values = np.asarray(values, dtype=np.float64)
+        if not (len(rows) == len(cols) == len(values)):
+            raise ValueError("Gene, tissue and value columns must have the same length")
+        return cls.from_coordinates(rows, cols, values, [str(g) for g in gene_names],
+                                    [str(t) for t in tissue_names], dtype=dtype)
+
+    @classmethod
+    def from_coordinates(cls, rows: np.ndarray, cols: np.ndarray, values: np.ndarray,
+                         genes: list, tissues: list, dtype: Any = np.float32) -> 'SparseExpressionMatrix':
+        """Build a matrix from (row, col, value) triples against the given labels.
+
+        NaN values are dropped; for repeated (row, col) pairs the last value wins.
+        """
+        keep = ~np.isnan(values)
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+
+        # Stable sort by (row, col) keeps duplicates in input order; take the last of each run
+        order = np.lexsort((cols, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        if rows.size:
+            last = np.append((rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1]), True)
+            rows, cols, values = rows[last], cols[last], values[last]
+
+        indptr = np.zeros(len(genes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(genes)), out=indptr[1:])
+        return cls(values, cols, indptr, genes, tissues, dtype=dtype)
+
+    @classmethod
+    def from_dense(cls, matrix: ExpressionMatrix) -> 'SparseExpressionMatrix':
+        """Convert a dense ExpressionMatrix, keeping only its measured cells."""
+        rows, cols = np.nonzero(~np.isnan(matrix.values))
+        indptr = np.zeros(matrix.n_genes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=matrix.n_genes), out=indptr[1:])
+        return cls(matrix.values[rows, cols], cols, indptr, matrix.genes, matrix.tissues,
+                   dtype=matrix.values.dtype)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], dtype: Any = np.float32) -> 'SparseExpressionMatrix':
+        """Build a matrix from the nested ``{"genes": {...}}`` format."""
+        if not isinstance(data, dict) or not isinstance(data.get('genes'), dict):
+            raise ValueError("Data must be a dictionary with a 'genes' dictionary")
+
+        gene_dicts = list(data['genes'].values())
+        genes = [str(gene) for gene in data['genes'].keys()]
+        counts = np.fromiter((len(tissues) for tissues in gene_dicts), dtype=np.int64,
+                             count=len(gene_dicts))
+        flat_tissues = [tissue for tissues in gene_dicts for tissue in tissues]
+        flat_values = np.fromiter(
+            (value for tissues in gene_dicts for value in tissues.values()),
+            dtype=np.float64, count=len(flat_tissues)
+        )
+        cols, tissues = pd.factorize(pd.Index(flat_tissues, dtype=object), sort=False)
+        rows = np.repeat(np.arange(len(genes)), counts)
+        return cls.from_coordinates(rows, cols, flat_values, genes,
+                                    [str(tissue) for tissue in tissues], dtype=dtype)
+
+    def to_dense(self) -> ExpressionMatrix:
+        """Expand to a dense ExpressionMatrix with NaN for unmeasured cells."""
+        values = np.full(self.shape, np.nan, dtype=self.data.dtype)
+        values[self.row_ids(), self.indices] = self.data
+        return ExpressionMatrix(values, self.genes, self.tissues, dtype=self.data.dtype)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the nested ``{"genes": {...}}`` format (genes keep tissue column order)."""
+        cells = self.data
+        if cells.dtype == np.float32:
+            cells = _shortest_float64(cells)
+        flat_values = cells.tolist()
+        flat_tissues = self.tissues[self.indices].tolist()
+        bounds = self.indptr.tolist()
+
+        return {"genes": {
+            gene: dict(zip(flat_tissues[bounds[row]:bounds[row + 1]],
+                           flat_values[bounds[row]:bounds[row + 1]]))
+            for row, gene in enumerate(self.genes.tolist())
+        }}
+
+    @property
+    def shape(self):
+        return (len(self.genes), len(self.tissues))
+
+    @property
+    def n_genes(self) -> int:
+        return len(self.genes)
+
+    @property
+    def n_tissues(self) -> int:
+        return len(self.tissues)
+
+    @property
+    def nnz(self) -> int:
+        """Number of measured cells."""
+        return len(self.data)
+
+    @property
+    def density(self) -> float:
+        """Fraction of cells that hold a measurement."""
+        cells = self.n_genes * self.n_tissues
+        return self.nnz / cells if cells else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the CSR and label arrays."""
+        return (self.data.nbytes + self.indices.nbytes + self.indptr.nbytes
+                + self.genes.nbytes + self.tissues.nbytes)
+
+    def row_ids(self) -> np.ndarray:
+        """Row (gene) position of every stored value."""
+        return np.repeat(np.arange(self.n_genes), np.diff(self.indptr))
+
+    def row_counts(self) -> np.ndarray:
+        """Number of measured tissues per gene."""
+        return np.diff(self.indptr)
+
+    def gene_index(self) -> Dict[str, int]:
+        """Map of gene name to row position (built on first use)."""
+        if self._gene_index is None:
+            self._gene_index = {gene: row for row, gene in enumerate(self.genes.tolist())}
+        return self._gene_index
+
+    def gene_values(self, gene: str) -> Dict[str, float]:
+        """Get the ``{uberon_id: value}`` mapping for a single gene.
+
+        Raises:
+            KeyError: If the gene is not in the matrix
+        """
+        row = self.gene_index()[gene]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        cells = self.data[start:end]
+        if cells.dtype == np.float32:
+            cells = _shortest_float64(cells)
+        return dict(zip(self.tissues[self.indices[start:end]].tolist(), cells.tolist()))
+
+    def gene_vector(self, gene: str) -> np.ndarray:
+        """The gene's values laid out against ``tissues``, NaN where unmeasured.
+
+        Raises:
+            KeyError: If the gene is not in the matrix
+        """
+        row = self.gene_index()[gene]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        vector = np.full(self.n_tissues, np.nan, dtype=self.data.dtype)
+        vector[self.indices[start:end]] = self.data[start:end]
+        return vector
+
+    def with_data(self, data: np.ndarray) -> 'SparseExpressionMatrix':
+        """A matrix with the same sparsity pattern and labels but new values."""
+        return SparseExpressionMatrix(data, self.indices, self.indptr, self.genes, self.tissues,
+                                      dtype=self.data.dtype)
+
+    def filter_cells(self, keep: np.ndarray) -> 'SparseExpressionMatrix':
+        """Keep only the stored values where ``keep`` is True and drop genes left empty."""
+        counts = np.bincount(self.row_ids()[keep], minlength=self.n_genes)
+        rows = counts > 0
+        indptr = np.zeros(int(rows.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[rows], out=indptr[1:])
+        return SparseExpressionMatrix(self.data[keep], self.indices[keep], indptr,
+                                      self.genes[rows], self.tissues, dtype=self.data.dtype)
+
+    def copy(self) -> 'SparseExpressionMatrix':
+        return SparseExpressionMatrix(self.data.copy(), self.indices.copy(), self.indptr.copy(),
+                                      self.genes, self.tissues, dtype=self.data.dtype)
+
+    def __contains__(self, gene: str) -> bool:
+        return gene in self.gene_index()
+
+    def __len__(self) -> int:
+        return self.n_genes
+
+    def __repr__(self) -> str:
+        return (f"SparseExpressionMatrix({self.n_genes} genes x {self.n_tissues} tissues, "
+                f"{self.nnz} values ({self.density:.1%}), dtype={self.data.dtype})")
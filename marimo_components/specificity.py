@@ -0,0 +1,151 @@
+"""Tissue-specificity scores for every gene of an expression matrix.
+
+All scores are computed over each gene's measured tissues in axis-wise
+passes over blocks of gene rows:
+
+- ``tau``: Yanai et al. specificity index, ``sum(1 - x / max) / (n - 1)``;
+  0 for uniform expression, 1 for expression in a single tissue
+- ``gini``: Gini coefficient of the gene's values across tissues (0 = even, 1 = concentrated)
+- ``max_z``: how many standard deviations the highest tissue sits above the gene's mean
+
+tau and Gini are defined on non-negative values, so negative values count
+as 0 for them. Genes with fewer than two measured tissues, or no positive
+value, get NaN for tau and Gini; a gene with constant values gets NaN max-z.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Iterator, Optional, Union
+
+from .expression_matrix import ExpressionMatrix
+from .sparse_matrix import SparseExpressionMatrix
+
+METRICS = ('tau', 'gini', 'max_z')
+
+DEFAULT_BLOCK_ROWS = 16_384
+
+Matrix = Union[ExpressionMatrix, SparseExpressionMatrix]
+
+
+def gene_blocks(matrix: Matrix, rows: int = DEFAULT_BLOCK_ROWS) -> Iterator[np.ndarray]:
+    """Yield the matrix as dense blocks of ``rows`` genes, NaN for unmeasured cells.
+
+    Dense blocks are views; a sparse matrix is expanded one block at a time.
+    """
+    for start in range(0, matrix.n_genes, rows):
+        end = min(start + rows, matrix.n_genes)
+        if isinstance(matrix, ExpressionMatrix):
+            yield matrix.values[start:end]
+            continue
+        lo, hi = matrix.indptr[start], matrix.indptr[end]
+        block = np.full((end - start, matrix.n_tissues), np.nan, dtype=matrix.data.dtype)
+        block_rows = np.repeat(np.arange(end - start), np.diff(matrix.indptr[start:end + 1]))
+        block[block_rows, matrix.indices[lo:hi]] = matrix.data[lo:hi]
+        yield block
+
+
+def tau(n: np.ndarray, total: np.ndarray, peak: np.ndarray) -> np.ndarray:
+    """tau per gene from its measured-tissue count, sum and max of non-negative values.
+
+    ``sum(1 - x / max) / (n - 1)`` simplifies to ``(n - sum / max) / (n - 1)``.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = (n - total / peak) / (n - 1)
+    scores[(n < 2) | ~(peak > 0)] = np.nan
+    return scores
+
+
+def specificity_scores(matrix: Matrix, block_rows: int = DEFAULT_BLOCK_ROWS) -> pd.DataFrame:
+    """Score every gene's tissue specificity.
+
+    Args:
+        matrix: Dense or sparse expression matrix
+        block_rows: Genes processed per block (bounds temporary memory)
+
+    Returns:
+        DataFrame with columns 'gene', 'top_tissue' (UBERON id of the highest
+        value, None for genes without values), 'top_value', 'tissues'
+        (measured tissue count), 'tau', 'gini' and 'max_z', in the matrix's
+        gene order
+    """
+    n_genes = matrix.n_genes
+    top = np.full(n_genes, -1, dtype=np.int64)
+    columns = {name: np.empty(n_genes) for name in ('top_value', 'tau', 'gini', 'max_z')}
+    counts = np.empty(n_genes, dtype=np.int64)
+
+    start = 0
+    for block in gene_blocks(matrix, block_rows):
+        end = start + len(block)
+        observed = ~np.isnan(block)
+        n = observed.sum(axis=1)
+        measured = n > 0
+        rows = np.arange(len(block))
+
+        best = np.where(observed, block, -np.inf).argmax(axis=1)
+        peak_raw = block[rows, best].astype(np.float64)
+        peak_raw[~measured] = np.nan
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(observed, block, 0).sum(axis=1, dtype=np.float64) / n
+            std = np.sqrt((np.where(observed, block - mean[:, None], 0) ** 2).sum(axis=1, dtype=np.float64) / n)
+            max_z = (peak_raw - mean) / std
+        max_z[~(std > 0)] = np.nan
+
+        # Ascending non-negative values (NaN last) for the rank-weighted Gini sum
+        ordered = np.sort(np.maximum(block, 0), axis=1)
+        present = ~np.isnan(ordered)
+        total = np.where(present, ordered, 0).sum(axis=1, dtype=np.float64)
+        ranked = np.where(present, ordered * np.arange(1, block.shape[1] + 1), 0).sum(axis=1, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gini = 2 * ranked / (n * total) - (n + 1) / n
+        gini[(n < 2) | ~(total > 0)] = np.nan
+
+        peak = np.maximum(peak_raw, 0)
+        top[start:end] = np.where(measured, best, -1)
+        counts[start:end] = n
+        columns['top_value'][start:end] = peak_raw
+        columns['tau'][start:end] = tau(n, total, peak)
+        columns['gini'][start:end] = gini
+        columns['max_z'][start:end] = max_z
+        start = end
+
+    top_tissue = np.full(n_genes, None, dtype=object)
+    top_tissue[top >= 0] = matrix.tissues[top[top >= 0]]
+    return pd.DataFrame({
+        'gene': matrix.genes,
+        'top_tissue': top_tissue,
+        'top_value': columns['top_value'],
+        'tissues': counts,
+        'tau': columns['tau'],
+        'gini': columns['gini'],
+        'max_z': columns['max_z'],
+    })
+
+
+def top_specific_genes(scores: pd.DataFrame, uberon_id: str, k: int = 20, by: str = 'tau',
+                       min_score: Optional[float] = None) -> pd.DataFrame:
+    """The ``k`` genes most specific to one tissue.
+
+    A gene counts for the tissue where its expression is highest; genes are
+    ranked by ``by`` (higher is more specific) and genes with a NaN score are
+    left out.
+
+    Args:
+        scores: Output of :func:`specificity_scores`
+        uberon_id: Tissue to rank genes for
+        k: Number of genes to return
+        by: Score to rank by, one of METRICS
+        min_score: Optional lower bound on the score
+
+    Returns:
+        Rows of ``scores`` for the top genes, best first
+
+    Raises:
+        ValueError: If ``by`` is not one of METRICS
+    """
+    if by not in METRICS:
+        raise ValueError(f"Unsupported specificity metric: {by}. Supported: {', '.join(METRICS)}")
+    candidates = scores[(scores['top_tissue'] == uberon_id) & scores[by].notna()]
+    if min_score is not None:
+        candidates = candidates[candidates[by] >= min_score]
+    return candidates.nlargest(k, by).reset_index(drop=True)
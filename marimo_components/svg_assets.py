@@ -0,0 +1,390 @@
+"""Bundled anatomogram SVGs and the build-time step that minimizes them.
+
+The SVGs in ``assets/svg`` are Inkscape documents: most of their size is
+editor metadata, RDF blocks and coordinates with six or more decimals.
+``preprocess_bundled_svgs`` writes a ``.min.svg`` variant of each one
+next to the original and records the size reduction in ``manifest.json``.
+It also writes an ``.index.json`` per SVG mapping each UBERON element to
+the leaf shapes it colors, so the widget never has to scan the DOM.
+
+Run it after updating the source SVGs:
+
+    python -m marimo_components.svg_assets --precision 2
+"""
+
+import argparse
+import functools
+import json
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Any, Optional, Set, Union
+
+# Anatomogram SVGs bundled with the repository
+SVG_DIR = Path(__file__).parent.parent / "assets" / "svg"
+SVG_SEXES = ('male', 'female')
+MANIFEST_FILE = "manifest.json"
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+
+# Namespaces written by editors that browsers ignore
+EDITOR_NAMESPACES = {
+    "http://www.inkscape.org/namespaces/inkscape",
+    "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "http://creativecommons.org/ns#",
+    "http://purl.org/dc/elements/1.1/",
+}
+
+# Ontology term ids (UBERON_0002107, CL_0000738, ...) are what the widget colors
+ONTOLOGY_ID = re.compile(r"^[A-Z]+_\d+$")
+
+# Attributes holding coordinates; transforms keep extra digits because they scale
+COORDINATE_ATTRIBUTES = {"x", "y", "x1", "y1", "x2", "y2", "cx", "cy",
+                         "r", "rx", "ry", "width", "height", "viewBox"}
+TRANSFORM_EXTRA_DIGITS = 3
+
+# Only decimals are rounded; integers (such as arc flags) are left untouched
+DECIMAL_NUMBER = re.compile(r"-?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][-+]?\d+)?")
+ID_REFERENCE = re.compile(r"url\(#([^)]+)\)")
+# Whitespace/comma separated tokens of a style value (``#1e5f00``, ``url(#a)``, ``0.5``)
+STYLE_TOKEN = re.compile(r"[^\s,]+")
+PATH_TOKEN = re.compile(r"[MmZzLlHhVvCcSsQqTtAa]|-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+# Leaf shapes colored for a tissue (same selector as the widget front end)
+SHAPE_TAGS = {"path", "rect", "circle", "polygon", "ellipse"}
+TISSUE_ID_PREFIX = "UBERON"
+INDEX_VERSION = 1
+
+# Style properties left as-is: the widget's stylesheet targets them, so dropping
+# an inherited duplicate would change what is rendered
+PROTECTED_STYLE_PROPERTIES = {"fill", "stroke", "stroke-width"}
+
+# Initial values of inherited presentation properties
+INHERITED_STYLE_DEFAULTS = {
+    "fill-opacity": "1",
+    "fill-rule": "nonzero",
+    "stroke-opacity": "1",
+    "stroke-dasharray": "none",
+    "stroke-dashoffset": "0",
+    "stroke-linecap": "butt",
+    "stroke-linejoin": "miter",
+    "stroke-miterlimit": "4",
+    "font-style": "normal",
+    "font-variant": "normal",
+    "font-weight": "normal",
+    "font-stretch": "normal",
+    "letter-spacing": "normal",
+    "word-spacing": "normal",
+    "visibility": "visible",
+}
+
+# Initial values of non-inherited properties
+STYLE_DEFAULTS = {
+    "opacity": "1",
+    "display": "inline",
+    "overflow": "visible",
+    "marker": "none",
+    "enable-background": "accumulate",
+}
+
+
+def bundled_svg_path(sex: str, minimized: bool = True) -> Path:
+    """Path of the bundled SVG for a sex, preferring the minimized variant if built."""
+    if sex not in SVG_SEXES:
+        raise ValueError(f"Unknown anatomogram sex: {sex!r}")
+    original = SVG_DIR / f"homo_sapiens.{sex}.svg"
+    minimized_path = original.with_suffix(".min.svg")
+    if minimized and minimized_path.exists():
+        return minimized_path
+    return original
+
+
+@functools.lru_cache(maxsize=None)
+def load_bundled_svg(sex: str, minimized: bool = True) -> bytes:
+    """Read the bundled anatomogram SVG for a sex ('male' or 'female')."""
+    return bundled_svg_path(sex, minimized).read_bytes()
+
+
+def _index_path(svg_path: Path) -> Path:
+    return svg_path.with_name(svg_path.name[:-len(".svg")] + ".index.json")
+
+
+@functools.lru_cache(maxsize=None)
+def load_bundled_index(sex: str, minimized: bool = True) -> Dict[str, Any]:
+    """UBERON element index for the bundled SVG served for a sex.
+
+    Reads the ``.index.json`` written by the build step, or builds the index
+    from the SVG if it is missing.
+    """
+    svg_path = bundled_svg_path(sex, minimized)
+    index_path = _index_path(svg_path)
+    if index_path.exists():
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    return build_tissue_index(svg_path.read_bytes())
+
+
+def build_tissue_index(svg: Union[bytes, str]) -> Dict[str, Any]:
+    """Map each UBERON element of an SVG to the leaf shapes it colors.
+
+    Positions refer to the SVG's descendant elements in document order,
+    which is the order of ``svg.getElementsByTagName('*')`` in the browser.
+    A ``<g>`` colors every path/rect/circle/polygon/ellipse below it; any
+    other element colors itself.
+
+    Args:
+        svg: SVG document
+
+    Returns:
+        ``{"version", "element_count", "tissues": [[id, position, [shape positions]], ...]}``
+        with tissues in document order
+    """
+    root = ET.fromstring(svg)
+    elements = list(root.iter())[1:]
+    positions = {id(element): i for i, element in enumerate(elements)}
+
+    tissues = []
+    for position, element in enumerate(elements):
+        element_id = element.get("id")
+        if not element_id or not element_id.startswith(TISSUE_ID_PREFIX):
+            continue
+        if _local_name(element.tag) == "g":
+            shapes = [positions[id(child)] for child in element.iter()
+                      if child is not element and _local_name(child.tag) in SHAPE_TAGS]
+        else:
+            shapes = [position]
+        tissues.append([element_id, position, shapes])
+
+    return {"version": INDEX_VERSION, "element_count": len(elements), "tissues": tissues}
+
+
+def _write_index(svg_path: Path, svg: bytes) -> Path:
+    index_path = _index_path(svg_path)
+    with open(index_path, "w") as f:
+        json.dump(build_tissue_index(svg), f, separators=(",", ":"))
+    return index_path
+
+
+def _namespace(name: str) -> Optional[str]:
+    return name[1:].split("}", 1)[0] if name.startswith("{") else None
+
+
+def _local_name(name: str) -> str:
+    return name.rsplit("}", 1)[-1]
+
+
+def _format_number(match: re.Match, digits: int) -> str:
+    text = f"{round(float(match.group(0)), digits):.{digits}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def _round_numbers(value: str, digits: int) -> str:
+    return DECIMAL_NUMBER.sub(lambda m: _format_number(m, digits), value)
+
+
+def _round_style_value(value: str, digits: int) -> str:
+    """Round the numbers of a style value, leaving hex colors and ``url(#id)`` references alone."""
+    return STYLE_TOKEN.sub(lambda m: m.group() if m.group().startswith(("#", "url("))
+                           else _round_numbers(m.group(), digits), value)
+
+
+def _compact_path(path: str) -> str:
+    """Rejoin path data with the fewest separators (``M 1,2 L 3,-4`` -> ``M1 2L3-4``)."""
+    parts = []
+    previous = None
+    for token in PATH_TOKEN.findall(path):
+        if (previous is not None and not previous.isalpha() and not token.isalpha()
+                and not token.startswith("-")):
+            parts.append(" ")
+        parts.append(token)
+        previous = token
+    return "".join(parts)
+
+
+def _parse_style(style: str) -> Dict[str, str]:
+    properties = {}
+    for declaration in style.split(";"):
+        if ":" in declaration:
+            name, value = declaration.split(":", 1)
+            properties[name.strip()] = value.strip()
+    return properties
+
+
+def _collapse_style(style: str, inherited: Dict[str, str], digits: int) -> Dict[str, str]:
+    """Drop editor-only and redundant properties; returns the kept properties."""
+    kept = {}
+    for name, value in _parse_style(style).items():
+        if name.startswith("-inkscape") or not value:
+            continue
+        value = _round_style_value(value, digits + TRANSFORM_EXTRA_DIGITS)
+        if name not in PROTECTED_STYLE_PROPERTIES:
+            if name in INHERITED_STYLE_DEFAULTS and inherited.get(name) == value:
+                continue
+            if STYLE_DEFAULTS.get(name) == value:
+                continue
+        kept[name] = value
+    return kept
+
+
+def _referenced_ids(root: ET.Element) -> Set[str]:
+    """Ids referenced through ``url(#id)`` or ``href="#id"``."""
+    referenced = set()
+    for element in root.iter():
+        for name, value in element.attrib.items():
+            referenced.update(ID_REFERENCE.findall(value))
+            if _local_name(name) == "href" and value.startswith("#"):
+                referenced.add(value[1:])
+    return referenced
+
+
+def _strip_editor_content(element: ET.Element):
+    """Remove editor namespaces and metadata below ``element`` (in place)."""
+    for child in list(element):
+        if not isinstance(child.tag, str):
+            continue
+        if _namespace(child.tag) in EDITOR_NAMESPACES or _local_name(child.tag) == "metadata":
+            element.remove(child)
+        else:
+            _strip_editor_content(child)
+
+    for name in list(element.attrib):
+        if _namespace(name) in EDITOR_NAMESPACES:
+            del element.attrib[name]
+
+
+def _minimize_element(element: ET.Element, inherited: Dict[str, str], keep_ids: Set[str],
+                      digits: int):
+    """Round coordinates, collapse styles and drop unused ids (in place, recursive)."""
+    element_id = element.get("id")
+    if element_id is not None and element_id not in keep_ids and not ONTOLOGY_ID.match(element_id):
+        del element.attrib["id"]
+
+    for name, value in list(element.attrib.items()):
+        local = _local_name(name)
+        if local in ("d", "points"):
+            element.set(name, _compact_path(_round_numbers(value, digits)))
+        elif local in COORDINATE_ATTRIBUTES:
+            element.set(name, _round_numbers(value, digits))
+        elif local in ("transform", "gradientTransform", "patternTransform"):
+            element.set(name, _round_numbers(value, digits + TRANSFORM_EXTRA_DIGITS))
+
+    effective = inherited
+    style = element.get("style")
+    if style is not None:
+        kept = _collapse_style(style, inherited, digits)
+        effective = {**inherited, **{k: v for k, v in kept.items() if k in INHERITED_STYLE_DEFAULTS}}
+        if kept:
+            element.set("style", ";".join(f"{k}:{v}" for k, v in kept.items()))
+        else:
+            del element.attrib["style"]
+
+    # Whitespace between elements carries no meaning outside text content
+    if _local_name(element.tag) not in ("title", "desc", "text", "tspan"):
+        if element.text is not None and not element.text.strip():
+            element.text = None
+    if element.tail is not None and not element.tail.strip():
+        element.tail = None
+
+    for child in element:
+        _minimize_element(child, effective, keep_ids, digits)
+
+
+def _drop_unreferenced_defs(root: ET.Element, referenced: Set[str]):
+    for defs in root.iter(f"{{{SVG_NS}}}defs"):
+        for child in list(defs):
+            if child.get("id") not in referenced:
+                defs.remove(child)
+    for parent in root.iter():
+        for child in list(parent):
+            if child.tag == f"{{{SVG_NS}}}defs" and len(child) == 0:
+                parent.remove(child)
+
+
+def minimize_svg(svg: Union[bytes, str], precision: int = 2) -> bytes:
+    """Produce a minimized copy of an anatomogram SVG.
+
+    Editor namespaces, ``<metadata>`` and unreferenced ``<defs>`` entries are
+    removed, coordinates are rounded to ``precision`` decimals (transforms
+    keep three more) and path data is rejoined without redundant separators.
+    Styles are collapsed and ids that are neither ontology terms nor
+    referenced elsewhere are dropped.
+
+    Args:
+        svg: SVG document
+        precision: Number of decimals kept for coordinates
+
+    Returns:
+        Minimized SVG document as UTF-8 bytes
+    """
+    ET.register_namespace("", SVG_NS)
+    ET.register_namespace("xlink", XLINK_NS)
+
+    root = ET.fromstring(svg)
+    _strip_editor_content(root)
+    referenced = _referenced_ids(root)
+    _drop_unreferenced_defs(root, referenced)
+    _minimize_element(root, dict(INHERITED_STYLE_DEFAULTS), referenced, precision)
+
+    return ET.tostring(root, encoding="utf-8", xml_declaration=False)
+
+
+def preprocess_bundled_svgs(svg_dir: Path = SVG_DIR, precision: int = 2) -> Dict[str, Any]:
+    """Write a ``.min.svg`` next to each bundled SVG and record the savings.
+
+    Args:
+        svg_dir: Directory holding the ``homo_sapiens.<sex>.svg`` files
+        precision: Number of decimals kept for coordinates
+
+    Returns:
+        The manifest written to ``manifest.json``
+    """
+    svg_dir = Path(svg_dir)
+    manifest = {"precision": precision, "files": {}}
+
+    for sex in SVG_SEXES:
+        source = svg_dir / f"homo_sapiens.{sex}.svg"
+        original = source.read_bytes()
+        minimized = minimize_svg(original, precision=precision)
+
+        target = source.with_suffix(".min.svg")
+        target.write_bytes(minimized)
+
+        manifest["files"][source.name] = {
+            "minimized": target.name,
+            "index": _write_index(source, original).name,
+            "minimized_index": _write_index(target, minimized).name,
+            "original_bytes": len(original),
+            "minimized_bytes": len(minimized),
+            "reduction": round(1 - len(minimized) / len(original), 4),
+        }
+
+    with open(svg_dir / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+    load_bundled_svg.cache_clear()
+    load_bundled_index.cache_clear()
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimize the bundled anatomogram SVGs.")
+    parser.add_argument("--precision", type=int, default=2,
+                        help="Decimals kept for coordinates (default: 2)")
+    parser.add_argument("--svg-dir", type=Path, default=SVG_DIR)
+    args = parser.parse_args()
+
+    manifest = preprocess_bundled_svgs(args.svg_dir, precision=args.precision)
+    for name, entry in manifest["files"].items():
+        print(f"{name}: {entry['original_bytes']:,} -> {entry['minimized_bytes']:,} bytes "
+              f"({entry['reduction']:.1%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
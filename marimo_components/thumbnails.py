@@ -0,0 +1,482 @@
+"""Small per-gene anatomogram thumbnails, rendered in batch and cached on disk.
+
+The full anatomograms are far too detailed to repeat next to every row of a
+gene table, so thumbnails are drawn from a flat template built once per
+sex and size from the bundled SVG: every visible shape is transformed into
+root coordinates, curves become polylines, points closer than a fraction
+of a pixel to the outline are dropped and consecutive shapes with the same
+fill are merged into one path. A thumbnail is that template with each
+tissue's fill spliced in, colored with the widget's palette rules
+(``colormaps``).
+
+Thumbnails are flat SVG by default; PNG needs the optional cairosvg
+package. Large PNG batches are rendered on a process pool, and with a
+``cache_dir`` each thumbnail is stored under the data fingerprint and the
+gene, so only genes never rendered with the same data and settings cost
+anything.
+"""
+
+import base64
+import functools
+import math
+import multiprocessing
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from . import caching
+from .colormaps import DEFAULT_PALETTE, NO_DATA_COLOR, color_values
+from .expression_matrix import ExpressionMatrix
+from .sparse_matrix import SparseExpressionMatrix
+from .svg_assets import (PATH_TOKEN, SHAPE_TAGS, SVG_SEXES, _local_name, _parse_style,
+                         load_bundled_index, load_bundled_svg)
+
+FORMATS = ('svg', 'png')
+DEFAULT_WIDTH = 48
+
+# Outline points closer than this many pixels to the simplified outline are dropped
+TOLERANCE_PX = 0.35
+# Points per Bezier segment when curves are flattened to polylines
+CURVE_STEPS = 4
+# Coordinates are written as integers in 1/SUBPIXELS of a thumbnail pixel
+SUBPIXELS = 4
+
+# Genes per task submitted to the process pool
+DEFAULT_CHUNK_GENES = 256
+# Smallest batch worth a process pool. A spawned worker costs about a second
+# (interpreter, numpy, template parse) while flat SVG renders at ~50us per
+# gene, so SVG batches almost always stay in-process; PNG time is dominated
+# by cairosvg and spreads over workers much sooner
+POOL_MIN_GENES = {'svg': 200_000, 'png': 1_000}
+
+_THUMBNAIL_DIR = "thumbnails"
+_MIME_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_SKIPPED_TAGS = {"defs", "title", "desc", "metadata", "clipPath", "mask", "symbol", "pattern"}
+
+Matrix = Union[ExpressionMatrix, SparseExpressionMatrix]
+
+
+def _import_cairosvg():
+    try:
+        import cairosvg
+    except ImportError:
+        raise ImportError("PNG thumbnails need the optional cairosvg package: pip install cairosvg")
+    return cairosvg
+
+
+def _parse_transform(value: Optional[str]) -> np.ndarray:
+    """3x3 affine matrix of an SVG ``transform`` attribute."""
+    result = np.eye(3)
+    for name, args in _TRANSFORM.findall(value or ""):
+        numbers = [float(n) for n in _NUMBER.findall(args)]
+        step = np.eye(3)
+        if name == 'matrix' and len(numbers) == 6:
+            step[:2] = np.array(numbers).reshape(3, 2).T
+        elif name == 'translate' and numbers:
+            step[:2, 2] = [numbers[0], numbers[1] if len(numbers) > 1 else 0.0]
+        elif name == 'scale' and numbers:
+            step[0, 0], step[1, 1] = numbers[0], numbers[1] if len(numbers) > 1 else numbers[0]
+        elif name == 'rotate' and numbers:
+            angle = math.radians(numbers[0])
+            cx, cy = (numbers[1], numbers[2]) if len(numbers) == 3 else (0.0, 0.0)
+            cos, sin = math.cos(angle), math.sin(angle)
+            step[:2] = [[cos, -sin, cx - cos * cx + sin * cy], [sin, cos, cy - sin * cx - cos * cy]]
+        elif name == 'skewX' and numbers:
+            step[0, 1] = math.tan(math.radians(numbers[0]))
+        elif name == 'skewY' and numbers:
+            step[1, 0] = math.tan(math.radians(numbers[0]))
+        result = result @ step
+    return result
+
+
+def _path_outlines(d: str) -> List[np.ndarray]:
+    """Subpaths of SVG path data as point arrays (curves sampled, arcs as chords)."""
+    tokens = PATH_TOKEN.findall(d)
+    steps = np.linspace(0, 1, CURVE_STEPS + 1)[1:, None]
+    outlines, points = [], []
+    x = y = 0.0
+    start = (0.0, 0.0)
+    cubic = quad = None
+    command = None
+    i = 0
+
+    def flush():
+        if len(points) > 1:
+            outlines.append(np.array(points))
+        points.clear()
+
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            command = tokens[i]
+            i += 1
+        elif command is None or command in 'Zz':
+            break
+        kind, relative = command.upper(), command.islower()
+        if kind == 'Z':
+            flush()
+            x, y = start
+            cubic = quad = None
+            continue
+
+        arity = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7}[kind]
+        if i + arity > len(tokens) or any(token.isalpha() for token in tokens[i:i + arity]):
+            break
+        args = [float(token) for token in tokens[i:i + arity]]
+        i += arity
+        ox, oy = (x, y) if relative else (0.0, 0.0)
+        if kind != 'M' and not points:
+            points.append((x, y))  # drawing on after a close starts from the subpath start
+
+        if kind == 'M':
+            flush()
+            x, y = ox + args[0], oy + args[1]
+            start = (x, y)
+            points.append(start)
+            command = 'l' if relative else 'L'  # extra pairs are implicit line-tos
+        elif kind in 'LTA':
+            end = (ox + args[-2], oy + args[-1])
+            if kind == 'T':
+                control = (2 * x - quad[0], 2 * y - quad[1]) if quad else (x, y)
+                t = steps
+                points.extend(((1 - t) ** 2 * (x, y) + 2 * (1 - t) * t * control + t ** 2 * end).tolist())
+                quad = control
+            else:
+                points.append(end)
+            x, y = end
+        elif kind == 'H':
+            x = ox + args[0]
+            points.append((x, y))
+        elif kind == 'V':
+            y = oy + args[0]
+            points.append((x, y))
+        elif kind in 'CS':
+            if kind == 'C':
+                first = (ox + args[0], oy + args[1])
+            else:
+                first = (2 * x - cubic[0], 2 * y - cubic[1]) if cubic else (x, y)
+            second = (ox + args[-4], oy + args[-3])
+            end = (ox + args[-2], oy + args[-1])
+            t = steps
+            curve = ((1 - t) ** 3 * (x, y) + 3 * (1 - t) ** 2 * t * first
+                     + 3 * (1 - t) * t ** 2 * second + t ** 3 * end)
+            points.extend(curve.tolist())
+            cubic = second
+            x, y = end
+        elif kind == 'Q':
+            control = (ox + args[0], oy + args[1])
+            end = (ox + args[2], oy + args[3])
+            t = steps
+            points.extend(((1 - t) ** 2 * (x, y) + 2 * (1 - t) * t * control + t ** 2 * end).tolist())
+            quad = control
+            x, y = end
+        if kind not in 'CS':
+            cubic = None
+        if kind not in 'QT':
+            quad = None
+    flush()
+    return outlines
+
+
+def _ellipse(cx: float, cy: float, rx: float, ry: float, segments: int = 16) -> np.ndarray:
+    angles = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    return np.column_stack([cx + rx * np.cos(angles), cy + ry * np.sin(angles)])
+
+
+def _length(element: ET.Element, name: str) -> float:
+    """A numeric attribute (units and percentages ignored), 0 if missing."""
+    match = _NUMBER.match(element.get(name, "").strip())
+    return float(match.group(0)) if match else 0.0
+
+
+def _shape_outlines(element: ET.Element) -> List[np.ndarray]:
+    """Outlines of one leaf shape in its own coordinate system."""
+    tag = _local_name(element.tag)
+    number = functools.partial(_length, element)
+    if tag == 'path':
+        return _path_outlines(element.get('d', ''))
+    if tag == 'rect':
+        x, y, w, h = number('x'), number('y'), number('width'), number('height')
+        return [np.array([(x, y), (x + w, y), (x + w, y + h), (x, y + h)])]
+    if tag == 'circle':
+        return [_ellipse(number('cx'), number('cy'), number('r'), number('r'))]
+    if tag == 'ellipse':
+        return [_ellipse(number('cx'), number('cy'), number('rx'), number('ry'))]
+    if tag == 'polygon':
+        values = [float(n) for n in _NUMBER.findall(element.get('points', ''))]
+        return [np.array(values[:len(values) // 2 * 2]).reshape(-1, 2)] if len(values) >= 4 else []
+    return []
+
+
+def _simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Ramer-Douglas-Peucker: drop points within ``tolerance`` of the kept outline."""
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last <= first + 1:
+            continue
+        chord = points[last] - points[first]
+        offsets = points[first + 1:last] - points[first]
+        length = math.hypot(*chord)
+        if length > 0:
+            distances = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack.extend(((first, middle), (middle, last)))
+    return points[keep]
+
+
+def _format_outline(points: np.ndarray) -> str:
+    """Closed path data on the integer grid, as relative moves (``M12 40l3-2 4 1z``).
+
+    Returns an empty string if fewer than three distinct points remain.
+    """
+    grid = np.rint(points).astype(np.int64)
+    moved = np.ones(len(grid), dtype=bool)
+    moved[1:] = (grid[1:] != grid[:-1]).any(axis=1)
+    grid = grid[moved]
+    if len(grid) < 3:
+        return ""
+    steps = np.diff(grid, axis=0).ravel().tolist()
+    text = [f"M{grid[0, 0]} {grid[0, 1]}l"]
+    for i, step in enumerate(steps):
+        # A minus sign separates numbers on its own
+        text.append(f"{step}" if i == 0 or step < 0 else f" {step}")
+    return "".join(text) + "z"
+
+
+@functools.lru_cache(maxsize=8)
+def thumbnail_template(sex: str = 'male',
+                       width: int = DEFAULT_WIDTH) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Flat SVG template for thumbnails of one sex and pixel width.
+
+    Returns:
+        ``(pieces, slots)``: SVG text pieces and the tissue id whose color goes
+        between ``pieces[i]`` and ``pieces[i + 1]``, so a thumbnail is
+        ``pieces[0] + color(slots[0]) + pieces[1] + ...``
+    """
+    if sex not in SVG_SEXES:
+        raise ValueError(f"Unknown anatomogram sex: {sex!r}")
+    svg = load_bundled_svg(sex)
+    index = load_bundled_index(sex)
+    root = ET.fromstring(svg)
+    elements = list(root.iter())[1:]
+    by_id = {element.get('id'): element for element in elements if element.get('id')}
+
+    # Leaf shape position -> tissue it is colored for (inner tissues win)
+    tissue_of = {}
+    for tissue, _, shapes in index['tissues']:
+        for position in shapes:
+            tissue_of[position] = tissue
+    positions = {id(element): i for i, element in enumerate(elements)}
+
+    view_box = [float(n) for n in _NUMBER.findall(root.get('viewBox', ''))]
+    if len(view_box) != 4:
+        view_box = [0.0, 0.0, _length(root, 'width') or 100.0, _length(root, 'height') or 100.0]
+    # Outlines are drawn on a grid of SUBPIXELS units per thumbnail pixel
+    scale = SUBPIXELS * width / view_box[2]
+    height = max(1, round(width * view_box[3] / view_box[2]))
+    tolerance = TOLERANCE_PX * SUBPIXELS
+    to_grid = np.diag([scale, scale, 1.0]) @ np.array([[1, 0, -view_box[0]], [0, 1, -view_box[1]], [0, 0, 1]])
+
+    # Consecutive shapes sharing a fill (static color, or None for a tissue
+    # slot): (fill, tissue, [<path> elements]) in paint order
+    runs: List[Tuple[Optional[str], Optional[str], List[str]]] = []
+
+    def paint(element: ET.Element, transform: np.ndarray, tissue: Optional[str],
+              fill_rule: str = 'nonzero', depth: int = 0):
+        tag = _local_name(element.tag)
+        style = _parse_style(element.get('style', ''))
+        if tag in _SKIPPED_TAGS or style.get('display') == 'none' or element.get('display') == 'none':
+            return
+        transform = transform @ _parse_transform(element.get('transform'))
+        own_tissue = tissue_of.get(positions.get(id(element)), tissue)
+        fill_rule = style.get('fill-rule', element.get('fill-rule', fill_rule))
+
+        if tag == 'use':
+            target = by_id.get((element.get('{http://www.w3.org/1999/xlink}href') or element.get('href') or '')[1:])
+            if target is not None and depth < 8:
+                offset = np.eye(3)
+                offset[:2, 2] = [_length(element, 'x'), _length(element, 'y')]
+                # The referenced shapes are drawn in the color of the tissue the <use> stands for
+                paint(target, transform @ offset, own_tissue, fill_rule, depth + 1)
+            return
+        if tag not in SHAPE_TAGS:
+            for child in element:
+                paint(child, transform, own_tissue, fill_rule, depth)
+            return
+
+        # Same fill rules as the widget: tissues take their color, inline fills
+        # are kept and every other shape gets the stylesheet's default gray
+        fill = None if own_tissue else style.get('fill', NO_DATA_COLOR)
+        if fill == 'none' and not own_tissue:
+            return
+        outlines = []
+        for outline in _shape_outlines(element):
+            points = outline @ transform[:2, :2].T + transform[:2, 2]
+            extent = points.max(axis=0) - points.min(axis=0)
+            if extent.max() < tolerance:
+                continue
+            outlines.append(_format_outline(_simplify(points, tolerance)))
+        outlines = [outline for outline in outlines if outline]
+        if not outlines:
+            return
+        # Shapes stay separate paths: merging overlapping shapes into one path
+        # could cancel their windings and punch holes
+        rule = ' fill-rule="evenodd"' if fill_rule == 'evenodd' else ''
+        shape = f'<path{rule} d="{"".join(outlines)}"/>'
+        if runs and runs[-1][0] == fill and runs[-1][1] == own_tissue:
+            runs[-1][2].append(shape)
+        else:
+            runs.append((fill, own_tissue, [shape]))
+
+    for child in root:
+        paint(child, to_grid, None)
+
+    pieces = [f'<svg xmlns="http://www.w3.org/2000/svg" '
+              f'viewBox="0 0 {SUBPIXELS * width} {round(view_box[3] * scale)}" '
+              f'width="{width}" height="{height}">']
+    slots = []
+    for fill, tissue, shapes in runs:
+        if tissue is None:
+            pieces[-1] += f'<g fill="{fill}">{"".join(shapes)}</g>'
+        else:
+            pieces[-1] += '<g fill="'
+            slots.append(tissue)
+            pieces.append(f'">{"".join(shapes)}</g>')
+    pieces[-1] += '</svg>'
+    return tuple(pieces), tuple(slots)
+
+
+def _render_batch(task) -> List[Tuple[str, bytes]]:
+    """Render a batch of genes; a top-level function so process pools can run it."""
+    genes, rows, tissues, sex, width, fmt, palette, scale_type, threshold = task
+    pieces, slots = thumbnail_template(sex, width)
+    columns = {tissue: i for i, tissue in enumerate(tissues)}
+    slot_columns = np.array([columns.get(tissue, -1) for tissue in slots], dtype=np.intp)
+    cairosvg = _import_cairosvg() if fmt == 'png' else None
+
+    rendered = []
+    for gene, row in zip(genes, rows):
+        colors = color_values(row, palette, scale_type, threshold).astype(object)
+        colors[colors == ""] = NO_DATA_COLOR
+        fills = np.append(colors, NO_DATA_COLOR)[slot_columns]
+        parts = [pieces[0]]
+        for fill, piece in zip(fills.tolist(), pieces[1:]):
+            parts.append(fill)
+            parts.append(piece)
+        svg = "".join(parts).encode()
+        rendered.append((gene, cairosvg.svg2png(bytestring=svg) if cairosvg else svg))
+    return rendered
+
+
+def _gene_rows(matrix: Matrix, genes: List[str]) -> np.ndarray:
+    """Dense float64 rows for ``genes``, NaN where a tissue is unmeasured."""
+    rows = np.empty((len(genes), matrix.n_tissues))
+    for i, gene in enumerate(genes):
+        rows[i] = matrix.gene_vector(gene)
+    return rows
+
+
+def render_thumbnails(matrix: Matrix, genes: Optional[Iterable[str]] = None, sex: str = 'male',
+                      width: int = DEFAULT_WIDTH, fmt: str = 'svg', palette: str = DEFAULT_PALETTE,
+                      scale_type: str = 'linear', threshold: float = 0.0,
+                      cache_dir: Optional[Union[str, Path]] = None, workers: Optional[int] = None,
+                      chunk_genes: int = DEFAULT_CHUNK_GENES,
+                      pool_min_genes: Optional[int] = None) -> Dict[str, bytes]:
+    """Render anatomogram thumbnails for many genes.
+
+    Args:
+        matrix: Dense or sparse expression matrix
+        genes: Genes to render (default: every gene of the matrix)
+        sex: Bundled anatomogram to draw ('male' or 'female')
+        width: Thumbnail width in pixels (the height follows the SVG's aspect ratio)
+        fmt: 'svg' (flat SVG) or 'png' (needs cairosvg)
+        palette: Palette name (see ``colormaps.PALETTES``)
+        scale_type: 'linear' or 'log'; each gene is scaled to its own range
+        threshold: Values below this are drawn without color
+        cache_dir: Optional directory where thumbnails are stored per data
+            fingerprint and gene, and read back on later calls
+        workers: Processes used for rendering (default: one per CPU)
+        chunk_genes: Genes per pool task
+        pool_min_genes: Genes to render below which no pool is started
+            (default: ``POOL_MIN_GENES[fmt]``)
+
+    Returns:
+        ``{gene: thumbnail bytes}`` in the order of ``genes``
+
+    Raises:
+        ValueError: If the format or sex is not supported, or a gene is unknown
+        ImportError: If PNG output is requested without cairosvg
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported thumbnail format: {fmt}. Supported: {', '.join(FORMATS)}")
+    if sex not in SVG_SEXES:
+        raise ValueError(f"Unknown anatomogram sex: {sex!r}")
+    if fmt == 'png':
+        _import_cairosvg()
+    genes = matrix.genes.tolist() if genes is None else list(genes)
+    for gene in genes:
+        if gene not in matrix:
+            raise ValueError(f"Gene '{gene}' not found in expression data")
+
+    thumbnails: Dict[str, bytes] = {}
+    folder = None
+    if cache_dir is not None:
+        key = caching.fingerprint_key(caching.fingerprint(matrix), sex, width, fmt, palette,
+                                      scale_type, float(threshold), TOLERANCE_PX, CURVE_STEPS)
+        folder = Path(cache_dir) / _THUMBNAIL_DIR / key
+        for gene in genes:
+            path = folder / f"{caching.fingerprint_key(gene)}.{fmt}"
+            if path.exists():
+                thumbnails[gene] = path.read_bytes()
+
+    missing = [gene for gene in genes if gene not in thumbnails]
+    tissues = matrix.tissues.tolist()
+    tasks = [(batch, _gene_rows(matrix, batch), tissues, sex, width, fmt, palette, scale_type, threshold)
+             for batch in (missing[start:start + chunk_genes] for start in range(0, len(missing), chunk_genes))]
+    workers = workers or os.cpu_count() or 1
+    if pool_min_genes is None:
+        pool_min_genes = POOL_MIN_GENES[fmt]
+    if len(tasks) > 1 and workers > 1 and len(missing) >= pool_min_genes:
+        # Spawned, not forked: notebook kernels run threads, and forking them can deadlock
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            batches = list(pool.map(_render_batch, tasks))
+    else:
+        batches = [_render_batch(task) for task in tasks]
+
+    if folder is not None and missing:
+        folder.mkdir(parents=True, exist_ok=True)
+    for batch in batches:
+        for gene, thumbnail in batch:
+            thumbnails[gene] = thumbnail
+            if folder is not None:
+                # Write then rename, so a concurrent reader never sees a partial file
+                path = folder / f"{caching.fingerprint_key(gene)}.{fmt}"
+                tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+                tmp.write_bytes(thumbnail)
+                os.replace(tmp, path)
+    if folder is not None and folder.exists():
+        # The folder is one entry of the disk cache; mark it used for eviction
+        caching._touch(folder)
+    return {gene: thumbnails[gene] for gene in genes}
+
+
+def data_uri(thumbnail: bytes, fmt: str = 'svg') -> str:
+    """A ``data:`` URI for a thumbnail, for ``<img src=...>`` in HTML tables."""
+    return f"data:{_MIME_TYPES[fmt]};base64,{base64.b64encode(thumbnail).decode('ascii')}"
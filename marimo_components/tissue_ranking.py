@@ -0,0 +1,104 @@
+"""Reverse index from each tissue to its genes, highest expression first."""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+
+from .expression_matrix import ExpressionMatrix, _shortest_float64
+from .normalization import _argsort
+from .sparse_matrix import SparseExpressionMatrix
+
+
+class TissueRanking:
+    """Genes of every tissue, sorted by expression (highest first).
+
+    Built once per dataset: for each tissue the measured genes' row
+    positions are argsorted by value and stored back to back, CSR style
+    (tissue ``t`` owns ``rows[indptr[t]:indptr[t + 1]]``). A query slices
+    the tissue's run, so ``top_genes`` costs O(k), plus O(log n) to find
+    the threshold cut-off.
+    """
+
+    def __init__(self, genes: np.ndarray, tissues: np.ndarray, indptr: np.ndarray,
+                 rows: np.ndarray, values: np.ndarray):
+        """Create an index from its arrays (use :meth:`build` to index a matrix).
+
+        Args:
+            genes: Gene names, indexed by ``rows``
+            tissues: UBERON ids, one per run
+            indptr: Offsets of each tissue's run (length n_tissues + 1)
+            rows: Gene positions, each run sorted by descending value
+            values: The matching values, each run in descending order
+        """
+        self.genes = genes
+        self.tissues = tissues
+        self.indptr = indptr
+        self.rows = rows
+        # Stored negated so every run is ascending and searchsorted finds the threshold
+        self._negated = -values
+        self._positions: Dict[str, int] = {tissue: col for col, tissue in enumerate(tissues.tolist())}
+
+    @classmethod
+    def build(cls, matrix: Union[ExpressionMatrix, SparseExpressionMatrix]) -> 'TissueRanking':
+        """Index a dense or sparse matrix (unmeasured cells are left out)."""
+        if isinstance(matrix, SparseExpressionMatrix):
+            by_tissue = np.argsort(matrix.indices, kind='stable')
+            indptr = np.zeros(matrix.n_tissues + 1, dtype=np.int64)
+            np.cumsum(np.bincount(matrix.indices, minlength=matrix.n_tissues), out=indptr[1:])
+            # Rows of the CSR matrix are genes, so a cell's gene is its row id
+            cell_rows = matrix.row_ids()
+            cells = np.empty_like(by_tissue)
+            for col in range(matrix.n_tissues):
+                run = by_tissue[indptr[col]:indptr[col + 1]]
+                cells[indptr[col]:indptr[col + 1]] = run[_argsort(-matrix.data[run])]
+            return cls(matrix.genes, matrix.tissues, indptr, cell_rows[cells].astype(np.int32),
+                       matrix.data[cells])
+
+        # Descending order is the ascending order of the negated values; NaN sorts last
+        negated = np.ascontiguousarray(matrix.values.T)
+        np.negative(negated, out=negated)
+        order = _argsort(negated)
+        counts = (~np.isnan(negated)).sum(axis=1)
+        measured = np.arange(matrix.n_genes) < counts[:, None]
+        indptr = np.zeros(matrix.n_tissues + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        values = -np.take_along_axis(negated, order, axis=1)[measured]
+        return cls(matrix.genes, matrix.tissues, indptr, order[measured].astype(np.int32), values)
+
+    def __contains__(self, uberon_id: str) -> bool:
+        return uberon_id in self._positions
+
+    def gene_count(self, uberon_id: str) -> int:
+        """Number of genes measured in a tissue (0 for unknown tissues)."""
+        col = self._positions.get(uberon_id)
+        return 0 if col is None else int(self.indptr[col + 1] - self.indptr[col])
+
+    def top_genes(self, uberon_id: str, k: int = 10,
+                  threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """The ``k`` highest-expressed genes of a tissue.
+
+        Args:
+            uberon_id: Tissue to query
+            k: Maximum number of genes to return
+            threshold: Only return genes with expression >= threshold
+
+        Returns:
+            ``(gene, value)`` pairs, highest value first; empty for tissues
+            without data
+        """
+        col = self._positions.get(uberon_id)
+        if col is None or k <= 0:
+            return []
+        start, end = int(self.indptr[col]), int(self.indptr[col + 1])
+        if threshold is not None:
+            # Compare in the stored dtype so a threshold of 0.72 keeps a float32 0.72
+            cutoff = -np.asarray(threshold, dtype=self._negated.dtype)
+            end = start + int(np.searchsorted(self._negated[start:end], cutoff, side='right'))
+        end = min(end, start + k)
+
+        values = -self._negated[start:end]
+        if values.dtype == np.float32:
+            values = _shortest_float64(values)
+        return list(zip(self.genes[self.rows[start:end]].tolist(), values.tolist()))
+
+    def __repr__(self) -> str:
+        return f"TissueRanking({len(self.tissues)} tissues, {len(self.rows)} ranked values)"
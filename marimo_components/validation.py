@@ -0,0 +1,261 @@
+"""Vectorized validation of expression data with a per-rule report.
+
+Every rule is checked over the whole dataset in array passes, so one call
+reports all problems at once instead of stopping at the first bad value.
+The report is a plain dictionary::
+
+    {
+        "valid": False,
+        "errors": 1,        # error rules with at least one violation
+        "warnings": 1,      # warning rules with at least one violation
+        "checked": {"genes": 60000, "tissues": 93, "values": 5580000},
+        "rules": [
+            {"rule": "non_finite", "severity": "error", "count": 2,
+             "message": "2 expression values are NaN or infinite",
+             "examples": [{"gene": "TP53", "tissue": "UBERON_0002107", "value": inf}, ...]},
+            ...
+        ],
+    }
+
+In a dense ExpressionMatrix NaN marks an unmeasured cell and is not an
+error; in the nested dict and sparse forms missing cells are simply left
+out, so a stored NaN is reported.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from .expression_matrix import ExpressionMatrix
+from .sparse_matrix import SparseExpressionMatrix
+
+UBERON_ID = re.compile(r"UBERON_\d{7}")
+
+DEFAULT_MAX_EXAMPLES = 10
+
+# Rule name -> severity, in report order; only errors make the data invalid
+RULES = {
+    "structure": "error",
+    "empty": "error",
+    "non_numeric": "error",
+    "non_finite": "error",
+    "duplicate_genes": "error",
+    "negative": "warning",
+    "malformed_uberon": "warning",
+}
+
+
+def is_numeric(value: Any) -> bool:
+    """Whether a cell value counts as a number: Python or numpy ints and floats, not bools."""
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+def _rule(rule: str, count: int = 0, message: str = "", examples: Optional[List[Dict[str, Any]]] = None):
+    return {"rule": rule, "severity": RULES[rule], "count": int(count),
+            "message": message if count else "", "examples": examples or []}
+
+
+def _report(rules: Dict[str, Dict[str, Any]], genes: int, tissues: int, values: int) -> Dict[str, Any]:
+    results = [rules.get(rule) or _rule(rule) for rule in RULES]
+    failed = [result for result in results if result["count"]]
+    errors = sum(1 for result in failed if result["severity"] == "error")
+    return {
+        "valid": errors == 0,
+        "errors": errors,
+        "warnings": len(failed) - errors,
+        "checked": {"genes": genes, "tissues": tissues, "values": values},
+        "rules": results,
+    }
+
+
+def _label_rules(genes: np.ndarray, tissues: np.ndarray, max_examples: int) -> Dict[str, Dict[str, Any]]:
+    """Duplicate gene names and malformed tissue ids, checked on the label arrays."""
+    rules = {}
+
+    duplicated = pd.Index(genes).duplicated(keep='first')
+    if duplicated.any():
+        names = pd.unique(genes[duplicated])
+        rules["duplicate_genes"] = _rule(
+            "duplicate_genes", len(names), f"{len(names)} gene names occur more than once",
+            [{"gene": str(gene)} for gene in names[:max_examples]])
+
+    unique_tissues = pd.unique(pd.Series(tissues, dtype=object)).astype(str)
+    malformed = ~pd.Series(unique_tissues).str.fullmatch(UBERON_ID.pattern).to_numpy(dtype=bool)
+    if malformed.any():
+        ids = unique_tissues[malformed]
+        rules["malformed_uberon"] = _rule(
+            "malformed_uberon", len(ids),
+            f"{len(ids)} tissue ids are not UBERON ids (UBERON_ followed by 7 digits)",
+            [{"tissue": str(tissue)} for tissue in ids[:max_examples]])
+    return rules
+
+
+def _value_rules(values: np.ndarray, missing_is_nan: bool, example) -> Dict[str, Dict[str, Any]]:
+    """NaN/inf and negative checks on a float array; ``example(mask)`` lists offending cells."""
+    rules = {}
+    with np.errstate(invalid='ignore'):
+        non_finite = np.isinf(values) if missing_is_nan else ~np.isfinite(values)
+        negative = values < 0
+
+    count = np.count_nonzero(non_finite)
+    if count:
+        kind = "infinite" if missing_is_nan else "NaN or infinite"
+        rules["non_finite"] = _rule("non_finite", count, f"{count} expression values are {kind}",
+                                    example(non_finite))
+    count = np.count_nonzero(negative)
+    if count:
+        rules["negative"] = _rule("negative", count, f"{count} expression values are negative",
+                                  example(negative))
+    return rules
+
+
+def _validate_dense(matrix: ExpressionMatrix, max_examples: int) -> Dict[str, Any]:
+    values = matrix.values
+    rules = {}
+    if matrix.n_genes == 0:
+        rules["empty"] = _rule("empty", 1, "No genes found in data")
+
+    def example(mask):
+        flat = np.flatnonzero(mask)[:max_examples]
+        rows, cols = np.unravel_index(flat, mask.shape)
+        return [{"gene": str(matrix.genes[row]), "tissue": str(matrix.tissues[col]), "value": float(values[row, col])}
+                for row, col in zip(rows.tolist(), cols.tolist())]
+
+    if not np.issubdtype(values.dtype, np.floating):
+        rules["non_numeric"] = _rule("non_numeric", values.size,
+                                     f"Expression values must be numeric, got {values.dtype}")
+    else:
+        rules.update(_value_rules(values, True, example))
+    rules.update(_label_rules(matrix.genes, matrix.tissues, max_examples))
+    return _report(rules, matrix.n_genes, matrix.n_tissues, int(np.count_nonzero(~np.isnan(values)))
+                   if np.issubdtype(values.dtype, np.floating) else values.size)
+
+
+def _validate_cells(genes: np.ndarray, indptr: np.ndarray, cell_tissues, values: np.ndarray,
+                    tissues: np.ndarray, max_examples: int,
+                    rules: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Checks for row-run layouts (sparse matrices and flattened dicts).
+
+    ``indptr`` delimits each gene's run of cells; ``cell_tissues(positions)``
+    returns the tissue ids of the given cell positions.
+    """
+    if len(genes) == 0:
+        rules["empty"] = _rule("empty", 1, "No genes found in data")
+
+    def example(mask):
+        positions = np.flatnonzero(mask)[:max_examples]
+        rows = np.searchsorted(indptr, positions, side='right') - 1
+        return [{"gene": str(genes[row]), "tissue": str(tissue), "value": float(values[position])}
+                for row, tissue, position in zip(rows.tolist(), cell_tissues(positions), positions.tolist())]
+
+    rules.update(_value_rules(values, False, example))
+    rules.update(_label_rules(genes, tissues, max_examples))
+    return _report(rules, len(genes), len(tissues), len(values))
+
+
+def _validate_sparse(matrix: SparseExpressionMatrix, max_examples: int) -> Dict[str, Any]:
+    rules = {}
+    values = matrix.data
+    if not np.issubdtype(values.dtype, np.floating):
+        rules["non_numeric"] = _rule("non_numeric", values.size,
+                                     f"Expression values must be numeric, got {values.dtype}")
+        values = values.astype(np.float64)
+    used = np.unique(matrix.indices)
+    return _validate_cells(matrix.genes, matrix.indptr,
+                           lambda positions: matrix.tissues[matrix.indices[positions]].tolist(),
+                           values, matrix.tissues[used], max_examples, rules)
+
+
+def _validate_dict(data: Any, max_examples: int) -> Dict[str, Any]:
+    # Structural problems stop the check: there is nothing to vectorize over
+    if not isinstance(data, dict):
+        return _report({"structure": _rule("structure", 1, "Data must be a dictionary")}, 0, 0, 0)
+    if 'genes' not in data:
+        return _report({"structure": _rule("structure", 1, "Data must contain 'genes' key")}, 0, 0, 0)
+    if not isinstance(data['genes'], dict):
+        return _report({"structure": _rule("structure", 1, "'genes' must be a dictionary")}, 0, 0, 0)
+
+    rules = {}
+    gene_names = list(data['genes'].keys())
+    gene_dicts = list(data['genes'].values())
+
+    not_dicts = [i for i, tissues in enumerate(gene_dicts) if not isinstance(tissues, dict)]
+    if not_dicts:
+        first = gene_names[not_dicts[0]]
+        rules["structure"] = _rule(
+            "structure", len(not_dicts), f"Expression values for gene '{first}' must be a dictionary",
+            [{"gene": str(gene_names[i])} for i in not_dicts[:max_examples]])
+        keep = set(not_dicts)
+        gene_names = [gene for i, gene in enumerate(gene_names) if i not in keep]
+        gene_dicts = [tissues for i, tissues in enumerate(gene_dicts) if i not in keep]
+
+    counts = np.fromiter((len(tissues) for tissues in gene_dicts), dtype=np.int64, count=len(gene_dicts))
+    indptr = np.zeros(len(gene_dicts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    def cell_tissues(positions):
+        rows = np.searchsorted(indptr, positions, side='right') - 1
+        return [list(gene_dicts[row])[position - indptr[row]]
+                for row, position in zip(rows.tolist(), positions.tolist())]
+
+    flat_values = [value for tissues in gene_dicts for value in tissues.values()]
+
+    # Only fall back to a per-value type scan if something other than int/float turned up
+    if set(map(type, flat_values)) <= {float, int}:
+        values = np.fromiter(flat_values, dtype=np.float64, count=len(flat_values))
+    else:
+        is_number = np.fromiter((is_numeric(value) for value in flat_values),
+                                dtype=bool, count=len(flat_values))
+        bad = np.flatnonzero(~is_number)
+        if len(bad):
+            rows = np.searchsorted(indptr, bad, side='right') - 1
+            bad_tissues = cell_tissues(bad[:max(max_examples, 1)])
+            message = (f"Expression value for {gene_names[rows[0]]}/{bad_tissues[0]} must be numeric, "
+                       f"got {type(flat_values[bad[0]]).__name__}")
+            if len(bad) > 1:
+                message += f" ({len(bad) - 1} more)"
+            rules["non_numeric"] = _rule("non_numeric", len(bad), message, [
+                {"gene": str(gene_names[row]), "tissue": str(tissue), "value": repr(flat_values[position])}
+                for row, tissue, position in zip(rows[:max_examples].tolist(), bad_tissues,
+                                                 bad[:max_examples].tolist())])
+        # Non-numeric cells are reported once, not again as NaN
+        values = np.zeros(len(flat_values))
+        values[is_number] = [value for value, ok in zip(flat_values, is_number) if ok]
+
+    tissues = list(set().union(*gene_dicts))
+    not_strings = [tissue for tissue in tissues if type(tissue) is not str]
+    if not_strings:
+        structure = rules.get("structure") or _rule("structure")
+        structure["count"] += len(not_strings)
+        structure["message"] = (structure["message"]
+                                or f"Tissue ID must be string, got {type(not_strings[0]).__name__}")
+        rules["structure"] = structure
+
+    return _validate_cells(np.asarray(gene_names, dtype=object), indptr,
+                           cell_tissues,
+                           values, np.asarray(tissues, dtype=object), max_examples, rules)
+
+
+def validate_expression(data: Any, max_examples: int = DEFAULT_MAX_EXAMPLES) -> Dict[str, Any]:
+    """Check expression data against every rule and return the full report.
+
+    Args:
+        data: Nested ``{"genes": {...}}`` dict, ExpressionMatrix or SparseExpressionMatrix
+        max_examples: Offending cells (or labels) listed per rule
+
+    Returns:
+        Report dictionary (see the module docstring)
+    """
+    if isinstance(data, ExpressionMatrix):
+        return _validate_dense(data, max_examples)
+    if isinstance(data, SparseExpressionMatrix):
+        return _validate_sparse(data, max_examples)
+    return _validate_dict(data, max_examples)
+
+
+def first_error(report: Dict[str, Any]) -> Optional[str]:
+    """Message of the first failing error rule, or None if the report is valid."""
+    for result in report["rules"]:
+        if result["severity"] == "error" and result["count"]:
+            return result["message"]
+    return None
@@ -0,0 +1,98 @@
+"""Keep one AnatomogramWidget per dataset and update it in place.
+
+Reactive notebooks re-run a cell whenever one of its inputs changes, so a
+cell that builds ``AnatomogramWidget(...)`` from the control values tears
+down the widget, re-syncs the data and reloads the SVG on every slider
+move. A session splits that into two steps::
+
+    session = AnatomogramSession(transport="binary")
+
+    # cell 1, re-run only when the dataset changes
+    widget = session.widget(matrix, uberon_map=uberon_map)
+
+    # cell 2, re-run on every control change: only changed traits are sent,
+    # together in one batch
+    session.update(selected_gene=gene, threshold=threshold)
+
+so a control change costs a recolor in the browser.
+"""
+
+from typing import Any, Dict, Optional
+
+from . import caching
+from .anatomogram_widget import AnatomogramWidget
+from .expression_matrix import ExpressionMatrix
+from .sparse_matrix import SparseExpressionMatrix
+
+
+class AnatomogramSession:
+    """Owns the widget for the current dataset and applies control changes to it."""
+
+    def __init__(self, **defaults: Any):
+        """Create a session with no widget yet.
+
+        Args:
+            **defaults: Trait values every widget of the session starts with
+                (e.g. ``transport="binary"``)
+        """
+        self.defaults = defaults
+        self.current: Optional[AnatomogramWidget] = None
+        self._dataset_key: Optional[str] = None
+        self.created = 0
+
+    @staticmethod
+    def _key(data: Any) -> str:
+        # Matrices are identified by content, so reloading the same file keeps
+        # the widget; dicts by identity (fingerprinting them costs a full scan)
+        key = caching.fingerprint(data)
+        return key if key is not None else f"id:{id(data)}"
+
+    def widget(self, data: Any, **traits: Any) -> AnatomogramWidget:
+        """The widget for a dataset, created on first use and reused afterwards.
+
+        Args:
+            data: ExpressionMatrix, SparseExpressionMatrix or ``{"genes": {...}}`` dict
+            **traits: Trait values to apply (to a new widget, or as an update)
+
+        Returns:
+            The session's widget, showing ``data``
+        """
+        key = self._key(data)
+        if self.current is None or key != self._dataset_key:
+            source = ({'matrix': data} if isinstance(data, (ExpressionMatrix, SparseExpressionMatrix))
+                      else {'expression_data': data})
+            self.current = AnatomogramWidget(**{**self.defaults, **traits, **source})
+            self._dataset_key = key
+            self.created += 1
+        else:
+            self.update(**traits)
+        return self.current
+
+    def update(self, **traits: Any) -> Dict[str, Any]:
+        """Set the traits whose value differs from the widget's.
+
+        Args:
+            **traits: Trait names and their new values
+
+        Returns:
+            The traits that changed (empty when there is no widget yet)
+
+        Raises:
+            ValueError: If a name is not a trait of AnatomogramWidget
+        """
+        if self.current is None:
+            return {}
+        for name in traits:
+            if not self.current.has_trait(name):
+                raise ValueError(f"Unknown AnatomogramWidget trait: {name}")
+
+        changed = {name: value for name, value in traits.items() if getattr(self.current, name) != value}
+        with self.current.batch_update():
+            for name, value in changed.items():
+                setattr(self.current, name, value)
+        return changed
+
+    def reset(self):
+        """Forget the current widget; the next ``widget()`` call creates a new one."""
+        self.current = None
+        self._dataset_key = None
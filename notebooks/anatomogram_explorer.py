@@ -10,18 +10,38 @@ def _():
     import pandas as pd
     import numpy as np
     import json
+    import os
     from pathlib import Path
     import sys
 
     # Add parent directory to path for imports
     sys.path.append(str(Path(__file__).parent.parent))
 
-    from marimo_components.anatomogram_widget import AnatomogramWidget
     from marimo_components.data_processor import ExpressionDataProcessor
-
-    # Initialize the data processor
-    processor = ExpressionDataProcessor()
-    return AnatomogramWidget, Path, json, mo, pd, processor
+    from marimo_components.thumbnails import data_uri, render_thumbnails
+    from marimo_components.widget_session import AnatomogramSession
+
+    # Initialize the data processor. Caching is in memory unless
+    # DNA2CELL_CACHE_DIR names a directory: then parsed files and derived tables
+    # are kept there (capped at 2 GiB) and reopening the same file skips the parse
+    processor = ExpressionDataProcessor(cache_dir=os.environ.get("DNA2CELL_CACHE_DIR") or None)
+
+    # One widget per dataset for the main view and the gene panel; control
+    # changes are applied to them as trait updates instead of rebuilding them.
+    # Only the shown genes' values are sent to the browser, as float32 buffers
+    anatomogram_session = AnatomogramSession(transport="binary")
+    panel_session = AnatomogramSession(transport="binary")
+    return (
+        Path,
+        anatomogram_session,
+        data_uri,
+        json,
+        mo,
+        panel_session,
+        pd,
+        processor,
+        render_thumbnails,
+    )
 
 
 @app.cell(hide_code=True)
@@ -38,7 +58,7 @@ def _(mo):
     - Export visualizations and processed data
 
     ## Getting Started
-    1. Upload your expression data (JSON or CSV format)
+    1. Upload your expression data (JSON, CSV, Parquet or Arrow format)
     2. Select genes and visualization parameters
     3. Explore the interactive anatomogram
     """
@@ -55,8 +75,8 @@ def _(mo):
 @app.cell(hide_code=True)
 def _(mo):
     expression_file = mo.ui.file(
-        filetypes=[".json", ".csv", ".tsv"],
-        label="Upload Expression Data (JSON, CSV, or TSV format)"
+        filetypes=[".json", ".csv", ".tsv", ".parquet", ".feather", ".arrow"],
+        label="Upload Expression Data (JSON, CSV, TSV, Parquet or Arrow format)"
     )
 
     uberon_file = mo.ui.file(
@@ -64,9 +84,12 @@ def _(mo):
         label="Upload UBERON Mapping - Optional (JSON format)"
     )
 
+    # Long/tidy CSV/TSV tables (one gene, UBERON id, value record per row) load as a sparse matrix
+    long_format = mo.ui.checkbox(label="CSV/TSV is in long format (gene, UBERON id, value)")
+
     # Display file upload widgets
-    mo.vstack([expression_file, uberon_file])
-    return expression_file, uberon_file
+    mo.vstack([expression_file, long_format, uberon_file])
+    return expression_file, long_format, uberon_file
 
 
 @app.cell
@@ -85,17 +108,21 @@ def _(
     Path,
     expression_file,
     json,
+    long_format,
     mo,
+    pd,
     processor,
     uberon_file,
     use_sample_data,
 ):
-    expression_data = None
+    expression_matrix = None
     uberon_map = None
     available_genes = []
     tissue_list = set()
+    tissue_ranking = None
     data_loaded = False
     error_message = ""
+    _validation = None
 
     # Load UBERON mapping
     if uberon_file.value:
@@ -122,8 +149,7 @@ def _(
         sample_data_path = Path(__file__).parent.parent / "sample_data" / "expression_data.json"
         if sample_data_path.exists():
             try:
-                with open(sample_data_path, 'r') as f:
-                    expression_data = json.load(f)
+                expression_matrix = processor.load_matrix(sample_data_path)
                 data_loaded = True
             except Exception as e:
                 error_message = f"Error loading sample data: {str(e)}"
@@ -132,27 +158,63 @@ def _(
     elif expression_file.value:
         try:
             file_info = expression_file.value[0]
-            expression_data = processor.load_file(
-                file_info.content,
-                file_info.name
-            )
+            # Stream gene rows straight into a columnar matrix, chunk by chunk
+            with mo.status.progress_bar(
+                total=len(file_info.content),
+                title="Loading expression data",
+                remove_on_exit=True
+            ) as _bar:
+                _bytes_done = [0]
+
+                def _report(genes_loaded, bytes_read, total_bytes):
+                    _bar.update(increment=bytes_read - _bytes_done[0], subtitle=f"{genes_loaded:,} genes")
+                    _bytes_done[0] = bytes_read
+
+                if long_format.value and file_info.name.lower().endswith((".csv", ".tsv")):
+                    expression_matrix = processor.load_long(
+                        file_info.content,
+                        file_info.name,
+                        progress=_report
+                    )
+                else:
+                    expression_matrix = processor.load_matrix(
+                        file_info.content,
+                        file_info.name,
+                        progress=_report
+                    )
             data_loaded = True
         except Exception as e:
             error_message = f"Error loading file: {str(e)}"
 
     # Validate and process data
-    if expression_data and data_loaded:
-        is_valid, validation_message = processor.validate_format(expression_data)
+    if expression_matrix is not None and data_loaded:
+        # Every rule runs over the whole matrix, so all problems are listed at once
+        _validation = processor.validation_report(expression_matrix, max_examples=5)
+        _problems = pd.DataFrame([
+            {
+                "Rule": _rule["rule"],
+                "Severity": _rule["severity"],
+                "Count": _rule["count"],
+                "Message": _rule["message"],
+                "Examples": ", ".join(
+                    "/".join(str(_v) for _v in _example.values()) for _example in _rule["examples"]
+                ),
+            }
+            for _rule in _validation["rules"] if _rule["count"]
+        ])
 
-        if is_valid:
-            available_genes = processor.get_gene_list(expression_data)
-            tissue_list = processor.get_tissue_list(expression_data)
-            stats = processor.get_summary_statistics(expression_data)
+        if _validation["valid"]:
+            # The widget keeps the matrix in Python and syncs one gene at a time
+            available_genes = processor.get_gene_list(expression_matrix)
+            tissue_list = processor.get_tissue_list(expression_matrix)
+            # Tissue -> genes index, rebuilt only when a different dataset is loaded
+            tissue_ranking = processor.tissue_ranking(expression_matrix)
+            stats = processor.get_summary_statistics(expression_matrix)
 
             # Create a preview of the data
             preview_data = []
             for gene in available_genes[:10]:  # Show first 10 genes
-                gene_tissues = expression_data['genes'][gene]
+                gene_tissues = expression_matrix.gene_values(gene)
                 # Get first 5 tissues for each gene
                 for tissue, value in list(gene_tissues.items())[:5]:
                     tissue_name = uberon_map.get(tissue, tissue) if uberon_map else tissue
@@ -178,11 +240,25 @@ def _(
                 mo.md("### Data Preview (first 10 genes, 5 tissues each)"),
                 mo.plain(preview_df)
             ])
+            if _validation["warnings"]:
+                output = mo.vstack([
+                    mo.md(f"⚠️ **{_validation['warnings']} validation warning(s)**").callout(kind="warn"),
+                    mo.plain(_problems),
+                    output
+                ])
         else:
-            error_message = f"Data validation failed: {validation_message}"
+            error_message = (
+                f"Data validation failed: {_validation['errors']} error(s), "
+                f"{_validation['warnings']} warning(s)"
+            )
             data_loaded = False
 
-    if error_message:
+    if error_message and _validation is not None and not _validation["valid"]:
+        output = mo.vstack([
+            mo.md(f"❌ **Error:** {error_message}").callout(kind="danger"),
+            mo.plain(_problems)
+        ])
+    elif error_message:
         output = mo.md(f"❌ **Error:** {error_message}").callout(kind="danger")
     elif not data_loaded and not error_message:
         output = mo.md("👆 Please upload expression data or use sample data to begin").callout(kind="info")
@@ -191,7 +267,14 @@ def _(
     if 'output' in locals():
         output
 
-    return available_genes, data_loaded, expression_data, uberon_map
+    return (
+        available_genes,
+        data_loaded,
+        expression_matrix,
+        tissue_list,
+        tissue_ranking,
+        uberon_map,
+    )
 
 
 @app.cell
@@ -201,30 +284,132 @@ def _(mo):
 
 
 @app.cell
-def _(available_genes, data_loaded, expression_data, mo, pd):
+def _(available_genes, data_loaded, expression_matrix, mo, processor):
+    gene_table = None
     if data_loaded and available_genes:
-        # Create a table of all genes with their expression summary
-        gene_summary = []
-        for gene in available_genes:
-            gene_data = expression_data['genes'][gene]
-            values = list(gene_data.values())
-            gene_summary.append({
-                "Gene": gene,
-                "Tissues": len(gene_data),
-                "Min Expression": min(values) if values else 0,
-                "Max Expression": max(values) if values else 0,
-                "Mean Expression": sum(values)/len(values) if values else 0
-            })
-        
-        gene_df = pd.DataFrame(gene_summary)
-        
+        # One vectorized pass over the matrix (cached per dataset)
+        gene_df = processor.gene_summary(expression_matrix).rename(columns={
+            "gene": "Gene",
+            "tissues": "Tissues",
+            "min": "Min Expression",
+            "max": "Max Expression",
+            "mean": "Mean Expression",
+            "std": "Std Expression",
+            "median": "Median Expression",
+            "tau": "Tau (Specificity)"
+        }).sort_values("Gene", ignore_index=True)
+
+        # Selected rows get anatomogram thumbnails in the next cell
+        gene_table = mo.ui.table(gene_df, selection="multi", show_column_actions=True, search=True)
+
         mo.vstack([
             mo.md(f"**Total genes available: {len(available_genes)}**"),
-            mo.ui.table(gene_df, show_column_actions=True, search=True)
+            gene_table
         ])
     else:
         mo.md("*Gene list will appear after data is loaded*")
-    return gene_df if 'gene_df' in locals() else None
+    return (gene_table,)
+
+
+@app.cell
+def _(data_uri, expression_matrix, gene_table, mo, render_thumbnails):
+    # Thumbnails are rendered on demand, only for the selected genes; PNG when
+    # cairosvg is installed, flat SVG otherwise
+    _selected = [] if gene_table is None else gene_table.value["Gene"].head(48).tolist()
+    if _selected:
+        try:
+            _format = "png"
+            _thumbnails = render_thumbnails(expression_matrix, _selected, fmt=_format)
+        except ImportError:
+            _format = "svg"
+            _thumbnails = render_thumbnails(expression_matrix, _selected, fmt=_format)
+        _output = mo.hstack([
+            mo.vstack([mo.image(src=data_uri(_thumbnails[_gene], _format), width=48), mo.md(f"`{_gene}`")],
+                      align="center")
+            for _gene in _selected
+        ], wrap=True, justify="start")
+    else:
+        _output = mo.md("*Select genes in the table to see their anatomograms*")
+    _output
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md("""## 🎯 Tissue-Specific Genes""")
+    return
+
+
+@app.cell
+def _(data_loaded, mo, tissue_list, uberon_map):
+    if data_loaded and tissue_list:
+        _names = uberon_map or {}
+        _options = {
+            f"{_names.get(_tissue, _tissue)} ({_tissue})": _tissue
+            for _tissue in sorted(tissue_list, key=lambda _t: _names.get(_t, _t).lower())
+        }
+        specificity_tissue = mo.ui.dropdown(
+            options=_options,
+            value=next(iter(_options)),
+            label="Tissue"
+        )
+        specificity_metric = mo.ui.dropdown(
+            options={"Tau": "tau", "Gini": "gini", "Max z-score": "max_z"},
+            value="Tau",
+            label="Rank by"
+        )
+        specificity_top_k = mo.ui.slider(start=5, stop=100, step=5, value=20, label="Top genes")
+
+        mo.hstack([specificity_tissue, specificity_metric, specificity_top_k])
+    else:
+        mo.md("*Specificity ranking will appear after data is loaded*")
+        specificity_tissue = None
+        specificity_metric = None
+        specificity_top_k = None
+
+    return (specificity_metric, specificity_tissue, specificity_top_k)
+
+
+@app.cell
+def _(
+    data_loaded,
+    expression_matrix,
+    mo,
+    processor,
+    specificity_metric,
+    specificity_tissue,
+    specificity_top_k,
+):
+    if data_loaded and specificity_tissue is not None and specificity_tissue.value:
+        # Scores for every gene come from one vectorized pass (cached per dataset)
+        _top = processor.top_specific_genes(
+            expression_matrix,
+            specificity_tissue.value,
+            k=specificity_top_k.value,
+            by=specificity_metric.value
+        )
+        specific_genes_table = mo.ui.table(
+            _top.drop(columns=["top_tissue"]).rename(columns={
+                "gene": "Gene",
+                "top_value": "Expression",
+                "tissues": "Tissues",
+                "tau": "Tau",
+                "gini": "Gini",
+                "max_z": "Max z"
+            }),
+            selection="single",
+            show_column_actions=True,
+            label="Select a gene to view it on the anatomogram"
+        )
+
+        mo.vstack([
+            mo.md(f"**{len(_top)} genes most specific to {specificity_tissue.selected_key}**"),
+            specific_genes_table
+        ])
+    else:
+        specific_genes_table = None
+
+    return (specific_genes_table,)
 
 
 @app.cell
@@ -234,15 +419,26 @@ def _(mo):
 
 
 @app.cell
-def _(available_genes, data_loaded, mo):
-    # Only show controls if data is loaded
+def _(available_genes, data_loaded, mo, specific_genes_table):
     if data_loaded and available_genes:
+        # Picking a gene in the tissue-specific ranking jumps to it
+        _picked = specific_genes_table.value if specific_genes_table is not None else None
         gene_selector = mo.ui.dropdown(
             options={gene: gene for gene in available_genes},
-            value=available_genes[0],
+            value=_picked["Gene"].iloc[0] if _picked is not None and len(_picked) else available_genes[0],
             label="Select Gene"
         )
+        gene_selector
+    else:
+        gene_selector = None
+
+    return (gene_selector,)
 
+
+@app.cell
+def _(available_genes, data_loaded, mo):
+    # Only show controls if data is loaded
+    if data_loaded and available_genes:
         sex_selector = mo.ui.radio(
             options={"male": "Male", "female": "Female"},
             value="male",
@@ -280,13 +476,12 @@ def _(available_genes, data_loaded, mo):
 
         # Display controls in a grid
         mo.hstack([
-            mo.vstack([gene_selector, sex_selector]),
+            sex_selector,
             mo.vstack([color_palette, scale_type]),
             threshold_slider
         ])
     else:
         mo.md("*Controls will appear after data is loaded*")
-        gene_selector = None
         sex_selector = None
         color_palette = None
         scale_type = None
@@ -294,7 +489,6 @@ def _(available_genes, data_loaded, mo):
 
     return (
         color_palette,
-        gene_selector,
         scale_type,
         sex_selector,
         threshold_slider,
@@ -309,63 +503,165 @@ def _(mo):
 
 @app.cell
 def _(
-    AnatomogramWidget,
+    anatomogram_session,
     available_genes,
+    data_loaded,
+    expression_matrix,
+    mo,
+    uberon_map,
+):
+    # Re-runs only when a dataset is loaded; the next cell applies the controls
+    anatomogram = None
+    widget_ui = None
+    if data_loaded and available_genes:
+        anatomogram = anatomogram_session.widget(
+            expression_matrix,
+            selected_gene=available_genes[0],
+            uberon_map=uberon_map or {}
+        )
+        widget_ui = mo.ui.anywidget(anatomogram)
+        _output = widget_ui
+    else:
+        _output = mo.md("*Anatomogram will appear after data is loaded*")
+    _output
+    return anatomogram, widget_ui
+
+
+@app.cell
+def _(
+    anatomogram,
+    anatomogram_session,
     color_palette,
     data_loaded,
-    expression_data,
+    expression_matrix,
     gene_selector,
     mo,
     scale_type,
     sex_selector,
     threshold_slider,
-    uberon_map,
 ):
-    if data_loaded and available_genes and gene_selector and gene_selector.value:
-        # Use GitHub-hosted SVG files
-        svg_base_url = "https://raw.githubusercontent.com/ebi-gene-expression-group/anatomogram/master/src/svg"
-
-        # Debug info
-        debug_info = mo.md(f"""
-        ### Debug Info:
-        - Data loaded: {data_loaded}
-        - Selected gene: {gene_selector.value}
-        - Sex: {sex_selector.value if sex_selector else 'None'}
-        - SVG URL: {svg_base_url}
-        - Expression data keys: {list(expression_data.keys()) if expression_data else 'None'}
-        - Number of tissues for selected gene: {len(expression_data['genes'].get(gene_selector.value, {})) if expression_data and 'genes' in expression_data else 0}
-        """).callout(kind="info")
-
-        # Create the anatomogram widget
-        anatomogram = AnatomogramWidget(
-            expression_data=expression_data,
+    _output = None
+    if anatomogram is not None and gene_selector and gene_selector.value:
+        # Only changed traits are synced, so moving a control just recolors
+        anatomogram_session.update(
             selected_gene=gene_selector.value,
             sex=sex_selector.value if sex_selector and sex_selector.value else "male",
             color_palette=color_palette.value if color_palette and color_palette.value else "viridis",
             scale_type=scale_type.value if scale_type and scale_type.value else "linear",
-            uberon_map=uberon_map or {},
-            threshold=threshold_slider.value if threshold_slider and threshold_slider.value is not None else 0.0,
-            svg_url=svg_base_url  # GitHub URL
-        )
-
-        # Create the bound widget with reactive updates
-        widget_ui = mo.ui.anywidget(
-            anatomogram,
-            selected_gene=gene_selector.value,
-            sex=sex_selector.value if sex_selector else "male",
-            color_palette=color_palette.value if color_palette else "viridis",
-            scale_type=scale_type.value if scale_type else "linear",
-            threshold=threshold_slider.value if threshold_slider else 0.0
+            threshold=threshold_slider.value if threshold_slider and threshold_slider.value is not None else 0.0
         )
 
-        # Display the widget
-        return mo.vstack([
-            debug_info,
-            widget_ui,
+        _output = mo.vstack([
+            mo.md(f"""
+            ### Debug Info:
+            - Data loaded: {data_loaded}
+            - Selected gene: {gene_selector.value}
+            - Sex: {sex_selector.value if sex_selector else 'None'}
+            - SVG: bundled
+            - Expression matrix: {expression_matrix}
+            - Number of tissues for selected gene: {len(expression_matrix.gene_values(gene_selector.value)) if gene_selector.value in expression_matrix else 0}
+            - Widgets created this session: {anatomogram_session.created}
+            """).callout(kind="info"),
             mo.md(f"*Viewing gene: **{gene_selector.value}** | Sex: **{sex_selector.value if sex_selector else 'N/A'}** | Threshold: **{threshold_slider.value if threshold_slider else 0:.2f}***")
         ])
+    _output
+    return
+
+
+@app.cell
+def _(
+    data_loaded,
+    mo,
+    pd,
+    threshold_slider,
+    tissue_ranking,
+    uberon_map,
+    widget_ui,
+):
+    # Clicking a tissue in the anatomogram ranks its genes from the precomputed index
+    _clicked = widget_ui.value.get("clicked_tissue", "") if widget_ui is not None else ""
+    _output = None
+    if data_loaded and tissue_ranking is not None and _clicked:
+        _name = uberon_map.get(_clicked, _clicked) if uberon_map else _clicked
+        _threshold = threshold_slider.value if threshold_slider else 0.0
+        _top = tissue_ranking.top_genes(_clicked, k=25, threshold=_threshold)
+        if _top:
+            _ranking = pd.DataFrame(_top, columns=["Gene", "Expression"])
+            _ranking.insert(0, "Rank", range(1, len(_ranking) + 1))
+            _output = mo.vstack([
+                mo.md(f"### Top genes in {_name} (`{_clicked}`)"),
+                mo.md(f"*{tissue_ranking.gene_count(_clicked)} genes measured; "
+                      f"showing up to 25 with expression ≥ {_threshold:.2f}*"),
+                mo.ui.table(_ranking, selection=None)
+            ])
+        else:
+            _output = mo.md(f"*No genes with expression ≥ {_threshold:.2f} in {_name}*")
+    elif data_loaded:
+        _output = mo.md("*Click a tissue in the anatomogram to rank its genes*")
+    _output
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md("""## 🧬 Gene Panel Comparison""")
+    return
+
+
+@app.cell
+def _(available_genes, data_loaded, mo):
+    if data_loaded and available_genes:
+        panel_genes = mo.ui.multiselect(
+            options=available_genes,
+            value=available_genes[:4],
+            label="Genes to compare",
+            max_selections=12
+        )
+        panel_genes
+    else:
+        panel_genes = None
+
+    return (panel_genes,)
+
+
+@app.cell
+def _(data_loaded, expression_matrix, mo, panel_session, uberon_map):
+    # One panel widget per dataset: the SVG is parsed once and cloned per
+    # gene, and all genes share one color scale
+    panel_widget = None
+    if data_loaded:
+        panel_widget = panel_session.widget(expression_matrix, uberon_map=uberon_map or {})
+        _output = mo.ui.anywidget(panel_widget)
     else:
-        return mo.md("*Anatomogram will appear after data is loaded*")
+        _output = None
+    _output
+    return (panel_widget,)
+
+
+@app.cell
+def _(
+    color_palette,
+    mo,
+    panel_genes,
+    panel_session,
+    panel_widget,
+    scale_type,
+    sex_selector,
+    threshold_slider,
+):
+    _output = None
+    if panel_widget is not None and panel_genes is not None:
+        panel_session.update(
+            selected_genes=list(panel_genes.value),
+            sex=sex_selector.value if sex_selector and sex_selector.value else "male",
+            color_palette=color_palette.value if color_palette and color_palette.value else "viridis",
+            scale_type=scale_type.value if scale_type and scale_type.value else "linear",
+            threshold=threshold_slider.value if threshold_slider and threshold_slider.value is not None else 0.0
+        )
+        if not panel_genes.value:
+            _output = mo.md("*Select genes above to compare them side by side*")
+    _output
+    return
 
 
 @app.cell
@@ -379,7 +675,7 @@ def _(
     available_genes,
     color_palette,
     data_loaded,
-    expression_data,
+    expression_matrix,
     gene_selector,
     mo,
     pd,
@@ -388,7 +684,7 @@ def _(
 ):
     if data_loaded and available_genes and gene_selector and gene_selector.value:
         selected_gene = gene_selector.value
-        gene_data = expression_data['genes'].get(selected_gene, {})
+        gene_data = expression_matrix.gene_values(selected_gene) if selected_gene in expression_matrix else {}
 
         # Filter by threshold
         threshold = threshold_slider.value
@@ -457,11 +753,12 @@ def _(mo):
 def _(
     available_genes,
     data_loaded,
-    expression_data,
+    expression_matrix,
     gene_selector,
     json,
     mo,
     pd,
+    processor,
     threshold_slider,
 ):
     # Initialize variables
@@ -469,6 +766,7 @@ def _(
     export_current_gene = None
     export_filtered_button = None
     export_gene_button = None
+    export_parquet_link = None
     
     if data_loaded and gene_selector and gene_selector.value:
         # Export filtered data
@@ -487,10 +785,8 @@ def _(
             }
 
             # Apply threshold filter
-            for gene, tissues in expression_data['genes'].items():
-                filtered_tissues = {k: v for k, v in tissues.items() if v >= threshold_slider.value}
-                if filtered_tissues:
-                    filtered["genes"][gene] = filtered_tissues
+            thresholded = processor.filter_by_threshold(expression_matrix, threshold_slider.value)
+            filtered["genes"] = thresholded.to_dict()["genes"]
 
             return json.dumps(filtered, indent=2)
 
@@ -499,11 +795,12 @@ def _(
             if not gene_selector.value:
                 return None
 
+            gene_values = expression_matrix.gene_values(gene_selector.value)
             gene_export = {
                 "gene": gene_selector.value,
-                "expression_data": expression_data['genes'].get(gene_selector.value, {}),
+                "expression_data": gene_values,
                 "metadata": {
-                    "total_tissues": len(expression_data['genes'].get(gene_selector.value, {})),
+                    "total_tissues": len(gene_values),
                     "threshold": threshold_slider.value,
                     "export_date": pd.Timestamp.now().isoformat()
                 }
@@ -528,7 +825,24 @@ def _(
                 filename=f"{gene_selector.value}_expression_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.json"
             )
 
-        mo.hstack([export_filtered_button, export_gene_button])
+        # Columnar export of the thresholded matrix (needs pyarrow). The data is
+        # a callable, so the matrix is only filtered and serialized on click
+        import importlib.util as _importlib_util
+        if _importlib_util.find_spec("pyarrow") is not None:
+            _threshold = threshold_slider.value
+            export_parquet_link = mo.download(
+                data=lambda: processor.export_table(
+                    processor.filter_by_threshold(expression_matrix, _threshold),
+                    "parquet"
+                ),
+                filename=f"filtered_expression_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+                mimetype="application/vnd.apache.parquet",
+                label="Export Parquet"
+            )
+        else:
+            export_parquet_link = mo.md("*Install pyarrow to export Parquet*")
+
+        mo.hstack([export_filtered_button, export_gene_button, export_parquet_link])
     else:
         mo.md("*Export options will be available after data is loaded*")
     
@@ -160,9 +160,6 @@ def _(mo):
 
 @app.cell
 def _(AnatomogramWidget, expression_data, mo, uberon_map):
-    # Use GitHub-hosted SVG files
-    svg_base_url = "https://raw.githubusercontent.com/ebi-gene-expression-group/anatomogram/master/src/svg"
-
     # Create the anatomogram widget
     anatomogram = AnatomogramWidget(
         expression_data=expression_data,
@@ -171,14 +168,13 @@ def _(AnatomogramWidget, expression_data, mo, uberon_map):
         color_palette="viridis",
         scale_type="linear",
         uberon_map=uberon_map,
-        threshold=0.0,
-        svg_url=svg_base_url
+        threshold=0.0
     )
 
     # Display debug info
     mo.md(f"""
     ### Debug Info:
-    - SVG URL: {svg_base_url}
+    - SVG: bundled
     - Selected gene: TP53
     - Number of tissues: {len(expression_data['genes']['TP53'])}
     """)
@@ -405,9 +405,6 @@ def _(AnatomogramWidget, expression_data, gene_selector, mo, uberon_map):
     output = None
     
     if gene_selector.value and len(gene_selector.value) > 0:
-        # Use GitHub-hosted SVG files
-        svg_base_url = "https://raw.githubusercontent.com/ebi-gene-expression-group/anatomogram/master/src/svg"
-
         # Create the anatomogram widget WITH selected_gene
         anatomogram = AnatomogramWidget(
             expression_data=expression_data,
@@ -416,8 +413,7 @@ def _(AnatomogramWidget, expression_data, gene_selector, mo, uberon_map):
             color_palette="viridis",
             scale_type="linear",
             uberon_map=uberon_map,
-            threshold=0.0,
-            svg_url=svg_base_url
+            threshold=0.0
         )
 
         # Assign the widget UI to the output variable
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Tests for AnatomogramWidget's synced state and front-end helpers."""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from marimo_components.anatomogram_widget import AnatomogramWidget
+from marimo_components.expression_matrix import ExpressionMatrix
+from marimo_components.svg_assets import load_bundled_svg
+from marimo_components.widget_session import AnatomogramSession
+
+EXPRESSION_DATA = {
+    "genes": {
+        "TP53": {"UBERON_0002107": 0.72, "UBERON_0000955": 0.82, "UBERON_0002048": 0.61},
+        "BRCA1": {"UBERON_0002107": 0.45, "UBERON_0000955": 0.38, "UBERON_0002048": 0.34},
+    }
+}
+
+# Exercises cachedTemplate() from the widget's _esm with stub loaders
+TEMPLATE_CACHE_SCRIPT = """
+const calls = [];
+const deferred = () => { let resolve, reject; const promise = new Promise((res, rej) => { resolve = res; reject = rej; }); return { promise, resolve, reject }; };
+const loader = (name) => () => { calls.push(name); return Promise.resolve({ name }); };
+
+// Concurrent requests share one load; a hit needs no load
+const [a1, a2] = await Promise.all([cachedTemplate("a", loader("a")), cachedTemplate("a", loader("a"))]);
+if (a1 !== a2 || calls.length !== 1) throw new Error("concurrent loads were not shared");
+await cachedTemplate("a", loader("a"));
+if (calls.length !== 1) throw new Error("cache hit loaded again");
+
+// Least recently used templates are dropped beyond the cap
+for (const key of ["b", "c", "d", "a", "e"]) await cachedTemplate(key, loader(key));
+if (templateCache.has("b") || !templateCache.has("a")) throw new Error("wrong eviction: " + [...templateCache.keys()]);
+
+// A failed load is forgotten, so the next request retries
+await cachedTemplate("f", () => Promise.reject(new Error("offline"))).catch(() => {});
+if (templateLoads.has("f")) throw new Error("failed load kept");
+await cachedTemplate("f", loader("f"));
+
+// A load that dies with its widget hands over to the widgets still waiting
+const first = deferred();
+const dying = cachedTemplate("g", () => first.promise).catch(error => error);
+const waiting = cachedTemplate("g", loader("g"));
+first.reject(new WidgetClosedError("Widget was removed"));
+if (!((await dying) instanceof WidgetClosedError)) throw new Error("own closed load did not fail");
+if ((await waiting).name !== "g") throw new Error("waiting widget did not load");
+if (globalThis.__anatomogramTemplates.cache !== templateCache) throw new Error("cache not on globalThis");
+"""
+
+
+def matrix_widget(**traits) -> AnatomogramWidget:
+    return AnatomogramWidget(matrix=ExpressionMatrix.from_dict(EXPRESSION_DATA), **traits)
+
+
+def test_matrix_widget_syncs_only_the_selected_gene():
+    widget = matrix_widget(selected_gene="TP53")
+    assert widget.expression_data == {}
+    assert widget.gene_values == EXPRESSION_DATA["genes"]["TP53"]
+
+    widget.update_gene("BRCA1")
+    assert widget.gene_values == EXPRESSION_DATA["genes"]["BRCA1"]
+
+
+def test_binary_transport_lays_values_out_by_tissue_index():
+    widget = matrix_widget(selected_gene="BRCA1", transport="binary")
+    assert widget.gene_values == {}
+    values = np.frombuffer(widget.gene_buffer, dtype="<f4")
+    assert len(values) == len(widget.tissue_index)
+    for tissue, value in zip(widget.tissue_index, values):
+        assert np.isclose(value, EXPRESSION_DATA["genes"]["BRCA1"][tissue])
+
+
+def test_panel_sends_every_gene_in_one_buffer():
+    widget = matrix_widget(selected_gene="TP53")
+    widget.selected_genes = ["TP53", "BRCA1", "MISSING"]
+    panel = np.frombuffer(widget.panel_buffer, dtype="<f4").reshape(3, len(widget.tissue_index))
+    for row, gene in zip(panel[:2], ["TP53", "BRCA1"]):
+        for tissue, value in zip(widget.tissue_index, row):
+            assert np.isclose(value, EXPRESSION_DATA["genes"][gene][tissue])
+    assert np.isnan(panel[2]).all()
+
+    widget.selected_genes = []
+    assert widget.panel_buffer == b""
+
+
+def test_session_reuses_the_widget_per_dataset():
+    session = AnatomogramSession(transport="binary")
+    first = session.widget(ExpressionMatrix.from_dict(EXPRESSION_DATA), selected_gene="TP53")
+    assert session.update(selected_gene="BRCA1", threshold=0.5) == {"selected_gene": "BRCA1", "threshold": 0.5}
+    assert session.update(selected_gene="BRCA1", threshold=0.5) == {}
+    assert first.selected_gene == "BRCA1" and first.transport == "binary"
+
+    # Reloading identical data keeps the widget; different data replaces it
+    assert session.widget(ExpressionMatrix.from_dict(EXPRESSION_DATA), sex="female") is first
+    assert first.sex == "female" and session.created == 1
+    changed = {"genes": {"TP53": {"UBERON_0002107": 0.1}}}
+    assert session.widget(ExpressionMatrix.from_dict(changed)) is not first and session.created == 2
+
+    with pytest.raises(ValueError):
+        session.update(not_a_trait=1)
+
+
+def test_batch_update_recomputes_server_colors_once():
+    widget = matrix_widget(selected_gene="TP53", color_mode="server")
+    calls = []
+    compute_colors = widget.compute_tissue_colors
+    widget.compute_tissue_colors = lambda: calls.append(1) or compute_colors()
+    with widget.batch_update():
+        widget.selected_gene = "BRCA1"
+        widget.color_palette = "magma"
+        widget.threshold = 0.4
+        assert calls == []
+    assert len(calls) == 1
+    assert widget.gene_values == EXPRESSION_DATA["genes"]["BRCA1"]
+    assert set(widget.tissue_colors) == {"UBERON_0002107"}
+
+
+def test_batch_update_sends_one_sync_message():
+    widget = matrix_widget(selected_gene="TP53", transport="binary")
+    sent = []
+    widget.comm.publish_msg = lambda msg_type, data=None, metadata=None, buffers=None, **keys: (
+        sent.append(data) if msg_type == "comm_msg" else None)
+
+    # Unbatched, the gene and its value buffer go out as separate messages
+    widget.selected_gene = "BRCA1"
+    assert len(sent) == 2
+
+    sent.clear()
+    with widget.batch_update():
+        widget.selected_gene = "TP53"
+        widget.threshold = 0.3
+        widget.color_palette = "magma"
+    assert len(sent) == 1
+    assert set(sent[0]["state"]) == {"selected_gene", "threshold", "color_palette"}
+    assert ["gene_buffer"] in sent[0]["buffer_paths"]
+
+
+def template_cache_source() -> str:
+    """The module-level template cache code of the widget's ``_esm``."""
+    esm = AnatomogramWidget._esm
+    start = esm.index("const TEMPLATE_CACHE_SIZE")
+    return esm[start:esm.index("// Size a parsed SVG document", start)]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_template_cache_shares_evicts_and_recovers_loads():
+    script = template_cache_source() + TEMPLATE_CACHE_SCRIPT
+    result = subprocess.run(["node", "--input-type=module", "-e", script],
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def test_bundled_svg_reply_names_its_variant():
+    widget = AnatomogramWidget(minimized_svg=True)
+    sent = []
+    widget.send = lambda content, buffers=None: sent.append((content, buffers))
+
+    widget._handle_custom_msg(widget, {"type": "request_svg", "sex": "female", "minimized": False}, [])
+    content, buffers = sent[-1]
+    assert (content["sex"], content["minimized"]) == ("female", False)
+    assert bytes(buffers[0]) == load_bundled_svg("female", minimized=False)
+
+    widget._handle_custom_msg(widget, {"type": "request_svg", "sex": "unknown", "minimized": True}, [])
+    assert sent[-1][0]["minimized"] is True and "error" in sent[-1][0]
+
+
+if __name__ == "__main__":
+    test_matrix_widget_syncs_only_the_selected_gene()
+    test_binary_transport_lays_values_out_by_tissue_index()
+    test_panel_sends_every_gene_in_one_buffer()
+    test_session_reuses_the_widget_per_dataset()
+    test_batch_update_recomputes_server_colors_once()
+    test_batch_update_sends_one_sync_message()
+    if shutil.which("node") is not None:
+        test_template_cache_shares_evicts_and_recovers_loads()
+    test_bundled_svg_reply_names_its_variant()
+    print("Test passed!")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Tests for the palette lookup tables and server-side coloring."""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import numpy as np
+
+from marimo_components.colormaps import PALETTES, color_values, palette_hex, tissue_colors
+
+
+def test_palette_endpoints_match_d3():
+    # d3.interpolateX(0) and d3.interpolateX(1) for the discrete ramps
+    assert palette_hex("viridis")[[0, -1]].tolist() == ["#440154", "#fde725"]
+    assert palette_hex("magma")[[0, -1]].tolist() == ["#000004", "#fcfdbf"]
+    assert palette_hex("warm")[0] == "#6e40aa"
+    for palette in PALETTES:
+        assert len(palette_hex(palette)) == 256
+
+
+def test_color_values_follow_scale_and_threshold():
+    values = np.array([0.1, 0.55, np.nan, 1.0, 0.0])
+
+    linear = color_values(values, "viridis", "linear", threshold=0.2)
+    assert linear.tolist() == ["", palette_hex("viridis")[128], "", "#fde725", ""]
+
+    # Log scale sends values <= 0 to the bottom of the palette
+    log = color_values(values, "viridis", "log", threshold=0.0)
+    assert log[0] == log[4] == "#440154" and log[3] == "#fde725" and log[2] == ""
+
+
+def test_tissue_colors_skips_uncolored_tissues():
+    colors = tissue_colors(np.array(["UBERON_1", "UBERON_2"]), np.array([0.5, np.nan]))
+    assert colors == {"UBERON_1": "#21918c"}
+    assert all(type(key) is str for key in colors)
+
+
+if __name__ == "__main__":
+    test_palette_endpoints_match_d3()
+    test_color_values_follow_scale_and_threshold()
+    test_tissue_colors_skips_uncolored_tissues()
+    print("\nTest passed!")
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""Tests for the expression data processor and columnar matrix."""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import json
+
+import numpy as np
+import pytest
+
+from marimo_components import caching, normalization, thumbnails
+from marimo_components.data_processor import ExpressionDataProcessor
+from marimo_components.expression_matrix import ExpressionMatrix
+from marimo_components.sparse_matrix import SparseExpressionMatrix
+
+SAMPLE_PATH = Path(__file__).parent / "sample_data" / "expression_data.json"
+
+processor = ExpressionDataProcessor()
+
+
+def load_sample():
+    with open(SAMPLE_PATH) as f:
+        return json.load(f)
+
+
+def test_load_csv_skips_empty_and_non_numeric_cells():
+    content = b"Gene,UBERON_0002107,UBERON_0000955\nTP53,0.5,n/a\nEMPTY,,\nBRCA1,,0.9\n"
+    data = processor.load_csv(content)
+    assert data == {"genes": {"TP53": {"UBERON_0002107": 0.5}, "BRCA1": {"UBERON_0000955": 0.9}}}
+
+
+def test_matrix_round_trip_keeps_float32_precision():
+    data = load_sample()
+    matrix = ExpressionMatrix.from_dict(data)
+    assert matrix.values.dtype == np.float32
+    assert matrix.to_dict() == data
+    assert matrix.gene_values("TP53") == data["genes"]["TP53"]
+
+    # Values beyond float32 precision are rounded unless the matrix is float64
+    precise = {"genes": {"TP53": {"UBERON_0002107": 0.123456789012}}}
+    assert ExpressionMatrix.from_dict(precise).to_dict() != precise
+    assert ExpressionMatrix.from_dict(precise, dtype=np.float64).to_dict() == precise
+
+
+def test_processor_methods_accept_matrix():
+    data = load_sample()
+    matrix = processor.to_matrix(data)
+
+    assert processor.validate_format(matrix) == (True, "Data is valid")
+    assert processor.get_gene_list(matrix) == processor.get_gene_list(data)
+    assert processor.get_tissue_list(matrix) == processor.get_tissue_list(data)
+
+    dict_stats = processor.get_summary_statistics(data)
+    matrix_stats = processor.get_summary_statistics(matrix)
+    for key, value in dict_stats.items():
+        assert np.isclose(matrix_stats[key], value, atol=1e-6), key
+
+    normalized = processor.normalize_values(matrix).to_dict()
+    expected = processor.normalize_values(data)
+    for gene, tissues in expected["genes"].items():
+        for tissue, value in tissues.items():
+            assert np.isclose(normalized["genes"][gene][tissue], value, atol=1e-6)
+
+    filtered = processor.filter_by_threshold(matrix, 0.8).to_dict()
+    assert filtered == processor.filter_by_threshold(data, 0.8)
+
+
+def test_store_round_trip_is_memory_mapped(tmp_path):
+    data = load_sample()
+    processor.write_store(data, tmp_path / "sample.store")
+
+    matrix = processor.open_store(tmp_path / "sample.store")
+    assert matrix.is_memory_mapped
+    assert matrix.gene_values("MYC") == data["genes"]["MYC"]
+    assert matrix.to_dict() == data
+
+
+def test_store_round_trip_preserves_values_and_order(tmp_path):
+    rng = np.random.default_rng(0)
+    genes = ["ZNF1", "A2M", "MYC", "BRCA1"]
+    tissues = ["UBERON_0002107", "UBERON_0000955", "UBERON_0002048"]
+    for dtype in (np.float32, np.float64):
+        values = rng.random((len(genes), len(tissues))).astype(dtype)
+        values[rng.random(values.shape) < 0.3] = np.nan
+        matrix = ExpressionMatrix(values, genes, tissues, dtype=dtype)
+        path = processor.write_store(matrix, tmp_path / f"{np.dtype(dtype).name}.store")
+
+        for opened in (processor.open_store(path), ExpressionMatrix.open(path, mmap_mode=None)):
+            assert opened.genes.tolist() == genes and opened.tissues.tolist() == tissues
+            assert opened.values.dtype == dtype
+            assert np.array_equal(opened.values, values, equal_nan=True)
+            assert opened.gene_values("MYC") == matrix.gene_values("MYC")
+
+
+def test_csv_stream_matches_load_csv():
+    content = (b"Gene\tUBERON_0002107\tUBERON_0000955\n"
+               b"TP53\t0.5\tn/a\nEMPTY\t\t\nBRCA1\t\t0.9\nMYC\t1.25\t2\nTP53\t0.75\t\n")
+    calls = []
+    matrix = processor.load_matrix(content, "genes.tsv", chunksize=2,
+                                   progress=lambda *args: calls.append(args))
+
+    assert matrix.to_dict() == processor.load_csv(content, sep='\t')
+    assert matrix.genes.tolist() == ["TP53", "BRCA1", "MYC"]
+    assert len(calls) == 3
+    assert calls[-1] == (3, len(content), len(content))
+
+
+def test_json_stream_matches_load_json():
+    content = SAMPLE_PATH.read_bytes()
+    matrix = processor.load_matrix(content, "expression_data.json")
+    assert matrix.to_dict() == processor.load_json(content)
+
+    # Tiny chunks split keys, numbers and delimiters across reads
+    assert processor.load_json_stream(content, chunk_bytes=7).to_dict() == load_sample()
+
+
+def test_json_stream_reads_numbers_split_across_chunks():
+    content = b'{"genes": {"A": {"U": 1}}, "version": 1.5, "v": 1e5, "w": -2.5E-3}'
+    for chunk_bytes in range(1, len(content) + 1):
+        matrix = processor.load_json_stream(content, chunk_bytes=chunk_bytes)
+        assert matrix.to_dict() == {"genes": {"A": {"U": 1.0}}}, chunk_bytes
+
+
+def test_json_stream_fails_on_first_bad_entry():
+    content = b'{"genes": {"TP53": {"UBERON_0002107": 0.5}, "MYC": {"UBERON_0000955": "high"}, '
+    content += b'"BRCA1": {"UBERON_0000955": 0.9' + b', "UBERON_0002048": 0.1' * 1000 + b'}}}'
+    try:
+        processor.load_json_stream(content, chunk_bytes=64)
+    except ValueError as e:
+        assert "MYC/UBERON_0000955 must be numeric" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_long_format_loads_into_sparse_matrix():
+    data = load_sample()
+    records = [(gene, tissue, value) for gene, tissues in data["genes"].items()
+               for tissue, value in tissues.items()]
+    content = "gene,uberon_id,value\n" + "".join(f"{g},{t},{v}\n" for g, t, v in records)
+    content += "TP53,UBERON_0002107,n/a\nUNMEASURED,UBERON_0000955,\n"
+
+    matrix = processor.load_long(content.encode(), "expression_long.csv", chunksize=100)
+    assert isinstance(matrix, SparseExpressionMatrix)
+    assert matrix.nnz == len(records)
+    assert matrix.to_dict() == data
+
+    assert processor.get_tissue_list(matrix) == processor.get_tissue_list(data)
+    assert processor.filter_by_threshold(matrix, 0.8).to_dict() == processor.filter_by_threshold(data, 0.8)
+    assert processor.normalize_values(matrix).to_dict() == processor.normalize_values(
+        processor.to_matrix(data)).to_dict()
+    dict_stats = processor.get_summary_statistics(data)
+    sparse_stats = processor.get_summary_statistics(matrix)
+    for key, value in dict_stats.items():
+        assert np.isclose(sparse_stats[key], value, atol=1e-6), key
+
+
+def test_table_round_trip_with_projection(tmp_path):
+    pytest.importorskip("pyarrow")
+    data = load_sample()
+
+    for name in ("sample.parquet", "sample.feather"):
+        content = processor.export_table(data, "parquet" if name.endswith(".parquet") else "ipc")
+        assert processor.load_file(content, name) == data
+
+        path = processor.write_table(data, tmp_path / name)
+        matrix = processor.load_matrix(path, tissues=["UBERON_0002107", "UBERON_0000955"])
+        assert matrix.tissues.tolist() == ["UBERON_0002107", "UBERON_0000955"]
+        assert matrix.gene_values("TP53") == {
+            tissue: value for tissue, value in data["genes"]["TP53"].items()
+            if tissue in ("UBERON_0002107", "UBERON_0000955")
+        }
+
+
+def test_validation_report_lists_every_problem():
+    data = {"genes": {
+        "TP53": {"UBERON_0002107": 0.5, "UBERON_0000955": "high"},
+        "BRCA1": {"UBERON_0002107": float("inf"), "UBERON:0000955": -1.0},
+        "EGFR": {"UBERON_0002107": 2.0},
+    }}
+    report = processor.validation_report(data)
+    counts = {rule["rule"]: rule["count"] for rule in report["rules"]}
+    assert not report["valid"]
+    assert (report["errors"], report["warnings"]) == (2, 2)
+    assert counts == {"structure": 0, "empty": 0, "non_numeric": 1, "non_finite": 1,
+                      "duplicate_genes": 0, "negative": 1, "malformed_uberon": 1}
+    non_finite = next(rule for rule in report["rules"] if rule["rule"] == "non_finite")
+    assert non_finite["examples"] == [{"gene": "BRCA1", "tissue": "UBERON_0002107", "value": float("inf")}]
+    assert processor.validate_format(data) == (
+        False, "Expression value for TP53/UBERON_0000955 must be numeric, got str")
+
+    # NaN is a missing cell in a dense matrix; duplicate genes are not
+    values = np.array([[1.0, np.nan], [np.inf, 2.0], [3.0, 4.0]])
+    matrix = ExpressionMatrix(values, ["TP53", "BRCA1", "TP53"], ["UBERON_0002107", "UBERON_0000955"])
+    for data in (matrix, SparseExpressionMatrix.from_dense(matrix)):
+        report = processor.validation_report(data)
+        counts = {rule["rule"]: rule["count"] for rule in report["rules"] if rule["count"]}
+        assert counts == {"non_finite": 1, "duplicate_genes": 1}
+        is_valid, message = processor.validate_format(data)
+        assert not is_valid and "infinite" in message
+
+
+def test_validation_accepts_numpy_scalars():
+    data = {"genes": {"A": {"UBERON_0002107": np.float64(1.0), "UBERON_0000955": np.float32(0.5)},
+                      "B": {"UBERON_0002107": np.int64(2), "UBERON_0000955": 3}}}
+    assert processor.validate_format(data) == (True, "Data is valid")
+    assert processor.validation_report(data)["valid"]
+
+    data["genes"]["B"]["UBERON_0000955"] = True
+    valid, message = processor.validate_format(data)
+    assert not valid and "B/UBERON_0000955 must be numeric, got bool" in message
+
+
+def test_normalization_modes_agree_across_forms():
+    data = load_sample()
+    matrix = processor.to_matrix(data)
+    sparse = processor.to_sparse(data)
+
+    for method in normalization.METHODS:
+        dense_result = processor.normalize_values(matrix, method)
+        sparse_result = processor.normalize_values(sparse, method).to_dense()
+        dict_result = processor.to_matrix(processor.normalize_values(data, method))
+        assert dense_result.values.dtype == np.float32, method
+        assert np.allclose(dense_result.values, sparse_result.values, atol=1e-5, equal_nan=True), method
+        assert np.allclose(dense_result.values, dict_result.values, atol=1e-5, equal_nan=True), method
+        assert np.array_equal(np.isnan(dense_result.values), np.isnan(matrix.values)), method
+
+    zscores = processor.normalize_values(matrix, 'zscore').values
+    assert np.allclose(np.nanmean(zscores, axis=1), 0, atol=1e-5)
+
+    # Equal-sized tissues end up with identical value distributions
+    block = ExpressionMatrix(np.array([[5.0, 4.0], [2.0, 1.0], [3.0, 3.0], [4.0, 2.0]]),
+                             ["A", "B", "C", "D"], ["UBERON_0000001", "UBERON_0000002"])
+    quantiles = processor.normalize_values(block, 'quantile').values
+    assert np.allclose(np.sort(quantiles[:, 0]), np.sort(quantiles[:, 1]))
+
+    copy = matrix.copy()
+    assert processor.normalize_values(copy, 'log1p', inplace=True) is copy
+    assert np.allclose(copy.values, np.log1p(matrix.values), equal_nan=True)
+
+    try:
+        processor.normalize_values(matrix, 'softmax')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unsupported method should raise")
+
+
+def test_derived_artifacts_are_cached_by_fingerprint(tmp_path):
+    path = Path(__file__).parent / "sample_data" / "expression_data.json"
+    cached = ExpressionDataProcessor(cache_dir=tmp_path)
+    matrix = cached.load_matrix(path)
+
+    genes = cached.get_gene_list(matrix)
+    genes.append("NOT_A_GENE")
+    assert cached.get_gene_list(matrix) == processor.get_gene_list(matrix)
+    assert cached.cache.hits == 1
+
+    normalized = cached.normalize_values(matrix, 'quantile')
+    normalized.values[:] = 0
+    assert np.allclose(cached.normalize_values(matrix, 'quantile').values,
+                       processor.normalize_values(matrix, 'quantile').values, equal_nan=True)
+
+    # A changed matrix has a new fingerprint and misses the cache
+    changed = matrix.copy()
+    changed.values[0, 0] = 1000.0
+    assert cached.get_summary_statistics(changed)['max_expression'] == 1000.0
+
+    # A new session memory-maps the parsed file and reads artifacts from disk
+    reopened = ExpressionDataProcessor(cache_dir=tmp_path)
+    stored = reopened.load_matrix(path)
+    assert stored.is_memory_mapped
+    assert reopened.get_gene_list(stored) == processor.get_gene_list(matrix)
+    assert (reopened.cache.hits, reopened.cache.misses) == (1, 0)
+
+    # The reopened matrix is writable like a freshly parsed one, without touching the store
+    expected = processor.normalize_values(matrix, 'minmax').values
+    assert reopened.normalize_values(stored, 'minmax', inplace=True) is stored
+    assert np.allclose(stored.values, expected, equal_nan=True)
+    assert np.allclose(reopened.load_matrix(path).values, matrix.values, equal_nan=True)
+
+
+def test_fingerprint_is_remembered_until_the_matrix_changes():
+    matrix = processor.to_matrix(load_sample())
+    key = caching.fingerprint(matrix)
+    assert caching.fingerprint(matrix) is key
+
+    # In-place normalization invalidates it, so cached statistics follow the new values
+    cached = ExpressionDataProcessor()
+    before = cached.get_summary_statistics(matrix)['max_expression']
+    cached.normalize_values(matrix, 'zscore', inplace=True)
+    assert caching.fingerprint(matrix) != key
+    after = cached.get_summary_statistics(matrix)['max_expression']
+    assert after != before and np.isclose(after, np.nanmax(matrix.values))
+
+    # So do replacing the value block and an explicit forget after a direct write
+    key = caching.fingerprint(matrix)
+    matrix.values = matrix.values * 2
+    assert caching.fingerprint(matrix) != key
+    key = caching.fingerprint(matrix)
+    matrix.values[0, 0] = 100.0
+    caching.forget_fingerprint(matrix)
+    assert caching.fingerprint(matrix) != key
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = caching.ArtifactCache(cache_dir=tmp_path, max_disk_bytes=2500)
+    for name in ("a", "b"):
+        cache.get_or_compute(name, "blob", lambda: b"x" * 1000)
+    # Reading "a" back from disk makes "b" the least recently used entry
+    cache.clear()
+    cache.get_or_compute("a", "blob", lambda: None)
+    cache.get_or_compute("c", "blob", lambda: b"x" * 1000)
+
+    stored = sorted(path.name.split("-")[0] for path in (tmp_path / "artifacts").iterdir())
+    assert stored == ["a", "c"]
+
+
+def test_gene_summary_matches_per_gene_values():
+    data = load_sample()
+    matrix = processor.to_matrix(data)
+    summary = processor.gene_summary(matrix)
+
+    assert list(summary.columns) == ['gene', 'tissues', 'min', 'max', 'mean', 'std', 'median', 'tau']
+    assert summary['gene'].tolist() == matrix.genes.tolist()
+    for row in summary.itertuples():
+        values = np.array(list(data["genes"][row.gene].values()))
+        assert row.tissues == len(values)
+        assert np.isclose(row.min, values.min()) and np.isclose(row.max, values.max())
+        assert np.isclose(row.mean, values.mean(), atol=1e-6)
+        assert np.isclose(row.std, values.std(), atol=1e-6)
+        assert np.isclose(row.median, np.median(values), atol=1e-6)
+        tau = (1 - values / values.max()).sum() / (len(values) - 1)
+        assert np.isclose(row.tau, tau, atol=1e-5)
+
+    sparse_summary = processor.gene_summary(processor.to_sparse(data))
+    assert np.allclose(sparse_summary[['min', 'max', 'median', 'tau']], summary[['min', 'max', 'median', 'tau']])
+
+
+def test_specificity_scores_rank_tissue_specific_genes():
+    tissues = ["UBERON_0002107", "UBERON_0000955", "UBERON_0002113", "UBERON_0000948"]
+    values = np.array([
+        [9.0, 0.0, 0.0, 0.0],     # liver only
+        [1.0, 1.0, 1.0, 1.0],     # uniform
+        [4.0, 2.0, 1.0, np.nan],  # mostly liver
+        [0.0, 8.0, 1.0, 1.0],     # brain
+    ])
+    matrix = ExpressionMatrix(values, ["ALB", "ACTB", "APOA1", "GFAP"], tissues)
+    scores = processor.specificity_scores(matrix)
+
+    assert scores['top_tissue'].tolist() == ["UBERON_0002107", "UBERON_0002107", "UBERON_0002107", "UBERON_0000955"]
+    assert np.allclose(scores['tau'], [1.0, 0.0, (0.5 + 0.75) / 2, (1 + 0 + 7 / 8 + 7 / 8) / 3])
+    assert np.isclose(scores['gini'][0], 0.75) and np.isclose(scores['gini'][1], 0.0)
+    assert np.isnan(scores['max_z'][1])
+
+    top = processor.top_specific_genes(matrix, "UBERON_0002107", k=2)
+    assert top['gene'].tolist() == ["ALB", "APOA1"]
+    assert processor.top_specific_genes(matrix, "UBERON_0002113", k=5).empty
+
+    sparse_scores = processor.specificity_scores(processor.to_sparse(matrix))
+    assert np.allclose(sparse_scores[['tau', 'gini']], scores[['tau', 'gini']], equal_nan=True)
+
+
+def test_tissue_ranking_returns_top_genes_per_tissue():
+    data = load_sample()
+    matrix = processor.to_matrix(data)
+    ranking = processor.tissue_ranking(matrix)
+    sparse_ranking = processor.tissue_ranking(processor.to_sparse(data))
+
+    for tissue in matrix.tissues[:10].tolist():
+        expected = sorted(((values[tissue], gene) for gene, values in data["genes"].items() if tissue in values),
+                          key=lambda pair: -pair[0])
+        top = ranking.top_genes(tissue, k=5)
+        assert [value for _, value in top] == [value for value, _ in expected[:5]]
+        assert sparse_ranking.top_genes(tissue, k=5) == top
+        assert ranking.gene_count(tissue) == len(expected)
+
+        cutoff = expected[len(expected) // 2][0]
+        above = ranking.top_genes(tissue, k=len(expected), threshold=cutoff)
+        assert len(above) == sum(value >= cutoff for value, _ in expected)
+
+    assert ranking.top_genes("UBERON_9999999") == []
+    assert ranking.top_genes(matrix.tissues[0], k=0) == []
+    assert processor.tissue_ranking(matrix) is ranking
+
+
+def test_thumbnails_render_batches_and_cache_on_disk(tmp_path):
+    import xml.etree.ElementTree as ET
+    matrix = processor.to_matrix(load_sample())
+    genes = matrix.genes.tolist()
+
+    images = thumbnails.render_thumbnails(matrix, fmt='svg', width=32, cache_dir=tmp_path)
+    assert list(images) == genes
+    root = ET.fromstring(images[genes[0]])
+    assert root.get('width') == '32'
+    fills = {group.get('fill') for group in root}
+    assert any(fill not in ('#E0E0E0', '#a0a1a2') for fill in fills)
+    cached_files = list((tmp_path / 'thumbnails').rglob('*.svg'))
+    assert len(cached_files) == len(genes)
+
+    # Cached files are read back instead of rendered again
+    assert thumbnails.render_thumbnails(matrix, fmt='svg', width=32, cache_dir=tmp_path) == images
+    cached_files[0].write_bytes(b'<svg/>')
+    assert b'<svg/>' in thumbnails.render_thumbnails(matrix, fmt='svg', width=32, cache_dir=tmp_path).values()
+
+    # A pool over several chunks renders the same bytes
+    pooled = thumbnails.render_thumbnails(matrix, width=32, workers=2, chunk_genes=2, pool_min_genes=0)
+    assert pooled == images
+    assert thumbnails.data_uri(images[genes[0]]).startswith('data:image/svg+xml;base64,')
+
+    try:
+        thumbnails.render_thumbnails(matrix, genes=['NOT_A_GENE'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown genes should be rejected")
+
+
+if __name__ == "__main__":
+    test_load_csv_skips_empty_and_non_numeric_cells()
+    test_matrix_round_trip_keeps_float32_precision()
+    test_processor_methods_accept_matrix()
+    import tempfile
+    test_store_round_trip_is_memory_mapped(Path(tempfile.mkdtemp()))
+    test_store_round_trip_preserves_values_and_order(Path(tempfile.mkdtemp()))
+    test_csv_stream_matches_load_csv()
+    test_json_stream_matches_load_json()
+    test_json_stream_reads_numbers_split_across_chunks()
+    test_json_stream_fails_on_first_bad_entry()
+    test_long_format_loads_into_sparse_matrix()
+    test_table_round_trip_with_projection(Path(tempfile.mkdtemp()))
+    test_validation_report_lists_every_problem()
+    test_validation_accepts_numpy_scalars()
+    test_normalization_modes_agree_across_forms()
+    test_derived_artifacts_are_cached_by_fingerprint(Path(tempfile.mkdtemp()))
+    test_fingerprint_is_remembered_until_the_matrix_changes()
+    test_disk_cache_evicts_least_recently_used(Path(tempfile.mkdtemp()))
+    test_gene_summary_matches_per_gene_values()
+    test_specificity_scores_rank_tissue_specific_genes()
+    test_tissue_ranking_returns_top_genes_per_tissue()
+    test_thumbnails_render_batches_and_cache_on_disk(Path(tempfile.mkdtemp()))
+    print("\nTest passed!")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the bundled SVG preprocessing and tissue index."""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+from marimo_components.svg_assets import (
+    SHAPE_TAGS,
+    SVG_SEXES,
+    build_tissue_index,
+    bundled_svg_path,
+    load_bundled_index,
+    minimize_svg,
+)
+
+
+def ontology_ids(svg: bytes):
+    return [e.get("id") for e in ET.fromstring(svg).iter() if (e.get("id") or "").startswith(("UBERON", "CL"))]
+
+
+def test_minimize_keeps_tissue_ids_and_shrinks():
+    for sex in SVG_SEXES:
+        original = bundled_svg_path(sex, minimized=False).read_bytes()
+        minimized = minimize_svg(original, precision=2)
+        assert len(minimized) < 0.7 * len(original)
+        assert ontology_ids(minimized) == ontology_ids(original)
+        assert b"inkscape" not in minimized and b"sodipodi" not in minimized
+
+
+def test_minimize_rounds_style_numbers_but_not_colors():
+    svg = (b'<svg xmlns="http://www.w3.org/2000/svg"><g id="UBERON_0002107">'
+           b'<path d="M 1.23456,2 L 3,4 Z" style="fill:#1e5f00;stroke:#2e3436;opacity:0.123456789"/>'
+           b'</g></svg>')
+    style = ET.fromstring(minimize_svg(svg, precision=2)).find(".//{*}path").get("style")
+    assert style == "fill:#1e5f00;stroke:#2e3436;opacity:0.12346"
+
+
+def test_tissue_index_matches_dom_order():
+    for sex in SVG_SEXES:
+        for minimized in (True, False):
+            path = bundled_svg_path(sex, minimized)
+            index = load_bundled_index(sex, minimized)
+            assert index == build_tissue_index(path.read_bytes())
+
+            elements = minidom.parse(str(path)).documentElement.getElementsByTagName("*")
+            assert len(elements) == index["element_count"]
+            positions = {element: i for i, element in enumerate(elements)}
+            for tissue_id, position, shapes in index["tissues"]:
+                element = elements[position]
+                assert element.getAttribute("id") == tissue_id
+                # A group colors its SHAPE_TAGS descendants; any other element is its own shape
+                if element.tagName == "g":
+                    assert shapes == [positions[child] for child in element.getElementsByTagName("*")
+                                      if child.tagName in SHAPE_TAGS]
+                else:
+                    assert shapes == [position]
+
+
+if __name__ == "__main__":
+    test_minimize_keeps_tissue_ids_and_shrinks()
+    test_minimize_rounds_style_numbers_but_not_colors()
+    test_tissue_index_matches_dom_order()
+    print("\nTest passed!")